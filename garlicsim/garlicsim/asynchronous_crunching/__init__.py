@@ -18,13 +18,57 @@ from . import crunchers
 from .project import Project
 from .job import Job
 from .crunching_manager import CrunchingManager
+from .crunching_statistics import (CruncherStatistics, CrunchingStatistics,
+                                   CrunchingStatisticsLog)
 
 
 CRUNCHER_QUEUE_SIZE = 100
 '''
-The `max_size` given to the crunchers' work queues.
+The maximal number of states in a cruncher's work queue, until it's measured.
 
-This is needed for simpacks with very fast step functions, because without a
-`max_size` the cruncher might work so fast that the GUI will never catch up
-with it.
-'''
\ No newline at end of file
+Crunchers size their work queues adaptively, see `WorkQueueMeter`. Before a
+cruncher's throughput and the interval between drains of its work queue are
+known, this is the number of states that may wait in the queue.
+
+A limit is needed for simpacks with very fast step functions, because without
+it the cruncher might work so fast that the GUI will never catch up with it.
+'''
+
+
+CRUNCHER_QUEUE_MEMORY_BUDGET = 100 * 2 ** 20
+'''
+The maximal number of bytes worth of states in a cruncher's work queue.
+
+This keeps simpacks with big states from filling up the memory. See
+`WorkQueueMeter`.
+'''
+
+
+CRUNCHER_CPU_BUDGET = None
+'''
+The maximal number of crunchers that a crunching manager employs at once.
+
+`None` means the number of processor cores. A project with more jobs than this
+crunches its jobs with the highest priority first. See `CrunchingManager`.
+'''
+
+
+CRUNCHER_CHUNK_SIZE = 50
+'''
+The maximal number of states that a cruncher puts in its work queue at once.
+
+Crunchers put their states in their work queues in chunks, because putting an
+item in a work queue has a fixed cost which is significant for simpacks with
+very fast step functions. See `StateChunker`. Set this to 1 to make crunchers
+put every state separately.
+'''
+
+
+CRUNCHER_CHUNK_DURATION = 0.05
+'''
+The maximal time, in seconds, that a cruncher keeps a state before putting it
+in its work queue.
+
+This keeps the work flowing to the GUI in small enough intervals. Simpacks
+with step functions slower than this get their states delivered one by one.
+'''
@@ -9,12 +9,14 @@ collection of crunchers.
 '''
 
 import copy
+import threading
 
 from garlicsim.general_misc.third_party import abc
 
 from garlicsim.general_misc import abc_tools
 
 import garlicsim
+from .crunching_statistics import CruncherStatistics
 
 
 class BaseCruncher(object):
@@ -48,6 +50,16 @@ class BaseCruncher(object):
     
     This will be displayed to GUI users who may not be programmers.
     '''
+    
+    
+    work_queue_meter = None
+    '''
+    The `WorkQueueMeter` of the cruncher's `.work_queue`, if it has one.
+    
+    The crunching manager tells the meter about the work it takes from the
+    work queue. The meter can be checked for the cruncher's throughput, stall
+    time and queue depth. See also `.get_statistics`.
+    '''
 
     
     def __init__(self, crunching_manager, initial_state, crunching_profile):
@@ -72,6 +84,18 @@ class BaseCruncher(object):
         assert isinstance(self.crunching_profile,
                           garlicsim.asynchronous_crunching.CrunchingProfile)
         
+        self.timeline_lock = threading.RLock()
+        '''
+        Lock that guards the cruncher's timeline.
+        
+        The timeline is the path leading to the cruncher's job's node, plus
+        the states in the `.work_queue`. The crunching manager holds this lock
+        while it moves work from the work queue to the tree, and the cruncher's
+        `HistoryBrowser` holds it while reading the timeline. Since the tree
+        lock is held only in read mode while work is moved, crunchers reading
+        history on other forks aren't blocked.
+        '''
+        
     
     @abc_tools.abstract_static_method
     def can_be_used_with_simpack_grokker(simpack_grokker):
@@ -102,4 +126,13 @@ class BaseCruncher(object):
     @abc.abstractmethod
     def is_alive(self):
         '''Report whether the cruncher is alive and crunching.'''
+        
+        
+    def get_statistics(self, job=None):
+        '''
+        Get a `CruncherStatistics` snapshot of the cruncher's work.
+        
+        `job` is the cruncher's job, if known.
+        '''
+        return CruncherStatistics(self, job)
         
\ No newline at end of file
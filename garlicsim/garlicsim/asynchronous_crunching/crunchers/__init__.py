@@ -49,13 +49,22 @@ cruncher_types_list.append(ProcessCruncher)
 ### Finished adding `ProcessCruncher`. ########################################
 
 
+### Adding `PoolCruncher`: ####################################################
+#                                                                             #
+
+from .pool_cruncher import PoolCruncher
+cruncher_types_list.append(PoolCruncher)
 
-### Adding `PiCloudCruncher` dummy: ###########################################
 #                                                                             #
+### Finished adding `PoolCruncher`. ###########################################
+
 
-from .pi_cloud_cruncher import PiCloudCruncher
-cruncher_types_list.append(PiCloudCruncher)
 
+### Adding `RemoteCruncher`: ##################################################
 #                                                                             #
-### Finished adding `PiCloudCruncher` dummy. ##################################
 
+from .remote_cruncher import RemoteCruncher
+cruncher_types_list.append(RemoteCruncher)
+
+#                                                                             #
+### Finished adding `RemoteCruncher`. #########################################
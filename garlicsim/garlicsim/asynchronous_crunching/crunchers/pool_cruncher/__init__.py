@@ -0,0 +1,12 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This package defines the `PoolCruncher` class.
+
+See its documentation for more information.
+
+Like `ProcessCruncher`, `PoolCruncher` needs the `multiprocessing` package.
+'''
+
+from .pool_cruncher import PoolCruncher
@@ -0,0 +1,233 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `PoolCruncher` class.
+
+See its documentation for more information.
+'''
+
+import sys
+import Queue
+
+from garlicsim.general_misc.reasoned_bool import ReasonedBool
+from garlicsim.general_misc import string_tools
+from garlicsim.general_misc import import_tools
+
+import garlicsim
+from garlicsim.asynchronous_crunching import BaseCruncher
+
+
+multiprocessing_missing_text = (
+    "`PoolCruncher` can't be used because the "
+    "`multiprocessing` module isn't installed.%s" % (
+        (
+            " You may find a backport of it for Python 2.5 here: "
+            "http://pypi.python.org/pypi/multiprocessing"
+        ) if sys.version_info[:2] <= (2, 5) else ''
+    )
+)
+
+
+class PoolCrunchersWorkQueue(object):
+    '''
+    The work queue of a `PoolCruncher`.
+
+    This reads from the work queue of the cruncher's worker, stopping at the
+    `JobFinishedMarker` that ends the cruncher's job.
+    '''
+
+    def __init__(self, cruncher):
+        self.cruncher = cruncher
+        '''The cruncher that this work queue belongs to.'''
+
+
+    def get(self, block=True, timeout=None):
+        '''
+        Remove and return an item from the queue.
+
+        Raises `Queue.Empty` if no item is available, like `Queue.Queue.get`.
+        '''
+        from .worker import JobFinishedMarker
+        cruncher = self.cruncher
+        if cruncher.job_finished or cruncher.retired:
+            raise Queue.Empty
+        thing = cruncher.worker.work_queue.get(block, timeout)
+        if isinstance(thing, JobFinishedMarker):
+            cruncher._finish_job()
+            raise Queue.Empty
+        return thing
+
+
+    def qsize(self):
+        '''Return the number of items in the queue.'''
+        cruncher = self.cruncher
+        if cruncher.job_finished or cruncher.retired:
+            return 0
+        return cruncher.worker.work_queue.qsize()
+
+
+class PoolCruncher(BaseCruncher):
+    '''
+    Cruncher that crunches in a worker process which is reused between jobs.
+
+    A cruncher is a worker which crunches the simulation. It receives a state
+    from the main program, and then it repeatedly applies the step function of
+    the simulation to produce more states. Those states are then put in the
+    cruncher's `.work_queue`. They are then taken by the main program when
+    `Project.sync_crunchers` is called, and put into the tree.
+
+    Read more about crunchers in the documentation of the `crunchers` package.
+
+    `PoolCruncher` crunches in a separate process like `ProcessCruncher`, but
+    instead of starting a new process for every cruncher, it takes a worker
+    process from a pool shared by all `PoolCruncher`s. The worker goes back to
+    the pool when the job is done, with the simpack already imported in it.
+    This saves the time it takes to start a process and import the simpack,
+    which is significant when crunchers are often created, like when forking a
+    lot or changing step profiles.
+
+    The pool keeps as many idle workers as there are processor cores. See
+    `WorkerPool` for details.
+    '''
+
+
+    gui_explanation = string_tools.docstring_trim(
+    '''
+    `PoolCruncher`:
+
+     - Works from a pool of `multiprocessing.Process`es that are reused.
+
+     - Able to run on a different core of the processor than the main process
+       or other crunchers, like `ProcessCruncher`.
+
+     - Starts crunching faster than `ProcessCruncher`, because it doesn't need
+       to start a new process.
+     '''
+    )
+
+
+    worker_pool = None
+    '''
+    The pool of worker processes shared by all `PoolCruncher`s.
+
+    This is created on first use. See `get_worker_pool`.
+    '''
+
+
+    def __init__(self, crunching_manager, initial_state, crunching_profile):
+
+        BaseCruncher.__init__(self, crunching_manager, initial_state,
+                              crunching_profile)
+
+        if not import_tools.exists('multiprocessing'):
+            raise Exception(multiprocessing_missing_text)
+
+        self.worker = PoolCruncher.get_worker_pool().acquire_worker()
+        '''The worker process which does the crunching.'''
+
+        self.job_number = PoolCruncher.worker_pool.job_numbers.next()
+        '''The number identifying this cruncher's job in the worker.'''
+
+        self.work_queue = PoolCrunchersWorkQueue(self)
+        '''
+        Queue for putting completed work to be picked up by the main thread.
+
+        In this queue the cruncher will put the states that it produces, in
+        chronological order. If the cruncher reaches a simulation ends, it will
+        put an `EndMarker` in this queue.
+        '''
+
+        self.work_queue_meter = self.worker.work_queue_meter
+        '''
+        Meter that measures and limits the flow through `.work_queue`.
+
+        This is the worker's meter, so it measures the worker's previous jobs
+        too.
+        '''
+
+        self.job_finished = False
+        '''Flag saying whether the worker has finished our job.'''
+
+        self.retired = False
+        '''Flag saying whether the cruncher was retired.'''
+
+
+    @staticmethod
+    def get_worker_pool():
+        '''Get the pool of worker processes, creating it if needed.'''
+        if PoolCruncher.worker_pool is None:
+            from .worker_pool import WorkerPool
+            PoolCruncher.worker_pool = WorkerPool()
+        return PoolCruncher.worker_pool
+
+
+    @staticmethod
+    def can_be_used_with_simpack_grokker(simpack_grokker):
+        '''
+        Return whether `PoolCruncher` can be used with `simpack_grokker`.
+
+        For `PoolCruncher` to be usable, the `multiprocessing` module must be
+        installed. Assuming it's installed, `PoolCruncher` can be used if and
+        only if the simpack is not history-dependent.
+        '''
+
+        if not import_tools.exists('multiprocessing'):
+            return ReasonedBool(
+                False,
+                multiprocessing_missing_text
+            )
+
+        elif simpack_grokker.history_dependent:
+            return ReasonedBool(
+                False,
+                "`PoolCruncher` can't be used in history-dependent "
+                "simulations because processes don't share memory."
+            )
+
+        else:
+            return True
+
+
+    def start(self):
+        '''
+        Start the cruncher so it will start crunching and delivering states.
+        '''
+        self.worker.job_queue.put((self.job_number, self.project.simpack,
+                                   self.initial_state, self.crunching_profile))
+
+
+    def retire(self):
+        '''
+        Retire the cruncher. Process-safe.
+
+        Causes it to shut down as soon as it receives the order. The worker is
+        then reused for other crunchers.
+        '''
+        if self.job_finished or self.retired:
+            return
+        self.retired = True
+        self.worker.order_queue.put((self.job_number, 'retire'))
+        PoolCruncher.worker_pool.abandon_worker(self.worker)
+
+
+    def update_crunching_profile(self, profile):
+        '''Update the cruncher's crunching profile. Process-safe.'''
+        self.worker.order_queue.put((self.job_number, profile))
+
+
+    def is_alive(self):
+        '''Report whether the cruncher is alive and crunching.'''
+        return not (self.job_finished or self.retired) and \
+               self.worker.is_alive()
+
+
+    def _finish_job(self):
+        '''
+        Mark our job as finished, and return the worker to the pool.
+
+        This is called when the `JobFinishedMarker` is read from the work
+        queue.
+        '''
+        self.job_finished = True
+        PoolCruncher.worker_pool.release_worker(self.worker)
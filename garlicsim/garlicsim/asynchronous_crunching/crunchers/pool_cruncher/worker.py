@@ -0,0 +1,172 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `Worker` class.
+
+See its documentation for more info.
+'''
+
+from __future__ import with_statement
+
+import multiprocessing
+import Queue
+
+import garlicsim
+from garlicsim.asynchronous_crunching import ObsoleteCruncherError
+from garlicsim.asynchronous_crunching.misc import WorkQueueMeter
+from garlicsim.asynchronous_crunching.crunchers.process_cruncher.process \
+     import Process
+
+
+class JobFinishedMarker(object):
+    '''
+    A marker that a worker puts in its work queue after finishing a job.
+
+    The states that come before the marker belong to the finished job, and
+    the states that come after it belong to the worker's next job.
+    '''
+
+
+class CountingQueue(object):
+    '''
+    A `multiprocessing.Queue` that counts its items.
+
+    This makes `.qsize` work on all platforms, unlike
+    `multiprocessing.Queue.qsize`.
+    '''
+
+    def __init__(self, maxsize=0):
+
+        self.queue = multiprocessing.Queue(maxsize)
+        '''The underlying queue.'''
+
+        self._size = multiprocessing.Value('l', 0)
+        '''The number of items in the queue.'''
+
+
+    def put(self, item):
+        '''Put an item in the queue.'''
+        self.queue.put(item)
+        with self._size.get_lock():
+            self._size.value += 1
+
+
+    def get(self, block=True, timeout=None):
+        '''Remove and return an item from the queue.'''
+        item = self.queue.get(block, timeout)
+        with self._size.get_lock():
+            self._size.value -= 1
+        return item
+
+
+    def qsize(self):
+        '''Return the number of items in the queue.'''
+        return self._size.value
+
+
+class Worker(Process):
+    '''
+    A system process that crunches jobs for `PoolCruncher`s, one after another.
+
+    The worker waits for jobs on its `.job_queue`. Each job is crunched like a
+    `ProcessCruncher` would crunch it, and when the job is finished, the worker
+    puts a `JobFinishedMarker` in its `.work_queue` and waits for the next
+    job. Since the worker stays alive between jobs, and keeps the simpacks it
+    has imported, a job given to it starts crunching right away.
+    '''
+
+    def __init__(self):
+        # We're not calling `Process.__init__`, because we get our jobs
+        # later, through `.job_queue`.
+        multiprocessing.Process.__init__(self)
+
+        self.daemon = True
+
+        self.job_queue = multiprocessing.Queue()
+        '''
+        Queue for receiving jobs from the main process.
+
+        Each job is a tuple `(job_number, simpack, initial_state,
+        crunching_profile)`. `None` tells the worker to shut down.
+        '''
+
+        self.work_queue = CountingQueue()
+        '''
+        Queue for putting completed work to be picked up by the main thread.
+
+        In this queue the worker will put the states that it produces, in
+        chronological order. If it reaches a simulation end, it will put an
+        `EndMarker` in this queue. After each job it will put a
+        `JobFinishedMarker`.
+        '''
+
+        self.work_queue_meter = WorkQueueMeter(
+            multiprocessing.Value,
+            work_event=multiprocessing.Event()
+        )
+        '''Meter that measures and limits the flow through `.work_queue`.'''
+
+        self.order_queue = multiprocessing.Queue()
+        '''
+        Queue for receiving instructions from the main thread.
+
+        Each order is a tuple `(job_number, order)`. Orders for jobs other than
+        the current one are ignored.
+        '''
+
+        self.job_number = None
+        '''The number of the job that the worker is currently crunching.'''
+
+        self.chunk_size = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+        '''The maximal number of states put in `.work_queue` at once.'''
+
+        self.chunk_duration = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION
+        '''The maximal time, in seconds, that a state waits in a chunk.'''
+
+        self.history_browser = None
+        '''Always `None`; `PoolCruncher` refuses history-dependent simpacks.'''
+
+
+    def run(self):
+        '''
+        Internal method.
+
+        This is called when the worker is started. It crunches the jobs it
+        gets from `.job_queue` until it gets `None`.
+        '''
+        self.set_low_priority()
+        try:
+            while True:
+                job = self.job_queue.get()
+                if job is None:
+                    return
+                (self.job_number, simpack, self.initial_state,
+                 self.crunching_profile) = job
+                self.step_iterator_getter = \
+                    garlicsim.misc.SimpackGrokker(simpack).get_step_iterator
+                try:
+                    self.main_loop()
+                except ObsoleteCruncherError:
+                    pass
+                self.work_queue.put(JobFinishedMarker())
+                self.work_queue_meter.work_event.set()
+        finally:
+            self.work_queue_meter.work_event.set()
+
+
+    def get_order(self):
+        '''
+        Attempt to read an order for the current job from the `.order_queue`.
+
+        Returns the order, or `None` if there isn't one.
+        '''
+        while True:
+            try:
+                (job_number, order) = self.order_queue.get(block=False)
+            except Queue.Empty:
+                return None
+            if job_number == self.job_number:
+                return order
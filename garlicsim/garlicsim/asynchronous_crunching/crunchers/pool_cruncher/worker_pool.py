@@ -0,0 +1,133 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `WorkerPool` class.
+
+See its documentation for more info.
+'''
+
+import itertools
+import multiprocessing
+import Queue
+
+import garlicsim
+
+from .worker import Worker, JobFinishedMarker
+
+
+class WorkerPool(object):
+    '''
+    A pool of worker processes that are reused between `PoolCruncher`s.
+
+    The pool keeps up to `.size` idle workers. When a cruncher needs a worker
+    and none is idle, a new one is started, so every cruncher gets a worker
+    of its own right away. When there are more than `.size` workers, workers
+    are shut down as they become idle.
+
+    A worker becomes idle when the cruncher using it reads the
+    `JobFinishedMarker` from its work queue, which guarantees that no states
+    of the old job are left for the next cruncher. When a cruncher is retired
+    before its job is finished, its worker is "abandoned": The next time a
+    worker is needed, the pool discards the rest of the abandoned worker's
+    work, up to the marker, and then reuses it.
+    '''
+
+    def __init__(self, size=None):
+
+        self.size = size if size is not None else multiprocessing.cpu_count()
+        '''The number of workers that the pool keeps alive when idle.'''
+
+        self.workers = []
+        '''All the workers in the pool.'''
+
+        self.idle_workers = []
+        '''The workers which are waiting for a job.'''
+
+        self.abandoned_workers = []
+        '''The workers whose crunchers were retired before the job finished.'''
+
+        self.job_numbers = itertools.count()
+        '''Iterator giving a unique number for each job.'''
+
+
+    def warm_up(self):
+        '''
+        Start workers until the pool has `.size` workers.
+
+        This makes the first crunchers start crunching sooner, since their
+        workers will be already running.
+        '''
+        while len(self.workers) < self.size:
+            self.idle_workers.append(self.__start_worker())
+
+
+    def acquire_worker(self):
+        '''
+        Get a worker for a new job.
+
+        An idle worker is reused if there is one; otherwise a new worker is
+        started.
+        '''
+        self.__reclaim_abandoned_workers()
+        while self.idle_workers:
+            worker = self.idle_workers.pop()
+            if worker.is_alive():
+                return worker
+            self.workers.remove(worker)
+        return self.__start_worker()
+
+
+    def release_worker(self, worker):
+        '''
+        Return a worker to the pool.
+
+        Call this only after the worker's `JobFinishedMarker` was read from its
+        work queue.
+        '''
+        if not worker.is_alive():
+            self.workers.remove(worker)
+        elif len(self.workers) > self.size:
+            worker.job_queue.put(None)
+            self.workers.remove(worker)
+        else:
+            self.idle_workers.append(worker)
+
+
+    def abandon_worker(self, worker):
+        '''
+        Return a worker whose cruncher was retired before finishing its job.
+
+        The rest of the worker's work will be discarded.
+        '''
+        self.abandoned_workers.append(worker)
+
+
+    def __start_worker(self):
+        '''Start a new worker and add it to the pool.'''
+        worker = Worker()
+        worker.start()
+        self.workers.append(worker)
+        return worker
+
+
+    def __reclaim_abandoned_workers(self):
+        '''Release the abandoned workers that finished, discarding the work.'''
+        for worker in self.abandoned_workers[:]:
+            if not worker.is_alive():
+                self.abandoned_workers.remove(worker)
+                self.workers.remove(worker)
+                continue
+            while True:
+                try:
+                    thing = worker.work_queue.get(block=False)
+                except Queue.Empty:
+                    break
+                if isinstance(thing, JobFinishedMarker):
+                    self.abandoned_workers.remove(worker)
+                    self.release_worker(worker)
+                    break
+                elif isinstance(thing, list):
+                    worker.work_queue_meter.record_taken(len(thing))
+                elif isinstance(thing, garlicsim.data_structures.State):
+                    worker.work_queue_meter.record_taken(1)
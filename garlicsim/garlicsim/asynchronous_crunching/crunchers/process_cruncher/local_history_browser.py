@@ -0,0 +1,152 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `LocalHistoryBrowser` class.
+
+See its documentation for more info.
+'''
+
+from __future__ import with_statement
+
+from garlicsim.general_misc import binary_search
+
+import garlicsim.misc
+from garlicsim.asynchronous_crunching import HistoryBrowser
+
+
+__all__ = ['LocalHistoryBrowser']
+
+
+class LocalHistoryBrowser(garlicsim.misc.BaseHistoryBrowser):
+    '''
+    A history browser that keeps its own copy of the timeline.
+
+    This history browser is used by `ProcessCruncher` and `RemoteCruncher` in
+    history-dependent simulations. Their processes can't look at the tree in
+    the main process, so when the cruncher starts, it gets a copy of the end of
+    its timeline, and it adds each state that it crunches to it using
+    `.append`.
+
+    If `window` is `None`, the whole timeline is kept. Otherwise only the last
+    `window` states are kept, and asking for older states raises `IndexError`.
+    Positions in the timeline are always counted from the start of the
+    timeline, and `len` gives the length of the whole timeline, so the history
+    step function sees the same indices it would see with any other history
+    browser. `offset` is the position in the timeline of the first of the
+    given `states`.
+    '''
+
+    def __init__(self, states, offset=0, window=None):
+
+        assert states
+
+        self.window = window
+        '''The maximal number of states to keep, or `None` to keep them all.'''
+
+        self.__states = list(states)
+        '''
+        The states we have, in chronological order.
+
+        When there's a `.window`, states that fall out of it are removed only
+        once in a while, to keep `.append` cheap.
+        '''
+
+        self.__offset = offset
+        '''The position in the timeline of the first state in `.__states`.'''
+
+        self.__first_index = offset
+        '''The position in the timeline of the first state we may give.'''
+
+        self.__trim()
+
+
+    @staticmethod
+    def create_from_cruncher(cruncher):
+        '''
+        Create a `LocalHistoryBrowser` with a copy of a cruncher's timeline.
+
+        The cruncher must be registered in the crunching manager, so we can
+        find its timeline. If the simpack has a `HISTORY_WINDOW`, only that
+        many states are copied.
+        '''
+        window = cruncher.project.simpack_grokker.settings.HISTORY_WINDOW
+        history_browser = HistoryBrowser(cruncher)
+        with history_browser:
+            length = len(history_browser)
+            offset = 0 if window is None else max(length - window, 0)
+            states = [history_browser[index] for index in
+                      xrange(offset, length)]
+        return LocalHistoryBrowser(states, offset, window)
+
+
+    def append(self, state):
+        '''Add a state to the end of the timeline.'''
+        self.__states.append(state)
+        self.__trim()
+
+
+    def __trim(self):
+        '''Forget the states that fell out of the window.'''
+        if self.window is None:
+            return
+        length = len(self)
+        self.__first_index = max(length - self.window, self.__offset)
+        garbage = self.__first_index - self.__offset
+        # Deleting from the start of a list takes time proportional to its
+        # length, so we wait until there are as many old states as new ones:
+        if garbage >= self.window:
+            del self.__states[:garbage]
+            self.__offset = self.__first_index
+
+
+    def get_last_state(self):
+        '''Get the last state in the timeline. Identical to `[-1]`.'''
+        return self.__states[-1]
+
+
+    def __getitem__(self, index):
+        '''Get a state by its position in the timeline.'''
+        assert isinstance(index, int)
+        length = len(self)
+        if index < 0:
+            index += length
+        if not self.__first_index <= index < length:
+            raise IndexError('You asked for state number %s, while this '
+                             'history browser has states %s to %s.' % \
+                             (index, self.__first_index, length - 1))
+        return self.__states[index - self.__offset]
+
+
+    def get_state_by_monotonic_function(self, function, value,
+                                        rounding=binary_search.CLOSEST):
+        '''
+        Get a state by specifying a measure function and a desired value.
+
+        The function must be a monotonic rising function on the timeline.
+
+        Only the states in the window are searched.
+
+        See documentation of `binary_search.roundings` for details about
+        rounding options.
+        '''
+        assert issubclass(rounding, binary_search.Rounding)
+        states = self.__states
+        offset = self.__offset
+        result = binary_search.binary_search(
+            xrange(self.__first_index - offset, len(states)),
+            lambda index: function(states[index]),
+            value,
+            rounding
+        )
+        get_state = lambda index: states[index] if index is not None \
+                    else None
+        if rounding is binary_search.BOTH:
+            return tuple(get_state(index) for index in result)
+        else:
+            return get_state(result)
+
+
+    def __len__(self):
+        '''Get the length of the timeline in states.'''
+        return self.__offset + len(self.__states)
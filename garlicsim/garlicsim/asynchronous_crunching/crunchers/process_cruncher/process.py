@@ -20,6 +20,10 @@ except Exception:
 import garlicsim
 from garlicsim.asynchronous_crunching import \
      BaseCruncher, CrunchingProfile, ObsoleteCruncherError
+from garlicsim.asynchronous_crunching.misc import \
+     StateChunker, WorkQueueMeter
+
+from .shared_memory_queue import SharedMemoryQueue
 
 
 class Process(multiprocessing.Process):
@@ -30,7 +34,8 @@ class Process(multiprocessing.Process):
     # prevent us from getting the crunching manager as an argument, since it's
     # not pickleable.
     
-    def __init__(self, step_iterator_getter, initial_state, crunching_profile):        
+    def __init__(self, step_iterator_getter, initial_state, crunching_profile,
+                 shared_memory_size=None, work_event=None):
         multiprocessing.Process.__init__(self)
         
         self.step_iterator_getter = step_iterator_getter
@@ -47,19 +52,54 @@ class Process(multiprocessing.Process):
         
         self.daemon = True
 
-        self.work_queue = multiprocessing.Queue(
-            garlicsim.asynchronous_crunching.CRUNCHER_QUEUE_SIZE
-        )
+        if shared_memory_size is None:
+            self.work_queue = multiprocessing.Queue()
+        else:
+            self.work_queue = SharedMemoryQueue(shared_memory_size)
         '''
         Queue for putting completed work to be picked up by the main thread.
         
         In this queue the cruncher will put the states that it produces, in
-        chronological order. If the cruncher reaches a simulation ends, it will
-        put an `EndMarker` in this queue.
+        chronological order, either by themselves or in lists. (See
+        `StateChunker`.) If the cruncher reaches a simulation ends, it will put
+        an `EndMarker` in this queue.
+        
+        If `shared_memory_size` was given, this is a `SharedMemoryQueue` with a
+        ring buffer of that many bytes; otherwise it's a regular
+        `multiprocessing.Queue`.
+        '''
+        
+        self.work_queue_meter = WorkQueueMeter(
+            multiprocessing.Value,
+            work_event=(work_event if work_event is not None else
+                        multiprocessing.Event())
+        )
+        '''
+        Meter that measures and limits the flow through `.work_queue`.
+        
+        It sets `work_event`, which must be a `multiprocessing.Event`, when
+        there's work in `.work_queue`.
         '''
         
         self.order_queue = multiprocessing.Queue()
         '''Queue for receiving instructions from the main thread.'''
+        
+        self.chunk_size = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+        '''The maximal number of states put in `.work_queue` at once.'''
+        
+        self.chunk_duration = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION
+        '''The maximal time, in seconds, that a state waits in a chunk.'''
+        
+        self.history_browser = None
+        '''
+        `LocalHistoryBrowser` for history-dependent simulations, or `None`.
+        
+        `ProcessCruncher` sets this before starting the process. The process
+        crunches from it instead of from `.initial_state`, and adds the states
+        it crunches to it.
+        '''
     
         
     def set_low_priority(self):
@@ -88,16 +128,22 @@ class Process(multiprocessing.Process):
         '''
         Internal method.
         
-        This is called when the cruncher is started. It just calls the
-        `main_loop` method in a try clause, excepting `ObsoleteCruncherError`;
-        That exception means that the cruncher has been retired in the middle of
-        its job, so it is propagated up to this level, where it causes the
-        cruncher to terminate.
+        This is called when the cruncher is started. It sets a low priority for
+        the process, and then calls the `main_loop` method in a try clause,
+        excepting `ObsoleteCruncherError`; That exception means that the
+        cruncher has been retired in the middle of its job, so it is propagated
+        up to this level, where it causes the cruncher to terminate.
+        
+        However the cruncher terminates, it sets the work event, so the
+        crunching manager will notice.
         '''
+        self.set_low_priority()
         try:
             self.main_loop()
         except ObsoleteCruncherError:
             return
+        finally:
+            self.work_queue_meter.work_event.set()
 
         
     def main_loop(self):
@@ -126,26 +172,42 @@ class Process(multiprocessing.Process):
             recruit a new cruncher.
             
         '''
-        self.set_low_priority()
-        
         state = self.initial_state
         
         self.step_profile = self.crunching_profile.step_profile
         
-        self.iterator = self.step_iterator_getter(self.initial_state,
-                                                  self.step_profile)
+        history_browser = self.history_browser
+        
+        self.iterator = self.step_iterator_getter(
+            history_browser if history_browser is not None else
+            self.initial_state,
+            self.step_profile
+        )
         
-        order = None
+        state_chunker = StateChunker(self.work_queue, self.chunk_size,
+                                     self.chunk_duration,
+                                     self.work_queue_meter,
+                                     self.check_orders)
         
         try:
             for state in self.iterator:
-                self.work_queue.put(state)
-                self.check_crunching_profile(state)
-                order = self.get_order()
-                if order:
-                    self.process_order(order) 
+                if history_browser is not None:
+                    history_browser.append(state)
+                chunk_was_put = state_chunker.add(state)
+                try:
+                    self.check_crunching_profile(state)
+                except ObsoleteCruncherError:
+                    # We're done, so we deliver the states that we have left:
+                    state_chunker.flush()
+                    raise
+                # Checking for orders only when a chunk was put, because
+                # reading from `.order_queue` costs about as much as putting
+                # in `.work_queue`:
+                if chunk_was_put:
+                    self.check_orders()
         except garlicsim.misc.WorldEnded:
-            self.work_queue.put(
+            state_chunker.flush()
+            state_chunker.put(
                 garlicsim.asynchronous_crunching.misc.EndMarker()
             )
 
@@ -175,6 +237,13 @@ class Process(multiprocessing.Process):
             return None
     
         
+    def check_orders(self):
+        '''Process the order in the `.order_queue`, if one has been sent.'''
+        order = self.get_order()
+        if order:
+            self.process_order(order)
+    
+        
     def process_order(self, order):
         '''Process an order receieved from `.order_queue`.'''
         
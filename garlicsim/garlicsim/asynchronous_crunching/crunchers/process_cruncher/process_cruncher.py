@@ -16,6 +16,8 @@ from garlicsim.general_misc import import_tools
 import garlicsim
 from garlicsim.asynchronous_crunching import BaseCruncher
 
+from .local_history_browser import LocalHistoryBrowser
+
 
 multiprocessing_missing_text = (
     "`ProcessCruncher` can't be used because the "
@@ -43,6 +45,12 @@ class ProcessCruncher(BaseCruncher):
     The advantage of `ProcessCruncher` over `ThreadCruncher` is that
     `ProcessCruncher` is able to run on a different core of the processor in the
     machine, thus using the full power of the processor.
+    
+    In history-dependent simulations, the process can't look at the tree, so
+    when the cruncher starts it gives the process a copy of its timeline in a
+    `LocalHistoryBrowser`, and the process adds the states it crunches to that
+    copy. If the simpack's `HISTORY_WINDOW` setting is a number, only that many
+    states from the end of the timeline are copied and kept.
     '''
     
     
@@ -55,10 +63,26 @@ class ProcessCruncher(BaseCruncher):
      - Able to run on a different core of the processor than the main process 
        or other ProcessCrunchers, thus utilizing the full power of the
        processor.
+    
+     - Able to handle simulations that are history-dependent, by keeping a
+       copy of the timeline in the process.
      '''
     )
     
     
+    shared_memory_size = None
+    '''
+    Size in bytes of a shared memory buffer for moving states, or `None`.
+    
+    By default, the process sends its states to the main process through a
+    `multiprocessing.Queue`. If you set this to a number of bytes, (in a
+    subclass, or on `ProcessCruncher` itself,) the states will be sent through
+    a `SharedMemoryQueue` with a ring buffer of that size instead. This is
+    faster for big states, especially ones keeping their data in
+    `array.array` objects. The buffer should have room for many states.
+    '''
+    
+    
     def __init__(self, crunching_manager, initial_state, crunching_profile):
         
         BaseCruncher.__init__(self, crunching_manager, initial_state, 
@@ -72,7 +96,9 @@ class ProcessCruncher(BaseCruncher):
         self.process = Process(
             self.project.simpack_grokker.get_step_iterator,
             initial_state,
-            crunching_profile
+            crunching_profile,
+            shared_memory_size=self.shared_memory_size,
+            work_event=crunching_manager.work_event
         )
         '''The actual process which does the crunching.'''
         
@@ -85,8 +111,14 @@ class ProcessCruncher(BaseCruncher):
         put an `EndMarker` in this queue.
         '''
         
+        self.work_queue_meter = self.process.work_queue_meter
+        '''Meter that measures and limits the flow through `.work_queue`.'''
+        
         self.order_queue = self.process.order_queue
         '''Queue for receiving instructions from the main thread.'''
+        
+        self.history_dependent = self.project.simpack_grokker.history_dependent
+        '''Flag saying whether the simulation is history-dependent.'''
      
     
     @staticmethod
@@ -95,8 +127,7 @@ class ProcessCruncher(BaseCruncher):
         Return whether `ProcessCruncher` can be used with `simpack_grokker`.
         
         For `ProcessCruncher` to be usable, the `multiprocessing` module must be
-        installed. Assuming it's installed, `ProcessCruncher` can be used if and
-        only if the simpack is not history-dependent.
+        installed.
         '''
         
         if not import_tools.exists('multiprocessing'):
@@ -105,13 +136,6 @@ class ProcessCruncher(BaseCruncher):
                 multiprocessing_missing_text
             )
         
-        elif simpack_grokker.history_dependent:
-            return ReasonedBool(
-                False,
-                "`ProcessCruncher` can't be used in history-dependent "
-                "simulations because processes don't share memory."
-            )
-        
         else:
             return True
 
@@ -119,7 +143,13 @@ class ProcessCruncher(BaseCruncher):
     def start(self):
         '''
         Start the cruncher so it will start crunching and delivering states.
+        
+        In history-dependent simulations, the cruncher must already be
+        registered in the crunching manager, so we can find our timeline.
         '''
+        if self.history_dependent:
+            self.process.history_browser = \
+                LocalHistoryBrowser.create_from_cruncher(self)
         self.process.start()
 
             
@@ -0,0 +1,233 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `SharedMemoryQueue` class.
+
+See its documentation for more info.
+'''
+
+from __future__ import with_statement
+
+import array
+import ctypes
+import multiprocessing
+import cPickle
+import cStringIO
+
+from garlicsim.asynchronous_crunching.misc.work_queue_meter import \
+     STALL_POLL_INTERVAL
+
+
+class SharedMemoryQueue(object):
+    '''
+    A queue from one process to another that moves items via shared memory.
+
+    This can be used instead of `multiprocessing.Queue` when the items are big,
+    like the states of a simulation with a big world. `multiprocessing.Queue`
+    pickles every item and pushes the pickle through a pipe, which copies it
+    into the kernel and out of it in chunks. `SharedMemoryQueue` writes the
+    pickle into a ring buffer in shared memory instead, and sends only its
+    position in the buffer through a `multiprocessing.Queue`.
+
+    Also, `array.array` objects inside the items aren't pickled at all: Their
+    memory is copied as is into the ring buffer, after the pickle, and copied
+    right back into new arrays by the receiving process. (Pickling an array
+    converts it to a list first, which is very slow for big arrays.) So if
+    your states have big buffers, keep them in arrays to benefit from this.
+    An array that the item refers to more than once is copied once, and the
+    received item refers to its copy as many times.
+
+    Items that don't fit in the ring buffer are sent through the
+    `multiprocessing.Queue` in the usual way.
+
+    Only one process may put items in the queue, and only one process may get
+    items from it.
+    '''
+
+    put_takes_check_orders = True
+    '''Flag saying that `.put` takes a `check_orders` function.'''
+
+    def __init__(self, buffer_size, maxsize=0):
+
+        self.buffer_size = buffer_size
+        '''The size of the ring buffer, in bytes.'''
+
+        self.buffer = multiprocessing.RawArray(ctypes.c_char, buffer_size)
+        '''The ring buffer, in shared memory.'''
+
+        self.record_queue = multiprocessing.Queue(maxsize)
+        '''
+        Queue for sending the positions of the items in the ring buffer.
+
+        Each record is a tuple `(offset, pickle_length, array_specs,
+        end_position)`, where `array_specs` is a list of `(typecode, length)`
+        of the arrays that were stored after the pickle. For an item that was
+        too big for the ring buffer, the record is `(None, item)`.
+        '''
+
+        self.read_position = multiprocessing.Value(ctypes.c_ulonglong, 0)
+        '''
+        The position in the ring buffer up to which the items were read.
+
+        This, like `._write_position`, is a position in an imaginary endless
+        buffer, which is wrapped around the ring buffer.
+        '''
+
+        self.room_condition = multiprocessing.Condition()
+        '''
+        Condition for waiting until there's room in the ring buffer.
+
+        `.read_position` is changed only while holding it, and the putting
+        process is notified when it changes.
+        '''
+
+        self._size = multiprocessing.Value(ctypes.c_long, 0)
+        '''The number of items in the queue.'''
+
+        self._write_position = 0
+        '''
+        The position in the ring buffer after the last item that was put.
+
+        This is used only by the putting process.
+        '''
+
+
+    def put(self, item, check_orders=None):
+        '''
+        Put an item in the queue.
+
+        If the ring buffer doesn't have enough free room for the item, this
+        blocks until the receiving process makes room by getting items. While
+        waiting, `check_orders` is called every `STALL_POLL_INTERVAL` seconds,
+        if given, like in `WorkQueueMeter.wait_for_room`, because a retired
+        cruncher's queue isn't read anymore.
+        '''
+        arrays = []
+        array_numbers = {}
+        def persistent_id(thing):
+            if isinstance(thing, array.array):
+                # Pickle doesn't memoize persistent objects, so we do it, to
+                # keep references to the same array:
+                try:
+                    return array_numbers[id(thing)]
+                except KeyError:
+                    array_numbers[id(thing)] = len(arrays)
+                    arrays.append(thing)
+                    return len(arrays) - 1
+            return None
+
+        string_io = cStringIO.StringIO()
+        pickler = cPickle.Pickler(string_io, 2)
+        # `inst_persistent_id` is called only for objects that aren't of the
+        # basic types, so it's cheaper than `persistent_id`:
+        pickler.inst_persistent_id = persistent_id
+        pickler.dump(item)
+        pickle_string = string_io.getvalue()
+
+        array_specs = [(array_.typecode, len(array_)) for array_ in arrays]
+        length = len(pickle_string) + \
+                 sum(array_.itemsize * len(array_) for array_ in arrays)
+
+        if length > self.buffer_size:
+            record = (None, item)
+
+        else:
+            offset = self.__reserve(length, check_orders)
+            base_address = ctypes.addressof(self.buffer)
+            ctypes.memmove(base_address + offset, pickle_string,
+                           len(pickle_string))
+            position = offset + len(pickle_string)
+            for array_ in arrays:
+                (address, array_length) = array_.buffer_info()
+                number_of_bytes = array_length * array_.itemsize
+                ctypes.memmove(base_address + position, address,
+                               number_of_bytes)
+                position += number_of_bytes
+
+            record = (offset, len(pickle_string), array_specs,
+                      self._write_position)
+
+        # Counting the item before it's published, so `.qsize` won't be
+        # negative if the receiving process gets it right away:
+        with self._size.get_lock():
+            self._size.value += 1
+        self.record_queue.put(record)
+
+
+    def __reserve(self, length, check_orders=None):
+        '''
+        Reserve `length` contiguous bytes in the ring buffer.
+
+        Waits until there is enough free room, calling `check_orders` while
+        waiting. Returns the offset of the reserved bytes in the ring buffer.
+        '''
+        offset = self._write_position % self.buffer_size
+        if offset + length > self.buffer_size:
+            # The item doesn't fit before the end of the ring buffer, so we
+            # skip to its start:
+            self._write_position += self.buffer_size - offset
+            offset = 0
+        end_position = self._write_position + length
+        if end_position - self.read_position.value > self.buffer_size:
+            with self.room_condition:
+                while end_position - self.read_position.value > \
+                      self.buffer_size:
+                    if check_orders is not None:
+                        check_orders()
+                    self.room_condition.wait(STALL_POLL_INTERVAL)
+        self._write_position = end_position
+        return offset
+
+
+    def get(self, block=True, timeout=None):
+        '''
+        Remove and return an item from the queue.
+
+        Raises `Queue.Empty` if no item is available, like `Queue.Queue.get`.
+        '''
+        record = self.record_queue.get(block, timeout)
+        with self._size.get_lock():
+            self._size.value -= 1
+
+        if record[0] is None:
+            (_, item) = record
+            return item
+
+        (offset, pickle_length, array_specs, end_position) = record
+        base_address = ctypes.addressof(self.buffer)
+        pickle_string = ctypes.string_at(base_address + offset, pickle_length)
+
+        arrays = []
+        position = offset + pickle_length
+        for (typecode, array_length) in array_specs:
+            array_ = array.array(typecode)
+            number_of_bytes = array_length * array_.itemsize
+            array_.fromstring(
+                ctypes.string_at(base_address + position, number_of_bytes)
+            )
+            arrays.append(array_)
+            position += number_of_bytes
+
+        # We copied everything we need out of the ring buffer, so we can let
+        # the putting process reuse that space:
+        with self.room_condition:
+            self.read_position.value = end_position
+            self.room_condition.notify()
+
+        if not arrays:
+            return cPickle.loads(pickle_string)
+        unpickler = cPickle.Unpickler(cStringIO.StringIO(pickle_string))
+        unpickler.persistent_load = arrays.__getitem__
+        return unpickler.load()
+
+
+    def qsize(self):
+        '''Return the number of items in the queue.'''
+        return self._size.value
+
+
+    def empty(self):
+        '''Return whether the queue is empty.'''
+        return self.qsize() == 0
+
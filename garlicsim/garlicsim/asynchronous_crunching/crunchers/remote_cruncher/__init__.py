@@ -0,0 +1,14 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This package defines the `RemoteCruncher` class.
+
+See its documentation for more information.
+
+`RemoteCruncher` crunches on worker servers, which may be on other machines.
+To run a worker server, see the `worker_server` module. The worker server
+needs the `multiprocessing` package, like `ProcessCruncher`.
+'''
+
+from .remote_cruncher import RemoteCruncher
@@ -0,0 +1,144 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `Connection` class.
+
+See its documentation for more info.
+'''
+
+from __future__ import with_statement
+
+import os
+import stat
+import socket
+import struct
+import threading
+import cPickle
+
+
+header = struct.Struct('!I')
+'''The header of a message, which is the length of the pickled message.'''
+
+
+def _is_unix_address(address):
+    '''Return whether `address` is a Unix socket path, rather than TCP.'''
+    return isinstance(address, basestring)
+
+
+def _make_socket(address):
+    '''
+    Make a socket for `address`.
+
+    `address` is either a tuple `(host, port)` for TCP, or the path of a Unix
+    socket.
+    '''
+    family = socket.AF_UNIX if _is_unix_address(address) else socket.AF_INET
+    return socket.socket(family, socket.SOCK_STREAM)
+
+
+def listen(address):
+    '''
+    Make a socket that listens on `address`.
+
+    `address` is either a tuple `(host, port)` for TCP, or the path of a Unix
+    socket. A stale Unix socket file at that path is removed first.
+    '''
+    socket_ = _make_socket(address)
+    if _is_unix_address(address):
+        if os.path.exists(address) and \
+           stat.S_ISSOCK(os.stat(address).st_mode):
+            os.remove(address)
+    else:
+        socket_.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    socket_.bind(address)
+    socket_.listen(5)
+    return socket_
+
+
+class Connection(object):
+    '''
+    A connection over a socket, on which pickleable objects are sent.
+
+    Each object is sent as a message made of a `header` with its length, and
+    then the object pickled. Sending is thread-safe, and one thread may
+    receive while another sends.
+
+    A `Connection` may be used as a work queue: `.put` sends the object.
+    '''
+
+    def __init__(self, socket_):
+
+        self.socket = socket_
+        '''The connected socket.'''
+
+        self.file = socket_.makefile('rb')
+        '''File for reading from the socket.'''
+
+        self.__send_lock = threading.Lock()
+        '''Lock that keeps messages sent by different threads apart.'''
+
+        if socket_.family != getattr(socket, 'AF_UNIX', None):
+            # Without this, small messages wait for acknowledgements:
+            socket_.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+    @staticmethod
+    def connect(address, timeout=None):
+        '''
+        Connect to `address`, and return a `Connection`.
+
+        `address` is either a tuple `(host, port)` for TCP, or the path of a
+        Unix socket. If connecting takes more than `timeout` seconds,
+        `socket.error` is raised.
+        '''
+        socket_ = _make_socket(address)
+        socket_.settimeout(timeout)
+        try:
+            socket_.connect(address)
+        except Exception:
+            socket_.close()
+            raise
+        socket_.settimeout(None)
+        return Connection(socket_)
+
+
+    def send(self, thing):
+        '''Send `thing` over the connection.'''
+        data = cPickle.dumps(thing, cPickle.HIGHEST_PROTOCOL)
+        with self.__send_lock:
+            self.socket.sendall(header.pack(len(data)) + data)
+
+    put = send
+
+
+    def receive(self):
+        '''
+        Receive an object from the connection.
+
+        Raises `EOFError` if the connection was closed.
+        '''
+        (length,) = header.unpack(self.__read(header.size))
+        return cPickle.loads(self.__read(length))
+
+
+    def __read(self, size):
+        '''Read exactly `size` bytes, raising `EOFError` if we can't.'''
+        data = self.file.read(size)
+        if len(data) < size:
+            raise EOFError('The connection was closed.')
+        return data
+
+
+    def close(self):
+        '''
+        Close the connection.
+
+        A thread that's waiting in `.receive` gets `EOFError`.
+        '''
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.file.close()
+        self.socket.close()
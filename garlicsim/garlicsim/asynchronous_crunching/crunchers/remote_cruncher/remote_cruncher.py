@@ -0,0 +1,337 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `RemoteCruncher` class.
+
+See its documentation for more information.
+'''
+
+from __future__ import with_statement
+
+import threading
+import time
+import itertools
+import socket
+import types
+import Queue
+
+from garlicsim.general_misc.reasoned_bool import ReasonedBool
+from garlicsim.general_misc import string_tools
+
+import garlicsim
+from garlicsim.asynchronous_crunching import (BaseCruncher,
+                                              ObsoleteCruncherError)
+from garlicsim.asynchronous_crunching.misc import EndMarker, WorkQueueMeter
+from garlicsim.asynchronous_crunching.crunchers.process_cruncher.\
+     local_history_browser import LocalHistoryBrowser
+
+from .connection import Connection
+
+
+__all__ = ['RemoteCruncher']
+
+
+class RemoteCruncher(threading.Thread, BaseCruncher):
+    '''
+    Cruncher that crunches on a worker server, possibly on another machine.
+
+    A cruncher is a worker which crunches the simulation. It receives a state
+    from the main program, and then it repeatedly applies the step function of
+    the simulation to produce more states. Those states are then put in the
+    cruncher's `.work_queue`. They are then taken by the main program when
+    `Project.sync_crunchers` is called, and put into the tree.
+
+    Read more about crunchers in the documentation of the `crunchers` package.
+
+    `RemoteCruncher` connects to one of the `.worker_addresses`, where a
+    `WorkerServer` is listening, and sends it the job. The worker server
+    crunches the job in a process of its own, and sends the states back over
+    the connection in chunks. The cruncher's thread receives them and puts
+    them in `.work_queue`. Orders, (retiring and updating the crunching
+    profile,) are sent over the connection too.
+
+    The cruncher connects to the worker in its own thread. The workers are
+    used in turn. A worker that can't be connected to is skipped, and isn't
+    tried again for `.reconnect_interval` seconds; if no worker can be
+    connected to, the cruncher waits that long and tries again, until it's
+    retired. If the connection breaks, (for example because the worker
+    died,) the cruncher stops being alive, and the crunching manager creates a
+    new cruncher for the job, which connects to another worker.
+
+    The cruncher's `.work_queue_meter` measures the flow of states that we
+    receive. When `.work_queue` is full, we stop receiving, which makes the
+    worker wait too.
+    '''
+
+    gui_explanation = string_tools.docstring_trim(
+    '''
+    `RemoteCruncher`:
+
+     - Works from worker servers, which may be on other machines.
+
+     - Relieves this computer of the CPU stress, and allows crunching many
+       forks of the tree in parallel on many machines.
+
+     - Requires worker servers to be running, and `RemoteCruncher` to be
+       told their addresses.
+    '''
+    )
+
+
+    worker_addresses = []
+    '''
+    The addresses of the worker servers that we may crunch on.
+
+    Each address is either a tuple `(host, port)` for TCP, or the path of a
+    Unix socket. Set this (in a subclass, or on `RemoteCruncher` itself) to
+    use `RemoteCruncher`.
+    '''
+
+
+    connect_timeout = 5
+    '''The time in seconds that we try to connect to a worker server.'''
+
+
+    reconnect_interval = 5
+    '''
+    The time in seconds that we wait before trying a worker server again.
+
+    This is how long a worker server that we failed to connect to is skipped,
+    and how long we wait before trying again when we can't connect to any.
+    '''
+
+
+    _address_numbers = itertools.count()
+    '''Counter used for using the worker servers in turn.'''
+
+
+    _failure_times = {}
+    '''Map from address to the time we last failed to connect to it.'''
+
+
+    def __init__(self, crunching_manager, initial_state, crunching_profile):
+        BaseCruncher.__init__(self, crunching_manager, initial_state,
+                              crunching_profile)
+        threading.Thread.__init__(self)
+
+        self.daemon = True
+
+        self.history_dependent = self.project.simpack_grokker.history_dependent
+        '''Flag saying whether the simulation is history-dependent.'''
+
+        self.connection = None
+        '''The `Connection` to the worker server, once we're connected.'''
+
+        self.address = None
+        '''The address of the worker server, once we're connected.'''
+
+        self.history_browser = None
+        '''
+        The history browser that we send to the worker server.
+
+        This is `None` unless the simulation is history-dependent.
+        '''
+
+        self.connection_lock = threading.Lock()
+        '''Lock that protects the connection from being used by two threads.'''
+
+        self.retired_event = threading.Event()
+        '''Event that is set when the cruncher is retired.'''
+
+        self.work_queue = Queue.Queue()
+        '''
+        Queue for putting completed work to be picked up by the main thread.
+
+        In this queue the cruncher will put the states that it receives, in
+        chronological order, either by themselves or in lists. (See
+        `StateChunker`.) If the worker reaches a simulation end, the cruncher
+        will put an `EndMarker` in this queue.
+        '''
+
+        self.work_queue_meter = WorkQueueMeter(
+            work_event=crunching_manager.work_event
+        )
+        '''
+        Meter that measures and limits the flow through `.work_queue`.
+
+        The time that it reports as crunch time is the time we waited for
+        states to arrive from the worker.
+        '''
+
+
+    @classmethod
+    def can_be_used_with_simpack_grokker(cls, simpack_grokker):
+        '''
+        Return whether this cruncher type can be used with `simpack_grokker`.
+
+        It can be used if it was given `.worker_addresses`, and the simpack is
+        a module, which the worker servers can import.
+        '''
+
+        if not cls.worker_addresses:
+            return ReasonedBool(
+                False,
+                "`%s` can't be used because it wasn't given the addresses of "
+                "any worker servers in `.worker_addresses`." % cls.__name__
+            )
+
+        elif not isinstance(simpack_grokker.simpack, types.ModuleType):
+            return ReasonedBool(
+                False,
+                "`%s` can't be used because the simpack isn't a module, so "
+                "worker servers can't import it." % cls.__name__
+            )
+
+        else:
+            return True
+
+
+    def start(self):
+        '''
+        Start the cruncher so it will start crunching and delivering states.
+
+        The cruncher connects to a worker server in its own thread, so this
+        doesn't wait for the connection.
+
+        In history-dependent simulations, the cruncher must already be
+        registered in the crunching manager, so we can find our timeline.
+        '''
+        self.history_browser = \
+            LocalHistoryBrowser.create_from_cruncher(self) if \
+            self.history_dependent else None
+        threading.Thread.start(self)
+
+
+    def __connect(self):
+        '''
+        Connect to the next worker server that we can connect to.
+
+        Worker servers that we failed to connect to in the last
+        `.reconnect_interval` seconds are skipped. Returns the `Connection`,
+        or `None` if we couldn't connect to any.
+        '''
+        worker_addresses = self.worker_addresses
+        for i in xrange(len(worker_addresses)):
+            address = worker_addresses[
+                RemoteCruncher._address_numbers.next() % len(worker_addresses)
+            ]
+            failure_time = RemoteCruncher._failure_times.get(address)
+            if failure_time is not None and \
+               time.time() - failure_time < self.reconnect_interval:
+                continue
+            try:
+                connection = Connection.connect(address, self.connect_timeout)
+            except socket.error:
+                RemoteCruncher._failure_times[address] = time.time()
+                continue
+            RemoteCruncher._failure_times.pop(address, None)
+            self.address = address
+            return connection
+        return None
+
+
+    def __connect_and_send_job(self):
+        '''
+        Connect to a worker server and send it the job.
+
+        If we can't, we wait and try again, until we succeed or are retired.
+        Returns whether we succeeded.
+        '''
+        while not self.retired_event.isSet():
+            connection = self.__connect()
+            if connection is not None:
+                with self.connection_lock:
+                    if self.retired_event.isSet():
+                        connection.close()
+                        return False
+                    try:
+                        connection.send((self.project.simpack,
+                                         self.initial_state,
+                                         self.history_browser,
+                                         self.crunching_profile))
+                    except socket.error:
+                        connection.close()
+                        continue
+                    self.connection = connection
+                    return True
+            self.retired_event.wait(self.reconnect_interval)
+        return False
+
+
+    def run(self):
+        '''
+        Internal method.
+
+        This is called when the cruncher is started. It connects to a worker
+        server, and then puts the work that we receive from it in
+        `.work_queue`, until the connection is closed.
+        '''
+        try:
+            if not self.__connect_and_send_job():
+                return
+            work_queue_meter = self.work_queue_meter
+            work_queue_meter.start_clock()
+            try:
+                while True:
+                    try:
+                        thing = self.connection.receive()
+                    except (EOFError, socket.error):
+                        return
+                    if isinstance(thing, EndMarker):
+                        self.work_queue.put(thing)
+                        continue
+                    states = thing if isinstance(thing, list) else [thing]
+                    work_queue_meter.wait_for_room(states,
+                                                   self.__check_retired)
+                    self.work_queue.put(thing)
+                    work_queue_meter.record_put(len(states))
+            finally:
+                self.connection.close()
+        except ObsoleteCruncherError:
+            return
+        finally:
+            self.work_queue_meter.work_event.set()
+
+
+    def __check_retired(self):
+        '''Raise `ObsoleteCruncherError` if the cruncher was retired.'''
+        if self.retired_event.isSet():
+            raise ObsoleteCruncherError("Cruncher was retired; shutting "
+                                        "down.")
+
+
+    def retire(self):
+        '''
+        Retire the cruncher. Thread-safe.
+
+        Causes the worker server to stop crunching as soon as it receives the
+        order. If we're not connected yet, we stop trying to connect.
+        '''
+        with self.connection_lock:
+            self.retired_event.set()
+            self.__send_order('retire')
+
+
+    def update_crunching_profile(self, profile):
+        '''Update the cruncher's crunching profile. Thread-safe.'''
+        with self.connection_lock:
+            # If we're not connected yet, the worker server will get the new
+            # profile with the job:
+            self.crunching_profile = profile
+            self.__send_order(profile)
+
+
+    def __send_order(self, order):
+        '''Send an order to the worker server, if we're connected.'''
+        if self.connection is None:
+            return
+        try:
+            self.connection.send(order)
+        except socket.error:
+            # The connection broke, so we'll stop being alive.
+            pass
+
+
+    is_alive = threading.Thread.isAlive
+    '''Crutch for Python 2.5 and below.'''
@@ -0,0 +1,125 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `Session` class.
+
+See its documentation for more info.
+'''
+
+import multiprocessing
+import threading
+import socket
+import Queue
+
+import garlicsim
+from garlicsim.asynchronous_crunching import ObsoleteCruncherError
+from garlicsim.asynchronous_crunching.crunchers.process_cruncher.process \
+     import Process
+
+from .connection import Connection
+
+
+class Session(Process):
+    '''
+    A system process that crunches a job for a `RemoteCruncher`.
+
+    The worker server starts a session for every connection it accepts. The
+    session receives its job from the connection as a tuple `(simpack,
+    initial_state, history_browser, crunching_profile)`, and crunches it like
+    `ProcessCruncher` would, sending the states it makes back over the
+    connection in chunks. (See `StateChunker`.) The orders of `ProcessCruncher`
+    are received over the connection too.
+
+    The session ends when the job is done or it was retired. If the
+    connection is closed, it's retired.
+    '''
+
+    def __init__(self, socket_):
+        # We're not calling `Process.__init__`, because we get our job
+        # later, through the connection.
+        multiprocessing.Process.__init__(self)
+
+        self.daemon = True
+
+        self.socket = socket_
+        '''The socket connected to the `RemoteCruncher`.'''
+
+        self.connection = None
+        '''The `Connection` over `.socket`. Made when the session starts.'''
+
+        self.work_queue = None
+        '''
+        Where we put completed work. This is `.connection`.
+
+        In this queue the session will put the states that it produces, in
+        chronological order, either by themselves or in lists. If it reaches a
+        simulation end, it will put an `EndMarker` in this queue.
+        '''
+
+        self.work_queue_meter = None
+        '''
+        Always `None`.
+
+        The flow of states is measured and limited by the `RemoteCruncher`.
+        When it stops reading, the connection stops us.
+        '''
+
+        self.order_queue = Queue.Queue()
+        '''Queue of the orders received from the connection.'''
+
+        self.chunk_size = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+        '''The maximal number of states sent at once.'''
+
+        self.chunk_duration = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION
+        '''The maximal time, in seconds, that a state waits in a chunk.'''
+
+        self.history_browser = None
+        '''
+        `LocalHistoryBrowser` for history-dependent simulations, or `None`.
+        '''
+
+
+    def run(self):
+        '''
+        Internal method.
+
+        This is called when the session is started. It receives the job from
+        the connection, and crunches it.
+        '''
+        self.set_low_priority()
+        self.work_queue = self.connection = Connection(self.socket)
+        try:
+            (simpack, self.initial_state, self.history_browser,
+             self.crunching_profile) = self.connection.receive()
+            self.step_iterator_getter = \
+                garlicsim.misc.SimpackGrokker(simpack).get_step_iterator
+            order_thread = threading.Thread(target=self.receive_orders)
+            order_thread.setDaemon(True)
+            order_thread.start()
+            try:
+                self.main_loop()
+            except ObsoleteCruncherError:
+                pass
+        except (EOFError, socket.error):
+            # The `RemoteCruncher` is gone.
+            pass
+        finally:
+            self.connection.close()
+
+
+    def receive_orders(self):
+        '''
+        Put the orders received from the connection in `.order_queue`.
+
+        When the connection is closed, we retire.
+        '''
+        try:
+            while True:
+                self.order_queue.put(self.connection.receive())
+        except Exception:
+            # The connection was closed, either by the `RemoteCruncher` or by
+            # us when we're done.
+            self.order_queue.put('retire')
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `WorkerServer` class.
+
+See its documentation for more info.
+
+To run a worker server from the command line:
+
+    python worker_server.py [host:port | unix_socket_path]
+
+The default is to listen on port `DEFAULT_PORT` of `localhost`. The simpacks
+that the `RemoteCruncher`s use must be importable on the worker's machine.
+
+Warning: Jobs and states are sent as pickles, and unpickling data can run
+arbitrary code. Let only trusted machines connect to a worker server.
+'''
+
+import sys
+import os
+import socket
+
+from garlicsim.asynchronous_crunching.crunchers.remote_cruncher.connection \
+     import listen
+from garlicsim.asynchronous_crunching.crunchers.remote_cruncher.session \
+     import Session
+
+
+DEFAULT_PORT = 25100
+'''The port that a worker server listens on by default.'''
+
+
+class WorkerServer(object):
+    '''
+    A server that crunches jobs for `RemoteCruncher`s.
+
+    The server listens on `address`, which is either a tuple `(host, port)`
+    for TCP, or the path of a Unix socket. For every connection it accepts, it
+    starts a `Session` process that crunches the job that the `RemoteCruncher`
+    sends. Use port 0 to listen on any free port; `.address` is the address
+    that we actually listen on.
+
+    Call `.serve_forever` to start serving, and `.shutdown` (from another
+    thread) to stop. Stopping terminates the sessions, and their
+    `RemoteCruncher`s will see their connections closed.
+    '''
+
+    def __init__(self, address):
+
+        self.socket = listen(address)
+        '''The socket that we listen on.'''
+
+        self.address = self.socket.getsockname()
+        '''The address that we listen on.'''
+
+        self.sessions = []
+        '''The sessions that we started, which may still be running.'''
+
+        self.shutting_down = False
+        '''Flag saying whether `.shutdown` was called.'''
+
+
+    def serve_forever(self):
+        '''Accept connections and crunch their jobs, until `.shutdown`.'''
+        while not self.shutting_down:
+            try:
+                (socket_, address) = self.socket.accept()
+            except socket.error:
+                if self.shutting_down:
+                    return
+                raise
+            session = Session(socket_)
+            session.start()
+            # The session has its own copy of the socket:
+            socket_.close()
+            self.sessions = [session_ for session_ in self.sessions if
+                             session_.is_alive()] + [session]
+
+
+    def shutdown(self):
+        '''Stop serving, and terminate the sessions.'''
+        self.shutting_down = True
+        try:
+            # This makes `.accept` in `.serve_forever` return:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.socket.close()
+        for session in self.sessions:
+            if session.is_alive():
+                session.terminate()
+                session.join()
+        if isinstance(self.address, basestring) and \
+           os.path.exists(self.address):
+            os.remove(self.address)
+
+
+def parse_address(string):
+    '''
+    Parse an address given on the command line.
+
+    `'host:port'` gives a TCP address. Anything else is a Unix socket path.
+    '''
+    (host, colon, port) = string.rpartition(':')
+    if colon and port.isdigit():
+        return (host, int(port))
+    else:
+        return string
+
+
+def main():
+    '''Run a worker server, listening on the address given in `sys.argv`.'''
+    address = parse_address(sys.argv[1]) if len(sys.argv) >= 2 \
+              else ('localhost', DEFAULT_PORT)
+    worker_server = WorkerServer(address)
+    print('Crunching for `RemoteCruncher`s on %s.' % (worker_server.address,))
+    try:
+        worker_server.serve_forever()
+    except KeyboardInterrupt:
+        worker_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,8 @@ from garlicsim.general_misc import string_tools
 import garlicsim
 from garlicsim.asynchronous_crunching import \
      BaseCruncher, HistoryBrowser, ObsoleteCruncherError, CrunchingProfile
+from garlicsim.asynchronous_crunching.misc import \
+     StateChunker, WorkQueueMeter
 
 
 __all__ = ['ThreadCruncher']
@@ -34,10 +36,10 @@ class ThreadCruncher(threading.Thread, BaseCruncher):
     Read more about crunchers in the documentation of the `crunchers` package.
     
     The advantages of `ThreadCruncher` over `ProcessCruncher` are:
-    1. `ThreadCruncher` is able to handle simulations that are
-       history-dependent, which would have been very hard to implement in a 
-       Process, since processes don't share memory, while threads do share
-       memory trivially.
+    1. In simulations that are history-dependent, `ThreadCruncher` looks at
+       the timeline in the tree directly, since threads share memory, while
+       `ProcessCruncher` has to copy the timeline into its process when it
+       starts.
     2. `ThreadCruncher` is based on the `threading` module, which is stabler
        and more mature than the `multiprocessing` module.
     3. `ThreadCruncher` is much easier to debug than `ProcessCruncher`, since
@@ -87,20 +89,38 @@ class ThreadCruncher(threading.Thread, BaseCruncher):
         
         self.daemon = True
 
-        self.work_queue = Queue.Queue(
-            garlicsim.asynchronous_crunching.CRUNCHER_QUEUE_SIZE
-        )
+        self.work_queue = Queue.Queue()
         '''
         Queue for putting completed work to be picked up by the main thread.
         
         In this queue the cruncher will put the states that it produces, in
-        chronological order. If the cruncher reaches a simulation ends, it will
-        put an `EndMarker` in this queue.
+        chronological order, either by themselves or in lists. (See
+        `StateChunker`.) If the cruncher reaches a simulation ends, it will put
+        an `EndMarker` in this queue.
         '''
 
+        self.work_queue_meter = WorkQueueMeter(
+            work_event=crunching_manager.work_event
+        )
+        '''Meter that measures and limits the flow through `.work_queue`.'''
+
         self.order_queue = Queue.Queue()
         '''Queue for receiving instructions from the main thread.'''
 
+        self.chunk_size = 1 if self.history_dependent else \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+        '''
+        The maximal number of states put in `.work_queue` at once.
+        
+        In history-dependent simulations the history browser needs every state
+        to be in the work queue by itself as soon as it's made, so we use
+        chunks of one state.
+        '''
+        
+        self.chunk_duration = \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION
+        '''The maximal time, in seconds, that a state waits in a chunk.'''
+
         
     def run(self):
         '''
@@ -111,11 +131,16 @@ class ThreadCruncher(threading.Thread, BaseCruncher):
         That exception means that the cruncher has been retired in the middle of
         its job, so it is propagated up to this level, where it causes the
         cruncher to terminate.
+        
+        However the cruncher terminates, it sets the work event, so the
+        crunching manager will notice.
         '''
         try:
             self.main_loop()
         except ObsoleteCruncherError:
             return
+        finally:
+            self.work_queue_meter.work_event.set()
 
         
     def main_loop(self):
@@ -155,16 +180,23 @@ class ThreadCruncher(threading.Thread, BaseCruncher):
 
         self.iterator = self.step_iterator_getter(thing, self.step_profile)
             
-        order = None
+        state_chunker = StateChunker(self.work_queue, self.chunk_size,
+                                     self.chunk_duration,
+                                     self.work_queue_meter,
+                                     self.check_orders)
         
         try:
             for state in self.iterator:
-                self.work_queue.put(state)
-                self.check_crunching_profile(state)
-                order = self.get_order()
-                if order:
-                    self.process_order(order)
+                state_chunker.add(state)
+                try:
+                    self.check_crunching_profile(state)
+                except ObsoleteCruncherError:
+                    # We're done, so we deliver the states that we have left:
+                    state_chunker.flush()
+                    raise
+                self.check_orders()
         except garlicsim.misc.WorldEnded:
+            state_chunker.flush()
             self.work_queue.put(
                 garlicsim.asynchronous_crunching.misc.EndMarker()
             )
@@ -195,6 +227,13 @@ class ThreadCruncher(threading.Thread, BaseCruncher):
             return None
 
         
+    def check_orders(self):
+        '''Process the order in the `.order_queue`, if one has been sent.'''
+        order = self.get_order()
+        if order:
+            self.process_order(order)
+
+        
     def process_order(self, order):
         '''Process an order receieved from `.order_queue`.'''
         if order == 'retire':
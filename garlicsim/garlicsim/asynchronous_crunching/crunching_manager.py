@@ -9,6 +9,9 @@ See its documentation for more information.
 
 from __future__ import with_statement
 
+import threading
+import time
+
 from garlicsim.general_misc import queue_tools
 from garlicsim.general_misc import decorator_tools
 import garlicsim.general_misc.change_tracker
@@ -25,21 +28,79 @@ from .crunching_profile import CrunchingProfile
 from .base_cruncher import BaseCruncher
 from garlicsim.misc.step_profile import StepProfile
 from .misc import EndMarker
+from .crunching_statistics import CrunchingStatistics
 
 
 __all__ = ['CrunchingManager']
 
 
 @decorator_tools.decorator
-def with_tree_lock(method, *args, **kwargs):
+def with_tree_read_lock(method, *args, **kwargs):
     '''
-    Decorator for using the tree lock (in write mode) as a context manager.
+    Decorator for using the tree lock (in read mode) as a context manager.
     '''
     self = args[0]
-    with self.project.tree.lock.write:
+    with self.project.tree.lock.read:
         return method(*args, **kwargs)
 
 
+WAIT_SLICE = 0.01
+'''
+How long `CrunchingManager.wait_for_work` waits on each of several events.
+
+(Only used when the crunchers don't all share the crunching manager's
+`.work_event`, like `PoolCruncher`s, whose workers have events of their own.)
+'''
+
+RECHECK_INTERVAL = 0.1
+'''
+How often `CrunchingManager.wait_for_work` checks the work queues directly.
+
+A cruncher in another process may set its event a little before the work it
+announces can be taken from its queue; if we sync in between, we clear the
+event and miss the work. Checking the queues now and then catches that.
+'''
+
+
+def _make_work_event():
+    '''
+    Make an event that crunchers set when they have work for the manager.
+    
+    This is a `multiprocessing.Event` if `multiprocessing` is installed, so
+    crunchers in other processes can set it; otherwise a `threading.Event`.
+    '''
+    try:
+        import multiprocessing
+        return multiprocessing.Event()
+    except ImportError:
+        return threading.Event()
+    
+
+def _event_is_set(event):
+    '''Return whether `event` is set. Works on all kinds of events.'''
+    try:
+        return event.is_set()
+    except AttributeError: # Python 2.5's `threading.Event`
+        return event.isSet()
+    
+
+def _get_default_cpu_budget():
+    '''
+    Get the default CPU budget for crunching managers.
+    
+    This is `CRUNCHER_CPU_BUDGET`, or the number of processor cores if that's
+    `None`.
+    '''
+    cpu_budget = garlicsim.asynchronous_crunching.CRUNCHER_CPU_BUDGET
+    if cpu_budget is not None:
+        return cpu_budget
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+
 class CrunchingManager(object):
     '''
     A crunching manager manages the background crunching for a project.
@@ -56,6 +117,13 @@ class CrunchingManager(object):
     jobs. The crunching manager will employ crunchers in order to complete the
     jobs. It will then take work from these crunchers, put it into the tree,
     and delete the jobs when they are completed.
+    
+    The crunching manager employs at most `.cpu_budget` crunchers at once. If
+    there are more jobs than that, the jobs with the highest priority, then
+    the jobs on the `.preferred_path`, and then the jobs with the earliest
+    deadline get crunchers, and the rest wait. When a
+    waiting job comes before a job that's being crunched in that order, the
+    latter's cruncher is retired to make room.
     '''
   
     def __init__(self, project):        
@@ -72,6 +140,23 @@ class CrunchingManager(object):
         self.crunchers = {}
         '''Dict that maps each job to the cruncher reponsible for doing it.'''
         
+        self.work_event = _make_work_event()
+        '''
+        Event that the crunchers set when they have work for us.
+        
+        Crunchers that can't use this event, (like `PoolCruncher`s,) set events
+        of their own. See `.wait_for_work`.
+        '''
+        
+        self.cpu_budget = _get_default_cpu_budget()
+        '''
+        The maximal number of crunchers that may crunch at once.
+        
+        This defaults to `CRUNCHER_CPU_BUDGET`, or to the number of processor
+        cores if that's `None`. It may be changed at any time, including to
+        `infinity`; it will take effect on the next call to `.sync_crunchers`.
+        '''
+        
         self.step_profiles = {}
         '''
         Dict that maps each cruncher to its step options profile.
@@ -112,8 +197,25 @@ class CrunchingManager(object):
         new type.
         '''
         
+        self.preferred_path = None
+        '''
+        A path whose jobs are crunched first among jobs of the same priority.
+
+        This is `None` by default. The GUI sets it to the active path, so the
+        simulation on the screen is crunched before other forks with the same
+        priority.
+        '''
+        
+        self.statistics_log = None
+        '''
+        A `CrunchingStatisticsLog` to write statistics to, or `None`.
         
-    @with_tree_lock
+        If it's set, `.sync_crunchers` writes the statistics of the crunchers
+        to it every once in a while.
+        '''
+        
+        
+    @with_tree_read_lock
     def sync_crunchers(self):
         '''
         Take work from the crunchers, and give them new instructions if needed.
@@ -121,6 +223,12 @@ class CrunchingManager(object):
         Talks with all the crunchers, takes work from them for implementing
         into the tree, retiring crunchers or recruiting new crunchers as
         necessary.
+        
+        The tree lock is held in read mode, so history browsers can keep
+        reading while we work. Work that only extends a leaf is added under
+        the cruncher's timeline lock alone; work that changes the shape of the
+        tree, like a fork, upgrades the tree lock to write mode. (See
+        `.__add_work_to_tree`.)
 
         Returns the total amount of nodes that were added to the tree in the
         process.
@@ -131,6 +239,11 @@ class CrunchingManager(object):
         total_added_nodes = garlicsim.misc.NodesAdded(0)
         '''int-oid in which we track the number of nodes added to the tree.'''
         
+        # We're about to take all the work there is, so we clear the work
+        # events. Work that's put after this point will set them again.
+        for work_event in self.__get_work_events():
+            work_event.clear()
+        
         # The first thing we do is iterate over the crunchers whose jobs have
         # been terminated. We take work from them, put it into the tree, and
         # promptly retire them, deleting them from `self.crunchers`.
@@ -146,6 +259,20 @@ class CrunchingManager(object):
         # In this point all the crunchers in `.crunchers` have an active job
         # associated with them.
         #
+        # Now we choose which jobs get crunchers within our CPU budget. The
+        # crunchers of jobs that weren't chosen are preempted: We take their
+        # work and retire them. Their jobs stay in `.jobs`, waiting for their
+        # turn.
+        
+        chosen_jobs = self.__choose_jobs_to_crunch()
+        
+        for (job, cruncher) in self.crunchers.copy().items():
+            if job not in chosen_jobs:
+                (added_nodes, new_leaf) = \
+                    self.__add_work_to_tree(cruncher, job, retire=True)
+                total_added_nodes += added_nodes
+                del self.crunchers[job]
+        
         # Now we'll iterate over the active jobs.
         
         for job in self.jobs[:]:
@@ -154,12 +281,13 @@ class CrunchingManager(object):
             if job not in self.crunchers:
                 
                 # If there is no cruncher associated with the job, we create
-                # one. (As long as the job is unfinished, and the node isn't in
-                # editing.) And that's it for this job, we `continue` to the
-                # next one.
+                # one. (As long as the job is unfinished, it was chosen for
+                # crunching, and the node isn't in editing.) And that's it for
+                # this job, we `continue` to the next one.
                 
                 if not job.is_done():
-                    self.__conditional_create_cruncher(job)
+                    if job in chosen_jobs:
+                        self.__conditional_create_cruncher(job)
                 else: # job.is_done() is True
                     self.jobs.remove(job)
                 continue
@@ -179,8 +307,6 @@ class CrunchingManager(object):
             (added_nodes, new_leaf) = self.__add_work_to_tree(cruncher,
                                                               job)
             total_added_nodes += added_nodes
-
-            job.node = new_leaf
             
             # We took work from the cruncher, now it's time to decide if we want
             # the cruncher to keep running or not. We will also update its
@@ -253,11 +379,125 @@ class CrunchingManager(object):
                     cruncher.retire()
                 del self.crunchers[job]
 
+                
+        if self.statistics_log is not None:
+            self.statistics_log.poll(self)
             
         return total_added_nodes
 
     
     
+    def wait_for_work(self, timeout=None):
+        '''
+        Wait until `.sync_crunchers` has something to do.
+        
+        This returns as soon as a cruncher puts work in its work queue or
+        stops, or there's a job that should get a cruncher, or `timeout`
+        seconds pass. It returns immediately if there's nothing to wait for.
+        
+        Returns whether there's something to do; `False` means we timed out or
+        there's nothing to wait for.
+        
+        Note that changes to crunching profiles, to `.cruncher_type` and to
+        `.jobs` aren't waited for; call `.sync_crunchers` after making them.
+        '''
+        if set(self.crunchers) != self.__choose_jobs_to_crunch():
+            return True
+        
+        work_events = self.__get_work_events(include_own=False)
+        if not work_events:
+            return False
+        
+        end_time = (time.time() + timeout) if timeout is not None else None
+        
+        # We can't wait on several events at once, so if there are several we
+        # wait on them in turn, a little on each:
+        slice_duration = WAIT_SLICE if len(work_events) >= 2 \
+                         else RECHECK_INTERVAL
+        last_check_time = time.time()
+        
+        while True:
+            for work_event in work_events:
+                if end_time is None:
+                    wait_duration = slice_duration
+                else:
+                    wait_duration = min(slice_duration, end_time - time.time())
+                    if wait_duration <= 0:
+                        return False
+                work_event.wait(wait_duration)
+                if _event_is_set(work_event):
+                    return True
+            if time.time() - last_check_time >= RECHECK_INTERVAL:
+                if self.__crunchers_have_work():
+                    return True
+                last_check_time = time.time()
+    
+    
+    def __crunchers_have_work(self):
+        '''
+        Return whether any cruncher has stopped or has work in its queue.
+        
+        If we can't tell, (`multiprocessing.Queue.qsize` isn't implemented on
+        some platforms,) we assume it has.
+        '''
+        for cruncher in self.crunchers.itervalues():
+            if not cruncher.is_alive():
+                return True
+            try:
+                if cruncher.work_queue.qsize():
+                    return True
+            except NotImplementedError:
+                return True
+        return False
+    
+    
+    def __get_work_events(self, include_own=True):
+        '''
+        Get the events that our crunchers set when they have work for us.
+        
+        If `include_own` is `True`, our own `.work_event` is included even if
+        no cruncher uses it.
+        '''
+        work_events = set()
+        if include_own:
+            work_events.add(self.work_event)
+        for cruncher in self.crunchers.itervalues():
+            if cruncher.work_queue_meter is not None:
+                work_events.add(cruncher.work_queue_meter.work_event)
+        return list(work_events)
+    
+    
+    def __choose_jobs_to_crunch(self):
+        '''
+        Choose the jobs that should have crunchers, within the CPU budget.
+        
+        Jobs with a higher priority are chosen first. Among jobs with the same
+        priority, jobs on the `.preferred_path` are chosen first, then jobs with
+        earlier deadlines, and jobs with no deadline last. After that jobs that
+        already have crunchers come first, so crunchers aren't replaced
+        needlessly, and after them the jobs that come first in `.jobs`.
+        
+        Returns a set of jobs.
+        '''
+        candidate_jobs = [
+            job for job in self.jobs if
+            (not job.is_done()) and (job.node.still_in_editing is False)
+        ]
+        if len(candidate_jobs) <= self.cpu_budget:
+            return set(candidate_jobs)
+        preferred_path = self.preferred_path
+        candidate_jobs.sort(
+            key=lambda job: (
+                -job.priority,
+                (preferred_path is None) or (job.node not in preferred_path),
+                job.deadline is None,
+                job.deadline,
+                job not in self.crunchers
+            )
+        )
+        return set(candidate_jobs[:self.cpu_budget])
+    
+    
     def __conditional_create_cruncher(self, job):
         '''
         Create a cruncher to crunch the node, unless there is reason not to.
@@ -267,13 +507,17 @@ class CrunchingManager(object):
         
         if node.still_in_editing is False:
             cruncher = self.cruncher_type(self, node.state, crunching_profile)
-            cruncher.start()
-            self.crunchers[job] = cruncher
             
+            # We register the cruncher before starting it, because we don't
+            # hold the tree lock in write mode, so a history-dependent cruncher
+            # may look for its job in `.crunchers` as soon as it starts:
+            self.crunchers[job] = cruncher
             self.crunching_profiles_change_tracker.check_in(crunching_profile)
             self.step_profiles[cruncher] = \
                 crunching_profile.step_profile
             
+            cruncher.start()
+            
     
     def get_jobs_by_node(self, node):
         '''
@@ -288,6 +532,8 @@ class CrunchingManager(object):
         '''
         Take work from cruncher and add to tree at the specified job's node.
         
+        The job's `.node` is moved to the last node that was added.
+        
         If `retire` is set to `True`, retires the cruncher. Keep in mind that
         if the cruncher gives an `EndMarker`, it will be retired regardless of
         the `retire` argument.
@@ -295,39 +541,105 @@ class CrunchingManager(object):
         Returns `(number, leaf)`, where `number` is the number of nodes that
         were added, and `leaf` is the last node that was added.
         '''
+        tree_lock = self.project.tree.lock
+        
+        # If we're only extending a leaf, readers of other timelines won't
+        # notice, so the read mode that `.sync_crunchers` holds is enough, as
+        # long as we hold the cruncher's timeline lock. Otherwise we're forking
+        # the tree, which changes other timelines, so we need write mode.
+        tree_lock_mode = tree_lock.read if self.__is_extending_leaf(job) \
+                         else tree_lock.write
+        
+        with tree_lock_mode:
+            with cruncher.timeline_lock:
+                (nodes_added, leaf) = \
+                    self.__move_work_to_tree(cruncher, job, retire)
+                job.node = leaf
+                return (nodes_added, leaf)
+    
+    
+    def __is_extending_leaf(self, job):
+        '''
+        Return whether adding `job`'s work to the tree only extends a leaf.
+        
+        That's when the job's node has no children, and no other cruncher
+        works on it.
+        '''
+        node = job.node
+        if node.children:
+            return False
+        for other_job in self.crunchers:
+            if (other_job is not job) and (other_job.node is node):
+                return False
+        return True
+    
+    
+    def __move_work_to_tree(self, cruncher, job, retire):
+        '''
+        Take work from cruncher and add to tree at the specified job's node.
+        
+        This does the actual work of `.__add_work_to_tree`, which see. The
+        caller must hold the locks.
+        '''
         
         tree = self.project.tree
         node = job.node
+        step_profile = self.step_profiles[cruncher]
         
         current_node = node
         counter = 0
         
+        work_queue_meter = cruncher.work_queue_meter
+        if work_queue_meter is not None:
+            work_queue_meter.record_drain()
+        
         queue_iterator = queue_tools.iterate(
             cruncher.work_queue,
             limit_to_original_size=True,
             _prefetch_if_no_qsize=True
         )
         
+        states = []
+        '''States that we took from the queue and didn't add to the tree yet.'''
+        
         for thing in queue_iterator:
             
             if isinstance(thing, garlicsim.data_structures.State):
-                counter += 1
-                current_node = tree.add_state(
-                    thing,
-                    parent=current_node,
-                    step_profile=self.step_profiles[cruncher],            
-                )
-                # todo optimization: save step profile in variable, it's
-                # wasteful to do a dict lookup every state.
+                # We collect the states and add them to the tree in bulk,
+                # which is much faster than adding them one by one.
+                states.append(thing)
+                
+            elif isinstance(thing, list):
+                # A chunk of states, see `StateChunker`.
+                states.extend(thing)
             
             elif isinstance(thing, EndMarker):
+                if states:
+                    counter += len(states)
+                    current_node = tree.add_states(
+                        states,
+                        parent=current_node,
+                        step_profile=step_profile
+                    )[-1]
+                    states = []
                 tree.make_end(node=current_node,
-                              step_profile=self.step_profiles[cruncher])
+                              step_profile=step_profile)
                 job.resulted_in_end = True
-                
+            
             else:
                 raise TypeError('Unexpected object `%s` in work queue' % thing)
-                        
+        
+        if states:
+            counter += len(states)
+            current_node = tree.add_states(
+                states,
+                parent=current_node,
+                step_profile=step_profile
+            )[-1]
+        
+        if work_queue_meter is not None:
+            work_queue_meter.record_taken(counter)
+        
         if retire or job.resulted_in_end:
             cruncher.retire()
         
@@ -336,6 +648,18 @@ class CrunchingManager(object):
         return (nodes_added, current_node)
     
     
+    def get_stats(self):
+        '''
+        Get a `CrunchingStatistics` snapshot of the work of the crunchers.
+        
+        It has a `CruncherStatistics` for each cruncher, with the number of
+        states it made, its throughput, the time it spent in the step function,
+        in putting states in its work queue and in waiting for room there, and
+        the pickled size of its states.
+        '''
+        return CrunchingStatistics(self)
+    
+    
     def __repr__(self):
         '''
         Get a string representation of the crunching manager.
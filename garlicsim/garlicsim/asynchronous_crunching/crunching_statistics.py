@@ -0,0 +1,221 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines statistics about the work of crunchers.
+
+See the documentation of `CruncherStatistics`, `CrunchingStatistics` and
+`CrunchingStatisticsLog`.
+'''
+
+from __future__ import with_statement
+
+import os
+import csv
+import logging
+import time
+
+
+__all__ = ['CruncherStatistics', 'CrunchingStatistics',
+           'CrunchingStatisticsLog']
+
+
+DEFAULT_LOG_INTERVAL = 10
+'''The default interval, in seconds, between writes of statistics to a log.'''
+
+
+class CruncherStatistics(object):
+    '''
+    A snapshot of statistics about the work of a cruncher.
+
+    The statistics are taken from the cruncher's `WorkQueueMeter`. If the
+    cruncher has no meter, the statistics that come from it are `None`. For a
+    `PoolCruncher`, they are of its worker, which may have crunched other jobs
+    before.
+
+    Times are in seconds, and sizes in bytes.
+    '''
+
+    fields = ['cruncher_type', 'clock', 'states', 'throughput', 'uptime',
+              'crunch_time', 'put_time', 'stall_time', 'state_size',
+              'queue_depth', 'max_queue_depth']
+    '''The names of the statistics, in the order they're written to a log.'''
+
+
+    def __init__(self, cruncher, job=None):
+
+        self.cruncher_type = type(cruncher).__name__
+        '''The name of the cruncher's type.'''
+
+        self.clock = job.node.state.clock if job is not None else None
+        '''The clock of the last state of the job that was put in the tree.'''
+
+        work_queue_meter = cruncher.work_queue_meter
+        get = lambda name: getattr(work_queue_meter, name) \
+                           if work_queue_meter is not None else None
+
+        self.states = get('states_put')
+        '''The number of states that the cruncher produced.'''
+
+        self.throughput = get('throughput')
+        '''The number of states the cruncher makes per second, not stalling.'''
+
+        self.uptime = get('uptime')
+        '''The time since the cruncher started.'''
+
+        self.crunch_time = get('crunch_time')
+        '''The time the cruncher spent making states, in the step function.'''
+
+        self.put_time = get('put_time')
+        '''
+        The time the cruncher spent putting states in its work queue.
+
+        For a `ProcessCruncher`, this includes pickling the states.
+        '''
+
+        self.stall_time = get('stall_time')
+        '''The time the cruncher waited for room in its full work queue.'''
+
+        self.state_size = get('state_size')
+        '''
+        The size of a state when pickled, or 0 if unknown.
+
+        This is what a `ProcessCruncher` sends to the main process per state.
+        '''
+
+        self.queue_depth = get('depth')
+        '''The number of states waiting in the cruncher's work queue.'''
+
+        self.max_queue_depth = get('max_depth')
+        '''The maximal number of states allowed in the work queue.'''
+
+
+    def get_values(self):
+        '''Get the statistics as a list, in the order of `.fields`.'''
+        return [getattr(self, field) for field in self.fields]
+
+
+    def __repr__(self):
+        return '<%s: %s>' % (
+            type(self).__name__,
+            ', '.join('%s=%s' % (field, value) for (field, value) in
+                      zip(self.fields, self.get_values()))
+        )
+
+
+class CrunchingStatistics(object):
+    '''
+    A snapshot of statistics about the crunchers of a crunching manager.
+
+    Get one by calling `CrunchingManager.get_stats`.
+    '''
+
+    def __init__(self, crunching_manager):
+
+        self.time = time.time()
+        '''The time when the snapshot was taken.'''
+
+        self.crunchers = [
+            cruncher.get_statistics(job) for (job, cruncher) in
+            crunching_manager.crunchers.items()
+        ]
+        '''A `CruncherStatistics` for each of the crunchers.'''
+
+        self.job_count = len(crunching_manager.jobs)
+        '''The number of jobs, including jobs that wait for a cruncher.'''
+
+
+    @property
+    def states(self):
+        '''The number of states that the crunchers produced.'''
+        return sum(cruncher_statistics.states or 0 for cruncher_statistics
+                   in self.crunchers)
+
+
+    @property
+    def throughput(self):
+        '''The number of states all the crunchers make per second together.'''
+        return sum(cruncher_statistics.throughput or 0 for
+                   cruncher_statistics in self.crunchers)
+
+
+    def __repr__(self):
+        return '<%s: %s crunchers for %s jobs, %s states, %.1f states/s>' % \
+               (type(self).__name__, len(self.crunchers), self.job_count,
+                self.states, self.throughput)
+
+
+class CrunchingStatisticsLog(object):
+    '''
+    A log to which a crunching manager periodically writes its statistics.
+
+    Assign one to `CrunchingManager.statistics_log`, and every `interval`
+    seconds `.sync_crunchers` will write the statistics of every cruncher to
+    `destination`:
+
+    If `destination` is a `logging.Logger`, a line is logged for every
+    cruncher. Otherwise it should be a file, or the path of a file to append
+    to, and a CSV row is written for every cruncher, with the columns `time`,
+    `job_count` and then `CruncherStatistics.fields`. A header row is written
+    first, unless we're appending to a file that isn't empty.
+    '''
+
+    def __init__(self, destination, interval=DEFAULT_LOG_INTERVAL):
+
+        self.interval = interval
+        '''The interval in seconds between writes.'''
+
+        self.last_write_time = None
+        '''The time of the last write, or `None` if there wasn't one.'''
+
+        self.logger = None
+        '''The logger to log to, or `None` if we write to a file.'''
+
+        self.file = None
+        '''The file we write CSV rows to, or `None` if we log.'''
+
+        if isinstance(destination, logging.Logger):
+            self.logger = destination
+        else:
+            if isinstance(destination, basestring):
+                write_header = not (os.path.exists(destination) and
+                                    os.path.getsize(destination))
+                destination = open(destination, 'ab')
+            else:
+                write_header = True
+            self.file = destination
+            self.csv_writer = csv.writer(destination)
+            if write_header:
+                self.csv_writer.writerow(['time', 'job_count'] +
+                                         CruncherStatistics.fields)
+
+
+    def poll(self, crunching_manager):
+        '''
+        Write the statistics of `crunching_manager`, if it's time to.
+
+        Returns whether they were written.
+        '''
+        now = time.time()
+        if self.last_write_time is not None and \
+           now - self.last_write_time < self.interval:
+            return False
+        self.last_write_time = now
+        self.write(crunching_manager.get_stats())
+        return True
+
+
+    def write(self, crunching_statistics):
+        '''Write a `CrunchingStatistics` to the log.'''
+        if self.logger is not None:
+            self.logger.info('%s', crunching_statistics)
+            for cruncher_statistics in crunching_statistics.crunchers:
+                self.logger.info('%s', cruncher_statistics)
+        else:
+            for cruncher_statistics in crunching_statistics.crunchers:
+                self.csv_writer.writerow(
+                    [crunching_statistics.time,
+                     crunching_statistics.job_count] +
+                    cruncher_statistics.get_values()
+                )
+            self.file.flush()
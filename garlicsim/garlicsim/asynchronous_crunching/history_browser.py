@@ -49,8 +49,12 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
     user.
     
     When using a `HistoryBroswer`, the lock of the project's tree is acquired
-    for reading. That acquiring action can also be invoked by using
-    `HistoryBrowser` as a context manager.
+    for reading, and the cruncher's `.timeline_lock` is acquired. That
+    acquiring action can also be invoked by using `HistoryBrowser` as a context
+    manager. Since the crunching manager holds the tree lock in read mode when
+    it only adds work to the ends of timelines, a history browser waits only
+    for work being added to its own timeline, or for changes to the shape of
+    the tree.
     '''
         
     def __init__(self, cruncher):
@@ -58,14 +62,26 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
         self.project = cruncher.project
         self.tree = self.project.tree
         self.tree_lock = self.project.tree.lock
+        
+        self.__cached_path = None
+        '''
+        Tuple of `(reshape_version, path)` from the last lookup.
+        
+        We reuse the path, and its position cache, for as long as the tree
+        isn't reshaped and our node is on the path.
+        '''
     
         
     def manage_context(self):
         '''
-        Manage the `HistoryBrowser` context, using the tree lock in read mode.
+        Manage the `HistoryBrowser` context.
+        
+        This acquires the tree lock in read mode and the cruncher's timeline
+        lock, in that order.
         '''
         with self.tree_lock.read:
-            yield self
+            with self.cruncher.timeline_lock:
+                yield self
 
         
     @with_self
@@ -98,7 +114,7 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
             queue_size = self.cruncher.work_queue.qsize()
             new_index = index + queue_size
             our_node = self.__get_our_node()
-            path = our_node.make_containing_path()
+            path = self.__get_our_path(our_node)
             result_node = path.__getitem__(new_index, tail=our_node)
             return result_node.state
             
@@ -109,14 +125,15 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
         Get a state by its position in the timeline. Positive indices only.
         '''
         our_node = self.__get_our_node()
-        path = our_node.make_containing_path()
+        path = self.__get_our_path(our_node)
         try:
             result_node = path.__getitem__(index, tail=our_node)
             return result_node.state
         
         except IndexError:
             path_length = path.__len__(tail=our_node)
-            # todo: Probably inefficient: We're plowing through the path again.
+            # (This is cheap, because the path's position cache is still fresh
+            # from the lookup above.)
             new_index = index - path_length
             try:
                 return self.__get_item_from_queue(new_index)
@@ -203,7 +220,7 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
         This uses the `binary_search.BOTH` rounding. See its documentation.
         '''
         our_node = self.__get_our_node()
-        path = our_node.make_containing_path()
+        path = self.__get_our_path(our_node)
         new_function = lambda node: function(node.state)
         
         result_in_nodes = path.get_node_by_monotonic_function \
@@ -248,7 +265,7 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
         queue_length = self.cruncher.work_queue.qsize()
         
         our_node = self.__get_our_node()
-        our_path = our_node.make_containing_path()
+        our_path = self.__get_our_path(our_node)
         path_length = our_path.__len__(tail=our_node)
         
         return queue_length + path_length
@@ -270,5 +287,24 @@ class HistoryBrowser(garlicsim.misc.BaseHistoryBrowser, ContextManager):
         else: # num == 0
             raise ObsoleteCruncherError
         return our_node
+    
+    
+    @with_self
+    def __get_our_path(self, our_node):
+        '''
+        Get a path that contains our node.
+        
+        The path is reused between calls as long as the tree isn't reshaped and
+        our node is still on it. (Our node usually moves forward along the
+        path as crunched work gets added to the tree.)
+        '''
+        reshape_version = self.tree.reshape_version
+        if self.__cached_path is not None:
+            (cached_reshape_version, path) = self.__cached_path
+            if cached_reshape_version == reshape_version and our_node in path:
+                return path
+        path = our_node.make_containing_path()
+        self.__cached_path = (reshape_version, path)
+        return path
         
     
\ No newline at end of file
@@ -19,10 +19,14 @@ class Job(object):
         
     A job specifies a node and a crunching profile. It means we should crunch
     from `node` according to the cruncing profile.
+    
+    When there are more jobs than the crunching manager's CPU budget allows to
+    crunch at once, jobs with a higher `.priority` are crunched first, and
+    among jobs with the same priority, the ones with the earliest `.deadline`.
     '''
     # todo: should there be other helpful methods here?
     
-    def __init__(self, node, crunching_profile):
+    def __init__(self, node, crunching_profile, priority=0, deadline=None):
         
         assert isinstance(node, garlicsim.data_structures.Node)
         self.node = node
@@ -32,12 +36,50 @@ class Job(object):
         self.crunching_profile = crunching_profile
         '''The crunching profile to be used for crunching.'''
         
+        self.priority = priority
+        '''
+        The priority of the job. Jobs with higher priorities are crunched first.
+        
+        This may be changed at any time; it will take effect on the next call to
+        `CrunchingManager.sync_crunchers`.
+        '''
+        
+        self.deadline = deadline
+        '''
+        The time by which we want the job done, or `None` if there's no rush.
+        
+        This is a wall-clock time, as returned by `time.time()`. Jobs with
+        earlier deadlines are crunched first, after jobs with higher priority.
+        Jobs with no deadline come last.
+        
+        This may be changed at any time; it will take effect on the next call to
+        `CrunchingManager.sync_crunchers`.
+        '''
+        
         self.resulted_in_end = False
         '''
         Flag marking that the job has resulted in an end of the simulation.
         '''
   
         
+    def raise_priority(self, priority):
+        '''Make `.priority` at least as high as the given `priority`.'''
+        if self.priority < priority:
+            self.priority = priority
+            
+            
+    def advance_deadline(self, deadline):
+        '''
+        Make `.deadline` at least as early as the given `deadline`.
+        
+        `deadline` is a wall-clock time, or `None` for no deadline, in which
+        case nothing is changed.
+        '''
+        if deadline is not None and \
+           (self.deadline is None or deadline < self.deadline):
+            self.deadline = deadline
+  
+        
     def is_done(self):
         '''
         Return whether the job is done, i.e. enough crunching has been done.
@@ -3,4 +3,6 @@
 
 '''Defines miscellanous objects.'''
 
-from .end_marker import EndMarker
\ No newline at end of file
+from .end_marker import EndMarker
+from .state_chunker import StateChunker
+from .work_queue_meter import WorkQueueMeter, LocalValue
\ No newline at end of file
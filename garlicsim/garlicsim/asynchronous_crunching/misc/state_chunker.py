@@ -0,0 +1,108 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Defines the `StateChunker` class.
+
+See its documentation for more info.
+'''
+
+import time
+
+
+class StateChunker(object):
+    '''
+    Puts the states produced by a cruncher in its work queue in chunks.
+
+    Putting an item in a work queue has a fixed cost, (locking, and in the
+    case of `ProcessCruncher`, pickling and a pipe write,) which is
+    significant for simulations with fast step functions. So instead of putting
+    every state in the work queue separately, the cruncher adds its states to a
+    `StateChunker`, which puts them in the work queue as a list.
+
+    A chunk is put in the queue when it has `.chunk_size` states, or when
+    waiting for the next state would make the chunk older than
+    `.chunk_duration` seconds, so simulations with slow step functions still
+    deliver every state as soon as it's made. A chunk with only one state is
+    put in the queue as the state itself.
+
+    The crunching manager unpacks the chunks when it takes work from the
+    queue.
+
+    If a `WorkQueueMeter` is given, the chunker tells it about every chunk, and
+    waits for room in the queue before putting it, calling `check_orders`
+    while it waits. (See `WorkQueueMeter.wait_for_room`.) If the queue's `put`
+    may wait too, (like `SharedMemoryQueue.put`,) it gets `check_orders` as
+    well.
+    '''
+
+    def __init__(self, work_queue, chunk_size=None, chunk_duration=None,
+                 work_queue_meter=None, check_orders=None):
+
+        import garlicsim.asynchronous_crunching
+
+        self.work_queue = work_queue
+        '''The queue in which we put the chunks.'''
+
+        self.chunk_size = chunk_size if chunk_size is not None else \
+            garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+        '''The maximal number of states in a chunk.'''
+
+        self.chunk_duration = chunk_duration if chunk_duration is not None \
+            else garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION
+        '''The maximal time, in seconds, that a state may wait in a chunk.'''
+
+        self.work_queue_meter = work_queue_meter
+        '''The meter of the queue, or `None` if it has none.'''
+        if work_queue_meter is not None:
+            work_queue_meter.start_clock()
+
+        self.check_orders = check_orders
+        '''Function that processes the cruncher's orders, or `None`.'''
+
+        self.chunk = []
+        '''The states that weren't put in the queue yet.'''
+
+        self.last_flush_time = self.last_state_time = time.time()
+        '''The times of the last flush and of the last state added.'''
+
+
+    def add(self, state):
+        '''
+        Add a state to the chunk, and put the chunk in the queue if it is due.
+
+        Returns whether the chunk was put in the queue.
+        '''
+        now = time.time()
+        step_duration = now - self.last_state_time
+        self.last_state_time = now
+        self.chunk.append(state)
+        if len(self.chunk) >= self.chunk_size or \
+           (now - self.last_flush_time) + step_duration >= self.chunk_duration:
+            self.flush()
+            return True
+        else:
+            return False
+
+
+    def flush(self):
+        '''Put the current chunk in the queue, if it has any states.'''
+        chunk = self.chunk
+        if chunk:
+            self.chunk = []
+            work_queue_meter = self.work_queue_meter
+            if work_queue_meter is not None:
+                work_queue_meter.wait_for_room(chunk, self.check_orders)
+            self.put(chunk[0] if len(chunk) == 1 else chunk)
+            if work_queue_meter is not None:
+                work_queue_meter.record_put(len(chunk))
+        self.last_flush_time = time.time()
+
+
+    def put(self, item):
+        '''Put `item` in the queue, passing `check_orders` if it takes it.'''
+        if self.check_orders is not None and \
+           getattr(self.work_queue, 'put_takes_check_orders', False):
+            self.work_queue.put(item, self.check_orders)
+        else:
+            self.work_queue.put(item)
@@ -0,0 +1,319 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Defines the `WorkQueueMeter` class.
+
+See its documentation for more info.
+'''
+
+from __future__ import with_statement
+
+import threading
+import time
+import cPickle
+
+
+STALL_POLL_INTERVAL = 0.005
+'''The interval, in seconds, in which a stalled cruncher checks for room.'''
+
+DEPTH_HEADROOM = 2
+'''
+How many drain intervals' worth of states may wait in a work queue.
+
+More than one, so a cruncher doesn't stall when a drain comes a bit late.
+'''
+
+STATE_SIZE_SAMPLING_INTERVAL = 64
+'''Every how many puts the size of a state is measured again.'''
+
+
+class LocalValue(object):
+    '''
+    A stand-in for `multiprocessing.Value` for sharing a value between threads.
+    '''
+
+    def __init__(self, typecode, value):
+        self.value = value
+        '''The value.'''
+
+        self.__lock = threading.Lock()
+
+
+    def get_lock(self):
+        '''Get the lock that protects the value.'''
+        return self.__lock
+
+
+class WorkQueueMeter(object):
+    '''
+    Measures the flow of states through a cruncher's work queue, and limits it.
+
+    The cruncher tells the meter about every chunk of states that it puts in
+    its work queue, (see `StateChunker`,) and the crunching manager tells the
+    meter when it drains the queue and how many states it took out. From this
+    the meter learns the cruncher's throughput, the interval between drains
+    and the size of a state, and decides how many states may wait in the
+    queue: Enough for the cruncher to keep crunching until the next drain, but
+    no more than `.memory_budget` bytes worth of states. When the queue is
+    full, the cruncher stalls until the crunching manager takes states out.
+
+    The size of a state is measured by pickling it. If the states can't be
+    pickled, only the throughput limits the depth of the queue.
+
+    The meter's counters are made by `value_factory`, which should be
+    `multiprocessing.Value` when the cruncher works in another process, and
+    `LocalValue` otherwise.
+
+    The meter sets its `.work_event` whenever the cruncher puts work in the
+    queue, so the crunching manager can wait for work instead of polling. When
+    the cruncher works in another process, this must be a
+    `multiprocessing.Event`.
+
+    The meter's measurements are also reported in `CruncherStatistics`.
+    '''
+
+    def __init__(self, value_factory=LocalValue, memory_budget=None,
+                 initial_max_depth=None, work_event=None):
+
+        import garlicsim.asynchronous_crunching
+
+        self.memory_budget = memory_budget if memory_budget is not None \
+            else garlicsim.asynchronous_crunching.CRUNCHER_QUEUE_MEMORY_BUDGET
+        '''The maximal number of bytes worth of states in the queue.'''
+
+        self.initial_max_depth = initial_max_depth \
+            if initial_max_depth is not None \
+            else garlicsim.asynchronous_crunching.CRUNCHER_QUEUE_SIZE
+        '''The maximal number of states in the queue before we measure.'''
+
+        self.work_event = work_event if work_event is not None \
+                          else threading.Event()
+        '''Event that's set when the cruncher has work for the manager.'''
+
+        self._depth = value_factory('l', 0)
+        '''The number of states in the queue.'''
+
+        self._max_depth = value_factory('l', self.initial_max_depth)
+        '''The maximal number of states in the queue, last we checked.'''
+
+        self._state_size = value_factory('l', 0)
+        '''The size of a pickled state in bytes, or 0 if unknown.'''
+
+        self._states_put = value_factory('l', 0)
+        '''The number of states that the cruncher put in the queue.'''
+
+        self._crunch_time = value_factory('d', 0.)
+        '''The time in seconds that the cruncher spent making those states.'''
+
+        self._stall_time = value_factory('d', 0.)
+        '''The time in seconds that the cruncher waited for room.'''
+
+        self._put_time = value_factory('d', 0.)
+        '''The time in seconds that the cruncher spent putting in the queue.'''
+
+        self._start_time = value_factory('d', 0.)
+        '''The time when the cruncher started its first job, or 0.'''
+
+        self._drain_interval = value_factory('d', 0.)
+        '''The average time in seconds between drains, or 0 if unknown.'''
+
+        self._last_drain_time = value_factory('d', time.time())
+        '''The time of the last drain, or of the meter's creation.'''
+
+        self._last_put_time = None
+        '''The time of the cruncher's last put. Used only by the cruncher.'''
+
+        self._last_room_time = None
+        '''
+        The time the cruncher last found room. Used only by the cruncher.
+        '''
+
+        self._puts_until_sample = 0
+        '''Puts until we measure a state again. Used only by the cruncher.'''
+
+
+    @property
+    def depth(self):
+        '''The number of states in the queue.'''
+        return self._depth.value
+
+
+    @property
+    def max_depth(self):
+        '''The maximal number of states in the queue, last we checked.'''
+        return self._max_depth.value
+
+
+    @property
+    def state_size(self):
+        '''The size of a pickled state in bytes, or 0 if unknown.'''
+        return self._state_size.value
+
+
+    @property
+    def stall_time(self):
+        '''The total time in seconds that the cruncher waited for room.'''
+        return self._stall_time.value
+
+
+    @property
+    def put_time(self):
+        '''
+        The total time in seconds that the cruncher spent putting in the queue.
+
+        For `ProcessCruncher`, this includes pickling the states.
+        '''
+        return self._put_time.value
+
+
+    @property
+    def crunch_time(self):
+        '''
+        The total time in seconds that the cruncher spent making states.
+
+        This is the time spent in the step function, plus a bit of the
+        cruncher's own overhead, but not the time spent stalling or putting.
+        '''
+        return self._crunch_time.value
+
+
+    @property
+    def states_put(self):
+        '''The number of states that the cruncher put in the queue.'''
+        return self._states_put.value
+
+
+    @property
+    def uptime(self):
+        '''
+        The time in seconds since the cruncher started, or 0 if it hasn't.
+        '''
+        start_time = self._start_time.value
+        return time.time() - start_time if start_time else 0.
+
+
+    @property
+    def drain_interval(self):
+        '''The average time in seconds between drains, or 0 if unknown.'''
+        return self._drain_interval.value
+
+
+    @property
+    def throughput(self):
+        '''
+        The number of states that the cruncher makes per second.
+
+        Time spent stalling isn't counted. This is 0 if unknown.
+        '''
+        crunch_time = self._crunch_time.value
+        if not crunch_time:
+            return 0.
+        return self._states_put.value / crunch_time
+
+
+    def start_clock(self):
+        '''
+        Start measuring the cruncher's crunch time.
+
+        The cruncher calls this when it starts a job.
+        '''
+        self._last_put_time = time.time()
+        if not self._start_time.value:
+            self._start_time.value = self._last_put_time
+
+
+    def wait_for_room(self, states, check_orders=None):
+        '''
+        Wait until there's room in the queue for `states`.
+
+        The cruncher calls this right before putting `states` in the queue.
+        There's always room when the queue is empty.
+
+        While waiting, `check_orders` is called every `STALL_POLL_INTERVAL`
+        seconds, if given. It should process the orders that the cruncher got
+        meanwhile, and raise `ObsoleteCruncherError` if the cruncher was
+        retired, because the crunching manager stops taking states out of the
+        queue of a retired cruncher.
+        '''
+        start_time = time.time()
+        if self._last_put_time is not None:
+            self._crunch_time.value += start_time - self._last_put_time
+
+        if self._puts_until_sample <= 0:
+            self.__measure_state_size(states[-1])
+            self._puts_until_sample = STATE_SIZE_SAMPLING_INTERVAL
+        self._puts_until_sample -= 1
+
+        stalled = False
+        while True:
+            max_depth = self._max_depth.value = self.__get_max_depth()
+            depth = self._depth.value
+            if depth <= 0 or depth + len(states) <= max_depth:
+                break
+            stalled = True
+            if check_orders is not None:
+                check_orders()
+            time.sleep(STALL_POLL_INTERVAL)
+
+        self._last_room_time = time.time()
+        if stalled:
+            self._stall_time.value += self._last_room_time - start_time
+
+
+    def record_put(self, number_of_states):
+        '''
+        Record that the cruncher put `number_of_states` states in the queue.
+        '''
+        with self._depth.get_lock():
+            self._depth.value += number_of_states
+        self._states_put.value += number_of_states
+        self._last_put_time = time.time()
+        if self._last_room_time is not None:
+            self._put_time.value += self._last_put_time - self._last_room_time
+        self.work_event.set()
+
+
+    def record_drain(self):
+        '''
+        Record that the crunching manager is draining the queue.
+
+        The crunching manager calls this before taking work from the queue.
+        '''
+        now = time.time()
+        interval = now - self._last_drain_time.value
+        old_interval = self._drain_interval.value
+        self._drain_interval.value = \
+            (old_interval + interval) / 2 if old_interval else interval
+        self._last_drain_time.value = now
+
+
+    def record_taken(self, number_of_states):
+        '''
+        Record that `number_of_states` states were taken out of the queue.
+        '''
+        with self._depth.get_lock():
+            self._depth.value -= number_of_states
+
+
+    def __measure_state_size(self, state):
+        '''Measure the size of `state` when pickled.'''
+        try:
+            self._state_size.value = \
+                len(cPickle.dumps(state, cPickle.HIGHEST_PROTOCOL))
+        except Exception:
+            pass
+
+
+    def __get_max_depth(self):
+        '''Decide the maximal number of states in the queue.'''
+        throughput = self.throughput
+        drain_interval = self._drain_interval.value
+        if throughput and drain_interval:
+            max_depth = int(throughput * drain_interval * DEPTH_HEADROOM) + 1
+        else:
+            max_depth = self.initial_max_depth
+        state_size = self._state_size.value
+        if state_size:
+            max_depth = min(max_depth, self.memory_budget // state_size)
+        return max(max_depth, 1)
@@ -9,6 +9,8 @@ See its documentation for more information.
 
 from __future__ import with_statement
 
+import time
+
 from garlicsim.general_misc import cute_iter_tools
 import garlicsim.general_misc.read_write_lock
 from garlicsim.general_misc.infinity import infinity
@@ -124,7 +126,7 @@ class Project(object):
         return self.tree.add_state(state)
 
     
-    def ensure_buffer(self, node, clock_buffer=0):
+    def ensure_buffer(self, node, clock_buffer=0, priority=0, deadline=None):
         '''
         Ensure there's a large enough buffer of nodes after `node`.
 
@@ -132,6 +134,9 @@ class Project(object):
         a clock buffer of at least `clock_buffer` after `node`. If there isn't,
         the leaves of `node` will be crunched until there's a buffer of
         `clock_buffer` between `node` and each of the leaves.
+        
+        The jobs crunching the leaves get at least the given `priority`, and a
+        `deadline` at least as early as the given one. (See `Job`.)
         '''
         leaves_dict = node.get_all_leaves(max_clock_distance=clock_buffer)
         new_clock_target = node.state.clock + clock_buffer
@@ -151,15 +156,18 @@ class Project(object):
                     self.build_step_profile()
                 crunching_profile = CrunchingProfile(new_clock_target,
                                                      step_profile)
-                job = Job(leaf, crunching_profile)
+                job = Job(leaf, crunching_profile, priority, deadline)
                 self.crunching_manager.jobs.append(job)
                 continue
             
             for job in jobs_of_leaf:
                 job.crunching_profile.raise_clock_target(new_clock_target)
+                job.raise_priority(priority)
+                job.advance_deadline(deadline)
             
     
-    def ensure_buffer_on_path(self, node, path, clock_buffer=0):
+    def ensure_buffer_on_path(self, node, path, clock_buffer=0, priority=0,
+                              deadline=None):
         '''
         Ensure there's a large enough buffer of nodes after `node` on `path`.
 
@@ -167,6 +175,11 @@ class Project(object):
         buffer of at least `clock_buffer` after `node`. If there isn't, the
         leaf at the end of the path will be crunched until the buffer is big
         enough.
+        
+        The job crunching the leaf gets at least the given `priority`, and a
+        `deadline` at least as early as the given one. (See `Job`.)
+        
+        Returns the job.
         '''
         
         leaf = path.get_last_node(head=node)
@@ -183,12 +196,14 @@ class Project(object):
             # therefore the most recent one, will be the most wanted by the
             # user.
             job.crunching_profile.raise_clock_target(new_clock_target)
+            job.raise_priority(priority)
+            job.advance_deadline(deadline)
             return job
         else:
             step_profile = leaf.step_profile or self.build_step_profile()
             crunching_profile = CrunchingProfile(new_clock_target,
                                                  step_profile)
-            job = Job(leaf, crunching_profile)
+            job = Job(leaf, crunching_profile, priority, deadline)
             self.crunching_manager.jobs.append(job)
             return job
 
@@ -223,7 +238,8 @@ class Project(object):
         to the step function. You may pass a `StepProfile` yourself and it will
         be noticed and used.
         
-        Returns the job.
+        Returns the job. You may set its `.priority` and `.deadline` to have it
+        crunched before other jobs.
         '''
         
         # todo: Inputting `clock_buffer=None` should produce infinitesimal
@@ -256,6 +272,43 @@ class Project(object):
         return self.crunching_manager.sync_crunchers()
     
     
+    def run_until(self, condition=None, timeout=None):
+        '''
+        Sync the crunchers whenever they have work, until `condition` is met.
+        
+        `condition` is a function that takes no arguments. It's checked after
+        every sync. If it's `None`, we run until all the jobs are done. If
+        `timeout` seconds pass, we stop anyway.
+        
+        Unlike calling `.sync_crunchers` periodically, this waits for the
+        crunchers to produce work, so it doesn't burn CPU or lock the tree
+        while they're busy, and new states get into the tree soon after they're
+        made.
+        
+        Returns the total amount of nodes that were added to the tree.
+        '''
+        if condition is None:
+            condition = lambda: not self.crunching_manager.jobs
+        end_time = (time.time() + timeout) if timeout is not None else None
+        
+        total_added_nodes = self.sync_crunchers()
+        
+        while not condition():
+            if end_time is None:
+                time_left = None
+            else:
+                time_left = end_time - time.time()
+                if time_left <= 0:
+                    break
+            if not self.crunching_manager.wait_for_work(time_left) and \
+               not self.crunching_manager.crunchers:
+                # There's nothing to wait for, so `condition` won't be met.
+                break
+            total_added_nodes += self.sync_crunchers()
+            
+        return total_added_nodes
+    
+    
     @with_tree_lock
     def simulate(self, node, iterations=1, *args, **kwargs):
         '''
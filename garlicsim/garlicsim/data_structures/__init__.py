@@ -17,18 +17,22 @@ from .state import State
 from .tree_member import TreeMember
 
 from .node import Node, NodeError
+from .compact_node import CompactNode
+from .delta_node import DeltaNode
 from .block import Block, BlockError
 from .end import End
 
 from .node_range import NodeRange
 from .node_selection import NodeSelection
 
+from .tree_journal import TreeJournal
 from .tree import Tree, TreeError
 
 from .path import Path, PathError, PathLookupError, PathOutOfRangeError
 
 
-__all__ = ['TreeMember', 'State', 'Tree', 'Path', 'Node', 'Block', 'End',
-           'NodeRange', 'NodeSelection'] + \
+__all__ = ['TreeMember', 'State', 'Tree', 'TreeJournal', 'Path', 'Node',
+           'CompactNode', 'DeltaNode', 'Block', 'End', 'NodeRange',
+           'NodeSelection'] + \
           ['BlockError', 'PathError', 'PathLookupError', 'PathOutOfRangeError',
             'TreeError', 'NodeError']
\ No newline at end of file
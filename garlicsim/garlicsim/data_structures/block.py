@@ -61,6 +61,19 @@ class Block(TreeMember):
         '''Step profile with which all the nodes in the block were crunched.'''
         
         self.__node_list = []
+        
+        self.__serials = {}
+        '''
+        Dict mapping each node in the block to its serial number.
+        
+        A node's index in the block is its serial number minus
+        `.__first_serial`. This lets us find a node's index in O(1) instead of
+        scanning the node list, even when nodes are added at the head.
+        '''
+        
+        self.__first_serial = 0
+        '''The serial number of the first node in the block.'''
+        
         self.add_node_list(node_list)
 
         
@@ -83,6 +96,8 @@ class Block(TreeMember):
         if not self.__node_list:
             # If the node list is `[]`, let's make it `[node]`.
             self.__node_list.append(node)
+            self.__first_serial = 0
+            self.__serials[node] = 0
             node.block = self
             self.step_profile = node.step_profile
             return
@@ -96,6 +111,8 @@ class Block(TreeMember):
         last_in_block = self.__node_list[-1]
         if node.parent == last_in_block:
             # We're appending the node to the tail of the block.
+            self.__serials[node] = \
+                self.__first_serial + len(self.__node_list)
             self.__node_list.append(node)
             node.block = self
             return
@@ -104,6 +121,8 @@ class Block(TreeMember):
         if node == first_in_block.parent:
             # We're appending the node to the head of the block.
             self.__node_list.insert(0, node)
+            self.__first_serial -= 1
+            self.__serials[node] = self.__first_serial
             node.block = self
             return
         
@@ -162,19 +181,27 @@ class Block(TreeMember):
         if not self.__node_list:
             # If the node list is empty, our job is simple.
             self.__node_list = list(node_list)
+            self.__first_serial = 0
+            self.__serials = dict(
+                (node, serial) for (serial, node) in enumerate(node_list)
+            )
             for node in node_list:
                 node.block = self
             self.step_profile = sample_step_profile
             return
         
         if node_list[0].parent == self.__node_list[-1]:
-            self.__node_list = self.__node_list + node_list
+            first_new_serial = self.__first_serial + len(self.__node_list)
+            self.__node_list.extend(node_list)
         elif self.__node_list[0].parent == node_list[-1]:
+            self.__first_serial -= len(node_list)
+            first_new_serial = self.__first_serial
             self.__node_list = node_list + self.__node_list
         else:
             raise BlockError('List of nodes is not adjacent to existing nodes.')
 
-        for node in node_list:
+        for (i, node) in enumerate(node_list):
+            self.__serials[node] = first_new_serial + i
             node.block = self
 
             
@@ -188,9 +215,11 @@ class Block(TreeMember):
         '''
         assert self.alive
         assert node in self
-        i = self.__node_list.index(node)
+        i = self.index(node)
         second_list = self.__node_list[i+1:]
         self.__node_list = self.__node_list[:i+1]
+        for node in second_list:
+            del self.__serials[node]
         if len(second_list) >= 2:
             Block(second_list)
         else:
@@ -206,6 +235,7 @@ class Block(TreeMember):
         for node in self:
             node.block = None
         self.__node_list = []
+        self.__serials = {}
         self.alive = False
 
         
@@ -227,10 +257,17 @@ class Block(TreeMember):
         assert self.alive
         
         if isinstance(i, int):
-            if (i == 0) or (i == -1) or \
-               (i == len(self) - 1) or (i == -len(self)):
-                self.__node_list[i].block = None
-                return self.__node_list.__delitem__(i)
+            if (i == 0) or (i == -len(self)):
+                node = self.__node_list[0]
+                node.block = None
+                del self.__serials[node]
+                self.__first_serial += 1
+                return self.__node_list.__delitem__(0)
+            elif (i == -1) or (i == len(self) - 1):
+                node = self.__node_list[-1]
+                node.block = None
+                del self.__serials[node]
+                return self.__node_list.__delitem__(-1)
             elif (-len(self) < i < len(self) - 1):
                     raise BlockError("Can't remove a node from the middle of "
                                      "a block")
@@ -295,9 +332,16 @@ class Block(TreeMember):
 
     
     def index(self, node):
-        '''Get the index number of the specified node in the block.'''
+        '''
+        Get the index number of the specified node in the block.
+        
+        This takes constant time, regardless of the block's length.
+        '''
         assert self.alive
-        return self.__node_list.index(node)
+        try:
+            return self.__serials[node] - self.__first_serial
+        except KeyError:
+            raise ValueError('%s is not in the block.' % node)
     
     
     def is_overlapping(self, tree_member):
@@ -405,6 +449,22 @@ class Block(TreeMember):
         return self[0].get_root()
 
     
+    def __getstate__(self):
+        my_dict = dict(self.__dict__)
+        # The serials dict can be rebuilt from the node list, so we don't
+        # bother pickling it:
+        del my_dict['_Block__serials']
+        return my_dict
+    
+    
+    def __setstate__(self, pickled_block_state):
+        self.__dict__.update(pickled_block_state)
+        self.__first_serial = 0
+        self.__serials = dict(
+            (node, serial) for (serial, node) in enumerate(self.__node_list)
+        )
+        
+    
     def __repr__(self):
         '''
         Get a string representation of the block.
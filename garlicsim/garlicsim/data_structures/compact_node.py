@@ -0,0 +1,104 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Defines the `CompactNode` class.
+
+See its documentation for more information.
+'''
+
+from .node import Node
+
+
+__all__ = ['CompactNode']
+
+
+class CompactNode(Node):
+    '''
+    A node that takes up less memory than a regular `Node`.
+
+    Use this for trees with many millions of nodes, where the per-node memory
+    overhead becomes significant. To make a tree use compact nodes, set its
+    `.node_type` to `CompactNode`.
+
+    A compact node keeps its attributes in `__slots__` instead of a
+    `__dict__`. (Since `Node` has no `__slots__`, a compact node still has
+    room for a `__dict__`, but the dict is allocated lazily, only if an
+    attribute that isn't in the slots is set, or `__dict__` is accessed.)
+    Also, its `.children`, `.derived_nodes` and `.ends` are a
+    shared empty tuple until something gets added to them, at which point a
+    list is allocated. (Most nodes have one child, no derived nodes and no
+    ends.)
+
+    Because of that, when adding to these containers, use `._add_child`,
+    `._add_derived_node` and `._add_end` instead of `.append`. Besides that,
+    a compact node has the same interface as a regular `Node`.
+    '''
+
+    __slots__ = ['tree', 'state', 'parent', 'step_profile', 'touched',
+                 'block', 'children', 'derived_nodes', 'still_in_editing',
+                 'ends']
+
+    def __init__(self, tree, state, parent=None, step_profile=None,
+                 touched=False):
+        '''
+        Construct the node.
+
+        See documentation of `Node.__init__` for details.
+        '''
+        # We're not calling `Node.__init__`, because it would allocate lists
+        # for our containers.
+        self.tree = tree
+        self.state = state
+        self.parent = parent
+        self.step_profile = step_profile
+        self.touched = touched
+        self.block = None
+        self.children = ()
+        self.derived_nodes = ()
+        self.still_in_editing = False
+        self.ends = ()
+
+
+    def _add_child(self, node):
+        '''Add `node` to the children of this node.'''
+        if self.children:
+            self.children.append(node)
+        else:
+            self.children = [node]
+
+
+    def _add_derived_node(self, node):
+        '''Add `node` to the derived nodes of this node.'''
+        if self.derived_nodes:
+            self.derived_nodes.append(node)
+        else:
+            self.derived_nodes = [node]
+
+
+    def _add_end(self, end):
+        '''Add `end` to the ends of this node.'''
+        if self.ends:
+            self.ends.append(end)
+        else:
+            self.ends = [end]
+
+
+    def __getstate__(self):
+        '''Used for pickling.'''
+        pickled_node = dict((name, getattr(self, name)) for name in
+                            self.__slots__)
+        # Attributes that aren't in the slots are in our `__dict__`. Looking
+        # at it allocates it, so if it's empty we free it again:
+        attributes = self.__dict__
+        if attributes:
+            pickled_node.update(attributes)
+        else:
+            del self.__dict__
+        return pickled_node
+
+
+    def __setstate__(self, pickled_node):
+        '''Used for unpickling.'''
+        for (name, value) in pickled_node.iteritems():
+            setattr(self, name, value)
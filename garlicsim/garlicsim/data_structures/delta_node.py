@@ -0,0 +1,201 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Defines the `DeltaNode` class.
+
+See its documentation for more information.
+'''
+
+from __future__ import with_statement
+
+import threading
+import weakref
+
+from garlicsim.general_misc.nifty_collections import OrderedDict
+from garlicsim.misc import state_delta
+from garlicsim.misc.state_deepcopy import state_deepcopy
+
+from .node import Node
+
+
+__all__ = ['DeltaNode']
+
+
+class DeltaNode(Node):
+    '''
+    A node that keeps its state as a delta from its parent's state.
+
+    Use this for long simulations of big states where each step changes only
+    a small part of the state, so the tree won't keep a full state in every
+    node. To make a tree use delta nodes, set its `.node_type` to `DeltaNode`.
+
+    When a delta node gets its first child, it replaces its full state with a
+    delta from its parent's state, made by `garlicsim.misc.state_delta`.
+    (Leaves keep their full states, because that's where crunching continues
+    from.) Every `.keyframe_interval` nodes, a node keeps its full state
+    instead, as a keyframe; so do roots, touched nodes, and nodes whose states
+    can't be delta-encoded.
+
+    `.state` works as usual: When it's accessed, the state is rebuilt by
+    copying the nearest keyframe above the node and applying the deltas from
+    it. The last few states rebuilt are kept in a cache, which is shared by
+    all delta nodes, but doesn't keep them alive. A state rebuilt twice may be
+    a different object each time, so don't rely on `node.state is
+    node.state`.
+
+    Besides that, a delta node has the same interface as a regular `Node`.
+    '''
+
+    keyframe_interval = 100
+    '''
+    The number of nodes from one keyframe to the next.
+
+    Rebuilding a state takes applying up to this many deltas.
+    '''
+
+    cache_size = 10
+    '''The number of rebuilt states kept in the cache.'''
+
+    def __init__(self, tree, state, parent=None, step_profile=None,
+                 touched=False):
+        '''
+        Construct the node.
+
+        See documentation of `Node.__init__` for details.
+        '''
+        self.__base = None
+        '''
+        The node our delta is from, or `None` if we keep our full state.
+
+        This is the node that was our parent when the delta was made. We keep
+        it even if we get a new parent, (like when our parent is deleted,)
+        so our delta stays usable.
+        '''
+
+        self.__delta = None
+        '''Delta from the state of `.__base` to our state.'''
+
+        self.__full_state = None
+        '''Our full state, if we keep it.'''
+
+        self.__keyframe_distance = 0
+        '''The number of deltas between the nearest keyframe and us.'''
+
+        Node.__init__(self, tree, state, parent=parent,
+                      step_profile=step_profile, touched=touched)
+
+
+    def __get_state(self):
+        # `.__encode` may run in another thread while we're here. It sets
+        # `.__base` before it clears `.__full_state`, so if we find no full
+        # state, we can rebuild it:
+        state = self.__full_state
+        if state is not None:
+            return state
+        return self.__rebuild_state()
+
+
+    def __set_state(self, state):
+        self.__full_state = state
+        self.__base = self.__delta = None
+        self.__keyframe_distance = 0
+        with _cache_lock:
+            _forget_dead_nodes()
+            _cache.pop(weakref.ref(self), None)
+
+
+    state = property(__get_state, __set_state,
+                     doc='''The state contained in the node.''')
+
+
+    def _add_child(self, node):
+        '''Add `node` to the children of this node.'''
+        Node._add_child(self, node)
+        if len(self.children) == 1 and self.__base is None:
+            self.__encode()
+
+
+    def __encode(self):
+        '''Replace our full state with a delta from our parent, if we can.'''
+        parent = self.parent
+        if self.touched or self.still_in_editing or \
+           not isinstance(parent, DeltaNode):
+            return
+        keyframe_distance = parent.__keyframe_distance + 1
+        if keyframe_distance >= self.keyframe_interval:
+            return
+        state = self.__full_state
+        try:
+            delta = state_delta.make_delta(parent.state, state)
+        except state_delta.StateDeltaError:
+            return
+        # Our child's delta will be made from our state, so we keep it handy:
+        self.__cache_state(state)
+        self.__delta = delta
+        self.__keyframe_distance = keyframe_distance
+        # Another thread may be reading our state, so we clear our full state
+        # only after our delta is ready to use. (See `.__get_state`.)
+        self.__base = parent
+        self.__full_state = None
+
+
+    def __rebuild_state(self):
+        '''Rebuild our state from the nearest keyframe or cached state.'''
+        deltas = []
+        node = self
+        with _cache_lock:
+            _forget_dead_nodes()
+            while True:
+                if node.__base is None:
+                    state = node.__full_state
+                    break
+                key = weakref.ref(node)
+                if key in _cache:
+                    _cache.move_to_end(key)
+                    state = _cache[key]
+                    break
+                deltas.append(node.__delta)
+                node = node.__base
+        if not deltas:
+            return state
+        state = state_deepcopy(state)
+        for delta in reversed(deltas):
+            state = state_delta.apply_delta(state, delta)
+        self.__cache_state(state)
+        return state
+
+
+    def __cache_state(self, state):
+        '''Put our state in the cache of rebuilt states.'''
+        with _cache_lock:
+            _forget_dead_nodes()
+            _cache.pop(weakref.ref(self), None)
+            _cache[weakref.ref(self, _dead_keys.append)] = state
+            while len(_cache) > self.cache_size:
+                _cache.popitem(last=False)
+
+
+_cache = OrderedDict()
+'''
+Map from a weakref to a delta node to its rebuilt state.
+
+The least recently used states come first.
+'''
+
+_dead_keys = []
+'''
+Keys of `_cache` whose nodes died.
+
+The weakrefs add themselves here when their nodes die. (They can't remove
+themselves from `_cache`, because a node may die while `_cache_lock` is held.)
+'''
+
+_cache_lock = threading.Lock()
+'''Lock that protects `_cache` from being used by two threads.'''
+
+
+def _forget_dead_nodes():
+    '''Remove the states of dead nodes from `_cache`. Hold `_cache_lock`.'''
+    while _dead_keys:
+        _cache.pop(_dead_keys.pop(), None)
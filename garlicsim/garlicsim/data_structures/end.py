@@ -12,6 +12,7 @@ from garlicsim.general_misc import address_tools
 
 from .tree_member import TreeMember
 from .node import Node
+from .tree_journal import BlockSplit, EndAdded
 # from .block import Block (At bottom of file)
     
 
@@ -40,13 +41,16 @@ class End(TreeMember):
         list the end in its `.ends` attribute.
         '''
         
-        self.parent.ends.append(self)
+        self.parent._add_end(self)
         
         self.step_profile = step_profile
         '''The step options profile with which the end was reached.'''
         
         if parent.block and not parent.is_last_on_block():
             parent.block.split(parent)
+            self.tree.journal.record(BlockSplit(parent))
+            
+        self.tree.journal.record(EndAdded(self))
         
         
     def __len__(self):
@@ -140,6 +140,21 @@ class Node(TreeMember):
         self.still_in_editing = False
 
         
+    def _add_child(self, node):
+        '''Add `node` to the children of this node.'''
+        self.children.append(node)
+
+        
+    def _add_derived_node(self, node):
+        '''Add `node` to the derived nodes of this node.'''
+        self.derived_nodes.append(node)
+
+        
+    def _add_end(self, end):
+        '''Add `end` to the ends of this node.'''
+        self.ends.append(end)
+        
+        
     def soft_get_block(self):
         '''
         If this node is a member of a block, return the block.
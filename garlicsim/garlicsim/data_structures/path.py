@@ -8,6 +8,7 @@ See its documentation for more information.
 '''
 
 import copy as copy_module # Avoiding name clash.
+import bisect
 import __builtin__
 
 from garlicsim.general_misc import binary_search
@@ -94,8 +95,134 @@ class Path(object):
         '''
          # todo: Use shallow copy instead of dict.__init__. Will allow
          # dictoids.
+        
+        self.__position_cache = None
+        '''
+        Cache of the positions of the blocks and nodes in the path.
+        
+        This is `None` until first used. See `__get_position_cache` for its
+        structure.
+        '''
 
          
+    def __get_position_cache(self):
+        '''
+        Get the position cache of the path, updating it if it's stale.
+        
+        The position cache is a list `[members, first_indices,
+        member_indices, length]`. `members` is a list of the blocks and
+        blockless nodes that make up the path, `first_indices` is a prefix-sum
+        list of the index in the path of each member's first node,
+        `member_indices` maps each member to its index in `members`, and
+        `length` is the length of the path.
+        
+        The cache is rebuilt when the tree is reshaped, when the root of the
+        path changes or when its decisions change. When nodes were only added
+        to leaves of the tree, the cache is updated incrementally, because
+        such additions can only make the path longer.
+        '''
+        tree = self.tree
+        structure_version = tree.structure_version
+        cache_key = (tree.reshape_version, self.root)
+        
+        if self.__position_cache is not None:
+            (old_cache_key, old_structure_version, old_decisions,
+             position_cache) = self.__position_cache
+            if old_cache_key == cache_key and old_decisions == self.decisions:
+                if old_structure_version != structure_version:
+                    self.__extend_position_cache(position_cache)
+                    self.__position_cache = (cache_key, structure_version,
+                                             self.decisions.copy(),
+                                             position_cache)
+                return position_cache
+        
+        position_cache = [[], [], {}, 0]
+        self.__extend_position_cache(position_cache)
+        
+        # We take the snapshot of the decisions only now, because
+        # `iterate_blockwise` may add decisions when it passes through forks:
+        self.__position_cache = (cache_key, structure_version,
+                                 self.decisions.copy(), position_cache)
+        
+        return position_cache
+    
+    
+    def __extend_position_cache(self, position_cache):
+        '''
+        Update the position cache with nodes that were added to the path's end.
+        
+        The last member of the cache is dropped and the path is walked again
+        from its start, because the last member may have become a longer
+        block, or part of a new one. `position_cache` is modified in place.
+        '''
+        (members, first_indices, member_indices, length) = position_cache
+        
+        if members:
+            last_member = members.pop()
+            del member_indices[last_member]
+            length = first_indices.pop()
+            head = last_member if isinstance(last_member, Node) \
+                   else last_member[0]
+        else:
+            head = None
+            
+        for member in self.iterate_blockwise(head=head):
+            member_indices[member] = len(members)
+            members.append(member)
+            first_indices.append(length)
+            length += len(member)
+        
+        position_cache[3] = length
+        
+        
+    def __get_index_of(self, thing, last=False):
+        '''
+        Get the index in the path of a node or block, using the position cache.
+        
+        For a block, the index of its first node is returned, or of its last
+        node if `last=True`. Returns `None` if `thing` is not on the path.
+        '''
+        (members, first_indices, member_indices, length) = \
+            self.__get_position_cache()
+        
+        if isinstance(thing, Block):
+            block = thing
+        else: # isinstance(thing, Node)
+            block = thing.block
+            
+        if block is None:
+            member_index = member_indices.get(thing, None)
+            if member_index is None:
+                return None
+            return first_indices[member_index]
+        
+        member_index = member_indices.get(block, None)
+        if member_index is None:
+            return None
+        if block is thing:
+            return first_indices[member_index] + \
+                   ((len(block) - 1) if last else 0)
+        else:
+            return first_indices[member_index] + block.index(thing)
+        
+    
+    def __get_node_by_index(self, index):
+        '''
+        Get a node by its non-negative index number, using the position cache.
+        
+        The index must be inside the range of the path.
+        '''
+        (members, first_indices, member_indices, length) = \
+            self.__get_position_cache()
+        assert 0 <= index < length
+        member_index = bisect.bisect_right(first_indices, index) - 1
+        member = members[member_index]
+        if isinstance(member, Block):
+            return member[index - first_indices[member_index]]
+        else: # isinstance(member, Node)
+            return member
+    
+        
     def __len__(self, head=None, tail=None):
         '''
         Get the length of the path in nodes.
@@ -105,7 +232,19 @@ class Path(object):
         '''
         if head is None and self.root is None:
             return 0
-            
+        
+        start = 0 if head is None else self.__get_index_of(head)
+        if tail is None:
+            end = self.__get_position_cache()[3] - 1
+        else:
+            end = self.__get_index_of(tail, last=True)
+        
+        if start is not None and end is not None and start <= end:
+            return end - start + 1
+        
+        # `head` or `tail` is off the path, so we can't use the position cache.
+        # We walk from `head` instead, which will raise the appropriate
+        # exception if `tail` can't be reached:
         return sum(len(thing) for thing in 
                    self.iterate_blockwise(head=head, tail=tail))
 
@@ -296,6 +435,21 @@ class Path(object):
         '''
         
         assert isinstance(thing, Node) or isinstance(thing, Block)
+        
+        start = 0 if head is None else self.__get_index_of(head)
+        if tail is None:
+            end = self.__get_position_cache()[3] - 1
+        else:
+            end = self.__get_index_of(tail, last=True)
+        
+        if start is not None and end is not None:
+            first_index = self.__get_index_of(thing)
+            if first_index is None:
+                return False
+            last_index = self.__get_index_of(thing, last=True)
+            return start <= first_index and last_index <= end
+        
+        # `head` or `tail` is off the path, so we can't use the position cache.
 
         for candidate in self.iterate_blockwise(head=head, tail=tail):
             if candidate is thing:
@@ -349,6 +503,22 @@ class Path(object):
         #todo: generalize `tail` to blocks
         assert isinstance(index, int)
         
+        if tail is None:
+            end = self.__get_position_cache()[3] - 1
+        elif isinstance(tail, Node):
+            end = self.__get_index_of(tail)
+        else: # isinstance(tail, Block)
+            end = None
+            
+        if end is not None:
+            wanted_index = index if index >= 0 else (end + 1 + index)
+            if not 0 <= wanted_index <= end:
+                raise PathOutOfRangeError
+            return self.__get_node_by_index(wanted_index)
+        
+        # `tail` is a block or off the path, so we can't use the position
+        # cache.
+        
         if index >= 0:
             return self.__get_item_positive(index, tail=tail)
         else:
@@ -426,6 +596,17 @@ class Path(object):
         You may optionally specify `head`, which may be either a node or block.
         '''
 
+        if head is None:
+            (members, first_indices, member_indices, length) = \
+                self.__get_position_cache()
+            if not members:
+                raise PathOutOfRangeError("You asked for the last node in "
+                                          "the path, but it's completely "
+                                          "empty.")
+            last_member = members[-1]
+            return last_member if isinstance(last_member, Node) \
+                   else last_member[-1]
+        
         # Setting to `None` before loop, so we know if loop was empty:
         thing = None 
         
@@ -531,72 +712,74 @@ class Path(object):
         # member whose value is lower than the desired value. (Strictly lower,
         # meaning not lower-or-equal.)
         
-        low = self.root
+        (members, first_indices, member_indices, length) = \
+            self.__get_position_cache()
         
-        for thing in self.iterate_blockwise():
-            
-            # Rule: Every time we inspect a new node/block, `low` will be the
-            # node that is its immediate parent. i.e. The highest node possible
-            # from those that we have previously examined.
-            
-            if isinstance(thing, Block):
-                
-                block = thing
-                
-                first = block[0]
-
-                cmp_first = cmp(function(first), value)
-                
-                if cmp_first == -1: # function(first) < value
-                    low = first
-                
-                elif cmp_first == 0: # function(first) == value
-                    return (first, first)
-                    
-                else: # cmp_first == 1 and function(first) > value
-                    return (low, first)
-                    
-                
-                # At this point we know that the first node in the block has a
-                # strictly lower value than the target value.
-                
-                last = block[-1]
-                
-                cmp_last = cmp(function(last), value)
-                
-                if cmp_last == -1: # function(last) < value
-                    low = last
-                    continue
-                
-                elif cmp_last == 0: # function(last) == value                
-                    return (last, last)
-                
-                else: # cmp_last == 1 and function(last) > value
-                    # The two final results are both in the block.
-                    return binary_search.binary_search(
-                        block, function, value, rounding=binary_search.BOTH
-                    )
-                    
-                
-            else: # thing is a Node
-                
-                node = thing
-                
-                cmp_node = cmp(function(node), value)
-                                
-                if cmp_node == -1: # function(node) < value
-                    low = node
-                    continue
-                elif cmp_node == 0: # function(node) == value
-                    return (node, node)
-                else: # function(node) > value
-                    return (low, node)
+        get_first_node = lambda member: \
+            member if isinstance(member, Node) else member[0]
         
-
-        # If the flow reached here, that means that even the last node in the
-        # path has lower value than the value we're looking for.
+        # We binary-search for the last member whose first node has a strictly
+        # lower value than the desired value. We know that the first member
+        # qualifies, because its first node is the root.
+        
+        low_index = 0
+        high_index = len(members)
+        while high_index - low_index > 1:
+            middle_index = (low_index + high_index) // 2
+            middle_node = get_first_node(members[middle_index])
+            cmp_middle = cmp(function(middle_node), value)
+            if cmp_middle == -1: # function(middle_node) < value
+                low_index = middle_index
+            else: # function(middle_node) >= value
+                high_index = middle_index
+        
+        thing = members[low_index]
+        
+        if low_index + 1 < len(members):
+            next_first = get_first_node(members[low_index + 1])
+        else:
+            next_first = None
         
-        return (low, None)
+        if isinstance(thing, Block):
+            
+            block = thing
+            
+            # We know that the first node in the block has a strictly lower
+            # value than the target value.
+            
+            last = block[-1]
+            
+            cmp_last = cmp(function(last), value)
+            
+            if cmp_last == 0: # function(last) == value
+                return (last, last)
+            
+            elif cmp_last == 1: # function(last) > value
+                # The two final results are both in the block.
+                return binary_search.binary_search(
+                    block, function, value, rounding=binary_search.BOTH
+                )
+            
+            # cmp_last == -1 and function(last) < value
+            low = last
+            
+        else: # thing is a Node
+            
+            low = thing
+            
+        # Now `low` is the last node in `thing`, and it has a strictly lower
+        # value than the desired value. The next member's first node, if it
+        # exists, has a higher-or-equal value.
+        
+        if next_first is None:
+            # Even the last node in the path has lower value than the value
+            # we're looking for.
+            return (low, None)
+        
+        if cmp(function(next_first), value) == 0:
+            return (next_first, next_first)
+        else: # function(next_first) > value
+            return (low, next_first)
             
     
     def get_node_occupying_timepoint(self, timepoint):
@@ -642,9 +825,11 @@ class Path(object):
         Modify the path to include the specified node.
         
         Optimization note: Don't try to check whether `node in path` before
-        calling this method. It's more efficient to just call this method
-        without checking first.
+        calling this method. This method checks that by itself, cheaply.
         '''
+        if self.root is not None and self.root.parent is None and \
+           node in self:
+            return
         new_path = node.make_past_path()
         self.root = new_path.root
         self.decisions.update(new_path.decisions)
@@ -747,6 +932,21 @@ class Path(object):
     __copy__ = copy
     
     
+    def __getstate__(self):
+        '''Used for pickling.'''
+        my_dict = dict(self.__dict__)
+        # The position cache can be rebuilt easily, so we don't pickle it:
+        del my_dict['_Path__position_cache']
+        return my_dict
+    
+    
+    def __setstate__(self, pickled_path):
+        '''Used for unpickling.'''
+        self.__dict__.update(pickled_path)
+        self.__position_cache = None
+        
+    
+    
     def __eq__(self, other):
         # Currently horribly inefficient
         assert isinstance(other, Path)
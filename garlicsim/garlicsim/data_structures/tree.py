@@ -11,7 +11,8 @@ import copy
 
 from garlicsim.general_misc import misc_tools
 from garlicsim.general_misc import address_tools
-from garlicsim.general_misc.nifty_collections import OrderedSet
+from garlicsim.general_misc.nifty_collections import (OrderedSet,
+                                                      CompactOrderedSet)
 
 import garlicsim.misc
 from garlicsim.misc import GarlicSimException
@@ -50,12 +51,71 @@ class Tree(object):
     '''
     def __init__(self):
         
-        self.nodes = []
-        '''List of nodes that belong to the tree.'''
+        self.nodes = CompactOrderedSet()
+        '''
+        Ordered set of the nodes that belong to the tree.
+        
+        The nodes are ordered by the time they were added to the tree. Nodes
+        can be removed from it in O(1).
+        '''
         
         self.roots = []
         '''List of roots (parentless nodes) of the tree.'''
         
+        self.node_type = Node
+        '''
+        The class of the nodes that the tree creates for new states.
+        
+        This is `Node` by default. You may set it to `CompactNode` for huge
+        trees, to save memory, or to `DeltaNode` for long simulations of big
+        states, to keep most states as deltas.
+        '''
+        
+        self.structure_version = 0
+        '''
+        Number that is incremented whenever the structure of the tree changes.
+        
+        Objects that cache information about the structure of the tree, like
+        paths, compare this number to the one they saw when they built their
+        cache, so they'll know when their cache became stale.
+        '''
+        
+        self.reshape_version = 0
+        '''
+        Number that gets incremented whenever the tree is reshaped.
+        
+        This is like `.structure_version`, except it doesn't get incremented
+        when a node is added as the only child of a leaf. Such additions only
+        make existing paths longer, so objects that cache information about
+        paths may update their cache incrementally as long as this number
+        stays the same.
+        '''
+        
+        self.leaf_count = 0
+        '''
+        The number of leaves (childless nodes) in the tree.
+        
+        This is also the number of possible paths in the tree, since every
+        possible path ends in a different leaf. It's updated whenever nodes
+        are added or deleted, so it can be used without walking the tree.
+        '''
+        
+        self.__possible_paths_cache = None
+        '''
+        Cache of the result of `.all_possible_paths`.
+        
+        This is a tuple `(structure_version, paths)`, or `None` if
+        `.all_possible_paths` wasn't called yet.
+        '''
+        
+        self.journal = TreeJournal()
+        '''
+        Journal of the changes made to the structure of the tree.
+        
+        Create a listener with `.journal.add_listener()` to learn what changed
+        in the tree since you last checked. See `TreeJournal` for details.
+        '''
+        
         self.lock = garlicsim.general_misc.read_write_lock.ReadWriteLock()
         '''
         A read-write lock that guards access to the tree.
@@ -100,7 +160,7 @@ class Tree(object):
         '''
         touched = (parent is None) or (template_node is not None)
         
-        my_node = Node(
+        my_node = self.node_type(
             self,
             state,
             step_profile=copy.copy(step_profile),
@@ -111,6 +171,68 @@ class Tree(object):
         return my_node
 
 
+    def add_states(self, states, parent=None, step_profile=None):
+        '''
+        Wrap each of `states` in a node and add them to the tree as a chain.
+        
+        The first state is added as a child of `parent`, and every other state
+        is added as a child of the state before it. This is equivalent to
+        calling `add_state` on each state in turn, except it's faster when
+        adding many states: All the new nodes share a single copy of
+        `step_profile`, and they get added to a block in one operation.
+        
+        Returns a list of the new nodes.
+        '''
+        states = list(states)
+        if not states:
+            return []
+        
+        step_profile = copy.copy(step_profile)
+        
+        first_node = self.node_type(
+            self,
+            states[0],
+            step_profile=step_profile,
+            touched=(parent is None)
+        )
+        self.__add_node(first_node, parent)
+        first_node_block = first_node.block
+        
+        nodes = [first_node]
+        current_node = first_node
+        for state in states[1:]:
+            if not hasattr(state, 'clock'):
+                state.clock = current_node.state.clock + 1
+            node = self.node_type(self, state, step_profile=step_profile,
+                                  touched=False)
+            node.parent = current_node
+            current_node._add_child(node)
+            nodes.append(node)
+            current_node = node
+            
+        rest_of_nodes = nodes[1:]
+        if rest_of_nodes:
+            self.nodes.update(rest_of_nodes)
+            # We were only growing a leaf, so no need to touch
+            # `.reshape_version`.
+            self.structure_version += 1
+            
+            if first_node_block is not None:
+                first_node_block.add_node_list(rest_of_nodes)
+            elif not first_node.touched:
+                Block(nodes)
+            elif len(rest_of_nodes) >= 2:
+                Block(rest_of_nodes)
+                
+            self.journal.record(
+                NodesAdded(first_node, rest_of_nodes,
+                           is_structural=(first_node_block is None),
+                           is_fork=False)
+            )
+        
+        return nodes
+    
+    
     def __add_node(self, node, parent=None, template_node=None):
         '''
         Add a node to the tree.
@@ -127,17 +249,27 @@ class Tree(object):
             if not node.touched:
                 raise TreeError("You tried adding an untouched state to a "
                                 "tree while specifying a `template_node`.")
-            template_node.derived_nodes.append(node)
+            template_node._add_derived_node(node)
             
 
-        self.nodes.append(node)
+        self.nodes.add(node)
+        self.structure_version += 1
+        is_fork = (parent is not None) and bool(parent.children)
+        if (parent is None) or is_fork:
+            # We're adding a root or making a fork, not just growing a leaf.
+            self.reshape_version += 1
+            # The new node is a new leaf. (When growing a leaf, the parent
+            # stops being a leaf and the new node takes its place.)
+            self.leaf_count += 1
+            
+        parent_block = parent.block if (parent is not None) else None
 
         if parent:
             if not hasattr(node.state, 'clock'):
                 node.state.clock = parent.state.clock + 1
 
             node.parent = parent
-            parent.children.append(node)
+            parent._add_child(node)
             
             if parent.block:
                 
@@ -153,6 +285,7 @@ class Tree(object):
                     if not (parent is parent.block[-1]):
                         
                         parent.block.split(parent)
+                        self.journal.record(BlockSplit(parent))
                         
             else: # parent.block is None
                 
@@ -168,7 +301,15 @@ class Tree(object):
             if not hasattr(node.state, "clock"):
                 node.state.clock = 0
             self.roots.append(node)
-            return node
+            
+        is_structural = (parent_block is None) or \
+                        (node.block is not parent_block)
+        self.journal.record(
+            NodesAdded(parent, [node], is_structural=is_structural,
+                       is_fork=is_fork)
+        )
+        
+        return node
 
     
     def make_end(self, node, step_profile):
@@ -177,16 +318,32 @@ class Tree(object):
         
         Must specify a step profile with which this end was reached.
         '''
+        # Adding an end doesn't change the number of leaves, but it may split
+        # a block, which changes the members of paths going through it:
+        self.structure_version += 1
+        if node.block and not node.is_last_on_block():
+            self.reshape_version += 1
         end = End(self, node, step_profile)
         return end
     
 
     def all_possible_paths(self):
-        '''Return all the possible paths this tree may entertain.'''
-        result = []
+        '''
+        Return all the possible paths this tree may entertain.
+        
+        The paths are cached until the structure of the tree changes, and
+        copies of them are returned, so you may modify them freely.
+        '''
+        if self.__possible_paths_cache is not None:
+            (structure_version, paths) = self.__possible_paths_cache
+            if structure_version == self.structure_version:
+                return [path.copy() for path in paths]
+            
+        paths = []
         for root in self.roots:
-            result += root.all_possible_paths()
-        return result
+            paths += root.all_possible_paths()
+        self.__possible_paths_cache = (self.structure_version, paths)
+        return [path.copy() for path in paths]
 
 
     def get_step_profiles(self):
@@ -270,6 +427,9 @@ class Tree(object):
         tail_node = node_range.tail if isinstance(node_range.tail, Node) \
                      else node_range.tail[-1]
         
+        self.structure_version += 1
+        self.reshape_version += 1
+        
         if head_node in self.roots:
             self.roots.remove(head_node)
                         
@@ -279,8 +439,13 @@ class Tree(object):
         
         outside_children = node_range.get_outside_children()
             
-        for node in node_range:
+        deleted_nodes = list(node_range)
+        for node in deleted_nodes:
             self.nodes.remove(node)
+            if not node.children:
+                self.leaf_count -= 1
+        if (big_parent is not None) and (not big_parent.children):
+            self.leaf_count += 1
 
         current_block = None
         last_block_change = None
@@ -301,6 +466,13 @@ class Tree(object):
             node.parent = parent_to_use
             if parent_to_use is None:
                 self.roots.append(node)
+                
+        self.journal.record(
+            NodesDeleted(
+                deleted_nodes,
+                outside_children if (parent_to_use is None) else []
+            )
+        )
         
     
     
@@ -326,7 +498,7 @@ class Tree(object):
                    address_tools.describe(type(self), shorten=True),
                    len(self.roots),
                    len(self.nodes),
-                   len(self.all_possible_paths()),
+                   self.leaf_count,
                    hex(id(self))
                )
     
@@ -334,15 +506,25 @@ class Tree(object):
     def __getstate__(self):
         my_dict = dict(self.__dict__)
         del my_dict['lock']
+        del my_dict['journal']
+        del my_dict['_Tree__possible_paths_cache']
+        # Pickling the nodes as a list, like we always did, for compatibility:
+        my_dict['nodes'] = list(self.nodes)
         return my_dict
     
     
     def __setstate__(self, pickled_tree_state):
         self.__init__()
         self.__dict__.update(pickled_tree_state)
+        self.nodes = CompactOrderedSet(self.nodes)
+        if 'leaf_count' not in pickled_tree_state:
+            # This tree was pickled before we started counting leaves.
+            self.leaf_count = \
+                len([node for node in self.nodes if not node.children])
         
         
     
 from .node import Node
 from .block import Block
 from .end import End
+from .tree_journal import TreeJournal, NodesAdded, BlockSplit, NodesDeleted
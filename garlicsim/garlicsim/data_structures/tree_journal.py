@@ -0,0 +1,221 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Defines the `TreeJournal` class and the tree changes it records.
+
+See their documentation for more information.
+'''
+
+import weakref
+
+from garlicsim.general_misc import address_tools
+
+
+__all__ = ['TreeJournal', 'TreeJournalListener', 'TreeChange', 'NodesAdded',
+           'BlockSplit', 'EndAdded', 'NodesDeleted']
+
+
+class TreeChange(object):
+    '''
+    A change that was made to the structure of a tree.
+
+    This is an abstract base class for the different kinds of changes recorded
+    by `TreeJournal`.
+    '''
+
+    is_structural = True
+    '''
+    Whether this change modified the structure of the tree.
+
+    The only change that isn't structural is nodes being added to the end of
+    an existing block, which makes the block longer but doesn't change the
+    shape of the tree.
+    '''
+
+    location = None
+    '''
+    The node at which this change happened, or `None` if it's not at one node.
+    '''
+
+    def __repr__(self):
+        '''
+        Get a string representation of the change.
+
+        Example output:
+        <garlicsim.data_structures.tree_journal.EndAdded at 0x1c822d0>
+        '''
+        return '<%s at %s>' % (
+            address_tools.describe(type(self), shorten=True),
+            hex(id(self))
+        )
+
+
+class NodesAdded(TreeChange):
+    '''A chain of nodes was added to the tree.'''
+
+    def __init__(self, parent, nodes, is_structural, is_fork):
+
+        self.parent = parent
+        '''
+        The node that the first new node was added to.
+
+        This is `None` if the first new node is a root.
+        '''
+
+        self.nodes = nodes
+        '''List of the new nodes, each one a child of the one before it.'''
+
+        self.is_structural = is_structural
+        '''
+        Whether this change modified the structure of the tree.
+
+        This is `False` when the nodes were added to the end of the parent's
+        existing block.
+        '''
+
+        self.is_fork = is_fork
+        '''Whether adding the nodes made a new fork at the parent.'''
+
+        self.location = parent
+
+
+class BlockSplit(TreeChange):
+    '''A block was split in two.'''
+
+    def __init__(self, node):
+
+        self.node = node
+        '''The node at which the block was split. It's last on its block.'''
+
+        self.location = node
+
+
+class EndAdded(TreeChange):
+    '''An end was added to the tree.'''
+
+    def __init__(self, end):
+
+        self.end = end
+        '''The new end.'''
+
+        self.location = end.parent
+
+
+class NodesDeleted(TreeChange):
+    '''Nodes were deleted from the tree.'''
+
+    def __init__(self, nodes, new_roots):
+
+        self.nodes = nodes
+        '''List of the deleted nodes.'''
+
+        self.new_roots = new_roots
+        '''List of the nodes that became roots when their parent died.'''
+
+
+class TreeJournalListener(object):
+    '''
+    A listener to a tree journal, that can drain the changes recorded in it.
+
+    Create one using `TreeJournal.add_listener`.
+    '''
+
+    def __init__(self, journal):
+
+        self.journal = journal
+        '''The journal that this listener listens to.'''
+
+        self.position = journal._get_end_position()
+        '''The position in the journal up to which we have drained.'''
+
+
+    def drain(self):
+        '''Get a list of the changes recorded since we last drained.'''
+        return self.journal._drain(self)
+
+
+class TreeJournal(object):
+    '''
+    A journal of the changes made to the structure of a tree.
+
+    Every tree has a journal as its `.journal` attribute. Code that wants to
+    know what changed in the tree, (like a widget that wants to redraw only the
+    affected parts of the tree,) can create a listener with `.add_listener`
+    and periodically call its `.drain` method to get a list of `TreeChange`
+    objects.
+
+    Changes are kept only until all listeners have drained them, and aren't
+    recorded at all when there are no listeners. The journal isn't pickled
+    with its tree.
+
+    The journal is protected by the tree's lock like the rest of the tree.
+    '''
+
+    def __init__(self):
+
+        self.changes = []
+        '''The changes that weren't yet drained by all listeners.'''
+
+        self.first_position = 0
+        '''The position in the journal of the first change in `.changes`.'''
+
+        self.listeners = weakref.WeakKeyDictionary()
+        '''
+        The listeners of this journal.
+
+        These are held weakly, so a listener which is no longer used doesn't
+        make the journal keep changes forever.
+        '''
+
+
+    def add_listener(self):
+        '''
+        Create a listener to this journal.
+
+        The listener will drain only changes made after its creation.
+        '''
+        listener = TreeJournalListener(self)
+        self.listeners[listener] = None
+        return listener
+
+
+    def remove_listener(self, listener):
+        '''Remove a listener from the journal.'''
+        del self.listeners[listener]
+        self.__trim()
+
+
+    def record(self, change):
+        '''Record a change in the journal, if there are any listeners.'''
+        assert isinstance(change, TreeChange)
+        if self.listeners:
+            self.changes.append(change)
+        elif self.changes:
+            # All the listeners were garbage-collected without being removed.
+            self.__trim()
+
+
+    def _get_end_position(self):
+        '''Get the position in the journal after the last recorded change.'''
+        return self.first_position + len(self.changes)
+
+
+    def _drain(self, listener):
+        '''Get the changes that `listener` didn't drain yet. Internal use.'''
+        start_index = listener.position - self.first_position
+        changes = self.changes[start_index:]
+        listener.position = self._get_end_position()
+        self.__trim()
+        return changes
+
+
+    def __trim(self):
+        '''Forget the changes that were drained by all listeners.'''
+        listeners = self.listeners.keys()
+        if listeners:
+            trim_position = min(listener.position for listener in listeners)
+        else:
+            trim_position = self._get_end_position()
+        del self.changes[:(trim_position - self.first_position)]
+        self.first_position = trim_position
@@ -5,6 +5,7 @@
 
 from .ordered_dict import OrderedDict
 from .ordered_set import OrderedSet
+from .compact_ordered_set import CompactOrderedSet
 from .weak_key_default_dict import WeakKeyDefaultDict
 from .weak_key_identity_dict import WeakKeyIdentityDict
 from .counter import Counter
\ No newline at end of file
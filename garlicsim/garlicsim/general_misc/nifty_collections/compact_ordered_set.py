@@ -0,0 +1,149 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Defines the `CompactOrderedSet` class.
+
+See its documentation for more details.
+'''
+
+from garlicsim.general_misc.third_party import abcs_collection
+
+
+class _Deleted(object):
+    '''Placeholder for an item that was removed from a `CompactOrderedSet`.'''
+
+_deleted = _Deleted()
+
+
+class CompactOrderedSet(abcs_collection.MutableSet):
+    '''
+    A set with an order, which is cheap in memory and supports O(1) removal.
+
+    The items are kept in a list, with a dict mapping each item to its index
+    in the list. Removing an item replaces it in the list with a placeholder,
+    and when placeholders make up more than half of the list, the list is
+    compacted. This makes removal O(1) amortized, while taking much less
+    memory per item than `OrderedSet`'s linked list.
+
+    Getting an item by index is supported, and is O(1) unless items were
+    removed since the last compaction.
+    '''
+
+    def __init__(self, iterable=None):
+        self._items = []
+        '''List of the items, with `_deleted` in place of removed items.'''
+
+        self._indices = {}
+        '''Dict mapping each item to its index in `._items`.'''
+
+        self._deleted_count = 0
+        '''The number of placeholders in `._items`.'''
+
+        if iterable is not None:
+            self.update(iterable)
+
+
+    def __len__(self):
+        return len(self._indices)
+
+
+    def __contains__(self, item):
+        return item in self._indices
+
+
+    def add(self, item):
+        '''
+        Add an item to the end of the set.
+
+        This has no effect if the item is already present.
+        '''
+        if item not in self._indices:
+            self._indices[item] = len(self._items)
+            self._items.append(item)
+
+
+    def update(self, iterable):
+        '''Add all the items in `iterable` to the end of the set.'''
+        for item in iterable:
+            self.add(item)
+
+
+    def discard(self, item):
+        '''
+        Remove an item from the set if it is a member.
+
+        If the item is not a member, do nothing.
+        '''
+        if item in self._indices:
+            self._items[self._indices.pop(item)] = _deleted
+            self._deleted_count += 1
+            if self._deleted_count > len(self._indices):
+                self._compact()
+
+
+    def clear(self):
+        '''Remove all items from the set.'''
+        self._items = []
+        self._indices = {}
+        self._deleted_count = 0
+
+
+    def _compact(self):
+        '''Remove the placeholders of removed items from the list.'''
+        if self._deleted_count:
+            self._items = [item for item in self._items if
+                           item is not _deleted]
+            self._indices = dict(
+                (item, index) for (index, item) in enumerate(self._items)
+            )
+            self._deleted_count = 0
+
+
+    def __iter__(self):
+        for item in self._items:
+            if item is not _deleted:
+                yield item
+
+
+    def __reversed__(self):
+        for item in reversed(self._items):
+            if item is not _deleted:
+                yield item
+
+
+    def __getitem__(self, index):
+        '''Get an item, or a list of items, by index number or slice.'''
+        self._compact()
+        return self._items[index]
+
+
+    def index(self, item):
+        '''Get the index number of an item.'''
+        self._compact()
+        try:
+            return self._indices[item]
+        except KeyError:
+            raise ValueError('%s is not in the set.' % (item,))
+
+
+    def __getstate__(self):
+        '''Used for pickling.'''
+        return list(self)
+
+
+    def __setstate__(self, items):
+        '''Used for unpickling.'''
+        self.__init__(items)
+
+
+    def __repr__(self):
+        if not self:
+            return '%s()' % (self.__class__.__name__,)
+        return '%s(%r)' % (self.__class__.__name__, list(self))
+
+
+    def __eq__(self, other):
+        if isinstance(other, CompactOrderedSet):
+            return len(self) == len(other) and list(self) == list(other)
+        return set(self) == set(other)
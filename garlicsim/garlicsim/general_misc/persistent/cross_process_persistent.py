@@ -102,7 +102,17 @@ class CrossProcessPersistent(Persistent):
             return NotImplemented
         return self.__uuid == other.__uuid
 
-    
+
+    def __fingerprint__(self):
+        '''
+        Get the content that `state_fingerprint` takes our fingerprint from.
+
+        We're read-only and identified by our uuid, so that's all it takes.
+        (This also leaves out our cached `.personality`.)
+        '''
+        return str(self.__uuid)
+
+
     def __getstate__(self):
         my_dict = dict(self.__dict__)
         del my_dict['_CrossProcessPersistent__uuid']
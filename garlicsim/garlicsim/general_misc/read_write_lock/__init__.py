@@ -7,4 +7,4 @@ This package defines a class `ReadWriteLock` in the module `read_write_lock`.
 See that class's documentation for more details.
 '''
 
-from .read_write_lock import ReadWriteLock
+from .read_write_lock import ReadWriteLock, ReadWriteLockStatistics
@@ -4,43 +4,331 @@
 '''
 See documentation of class `ReadWriteLock` defined in this module.
 '''
-# todo: organize.
 
-from . import original_read_write_lock
+from __future__ import with_statement
 
+import threading
+import time
 
-__all__ = ['ReadWriteLock']
+
+__all__ = ['ReadWriteLock', 'ReadWriteLockStatistics']
+
+
+class _ThreadState(threading.local):
+    '''The number of read and write locks that a thread holds.'''
+    reads = 0
+    writes = 0
+    upgraded_reads = 0
+    '''The number of read locks held before upgrading, to restore later.'''
+
+
+class _LockMode(object):
+    '''Context manager that acquires a lock in one mode and releases it.'''
+
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+
+    def __enter__(self):
+        self.acquire()
 
 
-class ContextManager(object):
-    def __init__(self, lock, acquire_func):
-        self.lock = lock
-        self.acquire_func = acquire_func
-    def __enter__(self, *args, **kwargs):
-        self.acquire_func()
     def __exit__(self, *args, **kwargs):
-        self.lock.release()
+        self.release()
+
+
+class ReadWriteLockStatistics(object):
+    '''
+    Statistics about the contention on a `ReadWriteLock`.
+
+    Only the acquisitions that aren't reentrant are counted, since reentrant
+    acquisitions never wait.
+    '''
+
+    def __init__(self):
+
+        self.reads = 0
+        '''The number of times a read lock was acquired.'''
+
+        self.writes = 0
+        '''The number of times a write lock was acquired, upgrades included.'''
+
+        self.contended_reads = 0
+        '''The number of times acquiring a read lock had to wait.'''
+
+        self.contended_writes = 0
+        '''The number of times acquiring a write lock had to wait.'''
 
-        
-class ReadWriteLock(original_read_write_lock.ReadWriteLock):
+        self.read_wait_time = 0.
+        '''The total time in seconds spent waiting for read locks.'''
+
+        self.write_wait_time = 0.
+        '''The total time in seconds spent waiting for write locks.'''
+
+
+    def __repr__(self):
+        return '<%s: %s reads, %s contended, %s writes, %s contended>' % \
+               (type(self).__name__, self.reads, self.contended_reads,
+                self.writes, self.contended_writes)
+
+
+class ReadWriteLock(object):
     '''
-    A ReadWriteLock subclassed from a different ReadWriteLock class defined
-    in the module original_read_write_lock.py, (See the documentation of the
-    original class for more details.)
-    
-    This subclass adds two context managers, one for reading and one for
-    writing.
-    
+    A read-write lock.
+
+    A read-write lock differs from a standard `threading.RLock()` by allowing
+    multiple threads to simultaneously hold a read lock, while allowing only a
+    single thread to hold a write lock at the same point of time.
+
     Usage:
-    
-    lock = ReadWriteLock()
-    with lock.read:
-        pass #perform read operations here
-    with lock.write:
-        pass #perform write operations here
+
+        lock = ReadWriteLock()
+        with lock.read:
+            pass #perform read operations here
+        with lock.write:
+            pass #perform write operations here
+
+    Both modes are reentrant. A thread that holds the write lock may acquire
+    read locks too. A thread that holds a read lock may acquire the write lock,
+    upgrading its lock: It waits until the other readers are gone, and then
+    holds a full write lock until it releases it, and goes back to holding
+    its read locks, so other readers can come in again. Only one
+    thread may wait for an upgrade at a time, since two such threads would
+    wait for each other forever; the second one gets a `ValueError`.
+
+    Writers are preferred: When a writer is waiting, threads that don't
+    already hold a read lock wait before getting one, so a stream of readers
+    can't starve the writer.
+
+    The lock is optimized for the common case of many short, mostly
+    uncontended reads: A thread keeps count of the locks it holds in
+    thread-local storage, so reentrant acquisitions and releases don't
+    synchronize at all, and other acquisitions only take a short internal lock
+    when they don't have to wait.
+
+    If `collect_statistics` is `True`, the lock keeps a
+    `ReadWriteLockStatistics` in `.statistics`. Otherwise `.statistics` is
+    `None`.
     '''
-    # todo: rename from acquireRead style to acquire_read style
-    def __init__(self, *args, **kwargs):
-        original_read_write_lock.ReadWriteLock.__init__(self, *args, **kwargs)
-        self.read = ContextManager(self, self.acquireRead)
-        self.write = ContextManager(self, self.acquireWrite)
\ No newline at end of file
+
+    def __init__(self, collect_statistics=False):
+
+        self.__mutex = threading.Lock()
+        '''Lock that guards the lock's state. Held only briefly.'''
+
+        self.__condition = threading.Condition(self.__mutex)
+        '''Condition for waiting until the lock's state changes.'''
+
+        self.__thread_state = _ThreadState()
+        '''The number of locks held by the current thread.'''
+
+        self.__reader_count = 0
+        '''The number of threads holding a read lock.'''
+
+        self.__writer = None
+        '''The thread holding the write lock, if any.'''
+
+        self.__pending_writers = 0
+        '''The number of threads waiting to acquire the write lock.'''
+
+        self.__upgrading = False
+        '''Whether a reader is waiting to upgrade to a write lock.'''
+
+        self.__waiters = 0
+        '''The number of threads waiting on `.__condition`.'''
+
+        self.statistics = \
+            ReadWriteLockStatistics() if collect_statistics else None
+        '''Contention statistics, or `None`. See `ReadWriteLockStatistics`.'''
+
+        self.read = _LockMode(self.acquire_read, self.release)
+        '''Context manager for holding a read lock.'''
+
+        self.write = _LockMode(self.acquire_write, self.release)
+        '''Context manager for holding a write lock.'''
+
+
+    def acquire_read(self, timeout=None):
+        '''
+        Acquire a read lock for the current thread.
+
+        Waits at most `timeout` seconds, or does a non-blocking check if
+        `timeout` is 0 or less. If the timeout expires, `RuntimeError` is
+        raised. If `timeout` is `None`, waits until the lock is acquired.
+        '''
+        thread_state = self.__thread_state
+        if thread_state.writes:
+            # We're the writer, so we can read too:
+            thread_state.writes += 1
+            return
+        if thread_state.reads:
+            # We're already a reader, so we get another read lock even if
+            # there are writers waiting:
+            thread_state.reads += 1
+            return
+
+        with self.__mutex:
+            statistics = self.statistics
+            if self.__writer is not None or self.__pending_writers or \
+               self.__upgrading:
+                start_time = time.time()
+                self.__wait(self.__can_read, timeout,
+                            'Acquiring read lock timed out')
+                if statistics is not None:
+                    statistics.contended_reads += 1
+                    statistics.read_wait_time += time.time() - start_time
+            self.__reader_count += 1
+            thread_state.reads = 1
+            if statistics is not None:
+                statistics.reads += 1
+
+
+    def acquire_write(self, timeout=None):
+        '''
+        Acquire a write lock for the current thread.
+
+        If the current thread holds a read lock, the lock is upgraded. If
+        another thread is already waiting for an upgrade, `ValueError` is
+        raised, because both threads would wait forever.
+
+        Waits at most `timeout` seconds, or does a non-blocking check if
+        `timeout` is 0 or less. If the timeout expires, `RuntimeError` is
+        raised. If `timeout` is `None`, waits until the lock is acquired.
+        '''
+        thread_state = self.__thread_state
+        if thread_state.writes:
+            thread_state.writes += 1
+            return
+
+        with self.__mutex:
+            statistics = self.statistics
+            start_time = time.time()
+            upgrading = bool(thread_state.reads)
+
+            if upgrading:
+                if self.__upgrading:
+                    raise ValueError('Inevitable dead lock, denying write '
+                                     'lock')
+                # We stop counting as a reader, so we won't wait for
+                # ourselves. New readers and writers wait for us because of
+                # `.__upgrading`.
+                self.__upgrading = True
+                self.__reader_count -= 1
+                try:
+                    waited = self.__wait(self.__can_upgrade, timeout,
+                                         'Acquiring write lock timed out')
+                except RuntimeError:
+                    self.__reader_count += 1
+                    self.__notify()
+                    raise
+                finally:
+                    self.__upgrading = False
+
+            else: # not upgrading
+                self.__pending_writers += 1
+                try:
+                    waited = self.__wait(self.__can_write, timeout,
+                                         'Acquiring write lock timed out')
+                except RuntimeError:
+                    # Readers may have been waiting only for us:
+                    self.__notify()
+                    raise
+                finally:
+                    self.__pending_writers -= 1
+
+            self.__writer = threading.currentThread()
+            # An upgraded reader puts its read locks aside until it releases
+            # the write lock:
+            thread_state.upgraded_reads = thread_state.reads
+            thread_state.writes = 1
+            thread_state.reads = 0
+
+            if statistics is not None:
+                statistics.writes += 1
+                if waited:
+                    statistics.contended_writes += 1
+                    statistics.write_wait_time += time.time() - start_time
+
+
+    def release(self):
+        '''
+        Release the most recently acquired lock of the current thread.
+
+        If the current thread holds no lock, `ValueError` is raised.
+        '''
+        thread_state = self.__thread_state
+        if thread_state.writes:
+            thread_state.writes -= 1
+            if not thread_state.writes:
+                with self.__mutex:
+                    self.__writer = None
+                    if thread_state.upgraded_reads:
+                        # Going back to read mode, without letting a writer
+                        # in between:
+                        thread_state.reads = thread_state.upgraded_reads
+                        thread_state.upgraded_reads = 0
+                        self.__reader_count += 1
+                    self.__notify()
+        elif thread_state.reads:
+            thread_state.reads -= 1
+            if not thread_state.reads:
+                with self.__mutex:
+                    self.__reader_count -= 1
+                    if not self.__reader_count:
+                        self.__notify()
+        else:
+            raise ValueError('Trying to release unheld lock')
+
+
+    # Aliases for compatibility with the old interface:
+    acquireRead = acquire_read
+    acquireWrite = acquire_write
+
+
+    def __can_read(self):
+        '''Return whether a new reader may get a read lock.'''
+        return self.__writer is None and not self.__pending_writers and \
+               not self.__upgrading
+
+
+    def __can_write(self):
+        '''Return whether a pending writer may get the write lock.'''
+        return self.__writer is None and not self.__reader_count and \
+               not self.__upgrading
+
+
+    def __can_upgrade(self):
+        '''Return whether the upgrading reader may get the write lock.'''
+        return self.__writer is None and not self.__reader_count
+
+
+    def __wait(self, is_ready, timeout, message):
+        '''
+        Wait on the condition until `is_ready()`. The mutex must be held.
+
+        Raises `RuntimeError` with `message` if `timeout` seconds pass first.
+        Returns whether we had to wait.
+        '''
+        if is_ready():
+            return False
+        end_time = (time.time() + timeout) if timeout is not None else None
+        self.__waiters += 1
+        try:
+            while not is_ready():
+                if end_time is None:
+                    self.__condition.wait()
+                else:
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        raise RuntimeError(message)
+                    self.__condition.wait(remaining)
+        finally:
+            self.__waiters -= 1
+        return True
+
+
+    def __notify(self):
+        '''Wake up the waiting threads, if any. The mutex must be held.'''
+        if self.__waiters:
+            self.__condition.notifyAll()
@@ -10,14 +10,18 @@ These objects are important enough to be defined near the root of the
 '''
 
 from . import state_deepcopy
+from . import state_fingerprint
+from . import state_delta
 from .exceptions import (InvalidSimpack, SimpackError, GarlicSimWarning,
-                         GarlicSimException, WorldEnded)
+                         GarlicSimException, WorldEnded, WorldLooped)
 from .auto_clock_generator import AutoClockGenerator
 from .base_history_browser import BaseHistoryBrowser
 from .base_step_iterator import BaseStepIterator
 from . import step_iterators
 from .step_profile import StepProfile
 from .nodes_added import NodesAdded
+from .transition_cache import TransitionCache
+from .state_sharer import StateSharer
 from .simpack_grokker import SimpackGrokker
 from . import caching
 from . import settings_constants
@@ -22,5 +22,8 @@ class SimpackError(GarlicSimException):
 class WorldEnded(GarlicSimException):
     '''The simulation has ended.'''
 
+class WorldLooped(WorldEnded):
+    '''The simulation reached a state it was in before, so it would repeat.'''
+
     
 del CuteException
\ No newline at end of file
@@ -37,7 +37,7 @@ class Settings(object):
         
         This is useful because it allows `garlicsim` to detect if a simulation
         has reached a repititive state, so it can stop the crunching right
-        there and avoid wasting resources.
+        there and avoid wasting resources. (See `DETECT_LOOPS`.)
 
         Note that this function does not return `True` or `False`: It returns a
         `DeterminismSetting` class. For details about those, see documentation
@@ -47,6 +47,49 @@ class Settings(object):
         profile is deterministic.
         '''
 
+        self.DETECT_LOOPS = False
+        '''
+        Flag saying whether to end simulations that start repeating themselves.
+
+        If this is `True`, and `DETERMINISM_FUNCTION` says that a step profile
+        is `DETERMINISTIC`, then the step iterators of that step profile
+        compare the states they produce with earlier ones. (Using `==`.) When
+        they find a state equal to an earlier one, the timeline is ended
+        there, because the simulation would only repeat itself from there.
+        Not every state is compared with every earlier one, so the loop may
+        be found a few rounds after it started. (See
+        `LoopDetectingStepIterator`.) This applies to crunchers and to the
+        `simulate` functions, but not to history-dependent simpacks or to
+        inplace step iterators.
+        '''
+
+        self.TRANSITION_CACHE_SIZE = None
+        '''
+        Size in bytes of a cache of the states crunched, or `None` for none.
+
+        If this is set, and `DETERMINISM_FUNCTION` says that a step profile is
+        `DETERMINISTIC`, then the states produced with that step profile are
+        kept in a `TransitionCache` of that size, so crunching again from the
+        same state, (for example when forking the same node again,) doesn't
+        call the step function. This works only for simple and inplace step
+        functions, (not step generators or history step functions,) and the
+        states must be pickleable.
+        '''
+
+        self.STRUCTURAL_SHARING = False
+        '''
+        Flag saying whether states from inplace step functions share objects.
+
+        If this is `True`, then the step iterators of inplace step functions
+        and inplace step generators don't deepcopy the whole state on every
+        step. Instead, they use a `StateSharer` to make states which share the
+        objects that didn't change in the step with the state before them.
+        This means that the objects in states must never be changed, and that
+        objects which have their own ways of being copied, (like
+        `__deepcopy__`,) are copied on every step, as are those in reference
+        cycles.
+        '''
+
         self.SCALAR_STATE_FUNCTIONS = []
         '''
         List of scalar state functions given by the simpack.
@@ -63,4 +106,17 @@ class Settings(object):
         A scalar history function is a function from a history browser to a
         real number. These should be decorated by
         `garlicsim.misc.cached.history_cache`.
+        '''
+
+        self.HISTORY_WINDOW = None
+        '''
+        How many states back a history-dependent simpack looks, or `None`.
+
+        If the history step function never looks further back than the last
+        `HISTORY_WINDOW` states, (the last state included,) you may say so
+        here. Crunchers that keep their own copy of the timeline, like
+        `ProcessCruncher`, will then copy and keep only that many states,
+        instead of the whole timeline.
+
+        `None` means that the step function may look at the whole timeline.
         '''
\ No newline at end of file
@@ -45,6 +45,17 @@ class SimpackGrokker(object):
         self.__init_analysis()
         self.__init_analysis_settings()
         self.__init_analysis_cruncher_types()
+        
+        self.transition_cache = None
+        '''
+        `TransitionCache` for deterministic step profiles, or `None`.
+        
+        It's made if the simpack has a `TRANSITION_CACHE_SIZE` setting.
+        '''
+        if self.settings.TRANSITION_CACHE_SIZE is not None:
+            self.transition_cache = garlicsim.misc.TransitionCache(
+                self.settings.TRANSITION_CACHE_SIZE
+            )
 
         
     def __init_analysis(self):
@@ -346,13 +357,63 @@ class SimpackGrokker(object):
         
         The step profile will specify which parameters to pass to the simpack's
         step function.
+        
+        If loop detection is available for the step profile, (see
+        `.is_loop_detection_available`,) the step iterator ends the simulation
+        when it starts repeating itself.
+        
+        If we have a `.transition_cache` and the step profile is deterministic,
+        the step iterator takes the states it can from the cache.
+        
+        If the simpack asked for `STRUCTURAL_SHARING`, the step iterators of
+        inplace step functions produce states which share unchanged objects.
         '''
         
         step_function = step_profile.step_function
         step_type = StepType.get_step_type(step_function)
         
-        return step_type.step_iterator_class(state_or_history_browser,
-                                             step_profile)
+        step_iterator = step_type.step_iterator_class(state_or_history_browser,
+                                                      step_profile)
+        
+        if self.transition_cache is not None and \
+           step_type in (step_types.SimpleStep, step_types.InplaceStep) and \
+           self.__is_deterministic(step_profile):
+            step_iterator.transition_cache = self.transition_cache
+        
+        if self.settings.STRUCTURAL_SHARING and \
+           step_type in (step_types.InplaceStep,
+                         step_types.InplaceStepGenerator):
+            step_iterator.state_sharer = garlicsim.misc.StateSharer()
+        
+        if self.is_loop_detection_available(step_profile):
+            return step_iterators_module.LoopDetectingStepIterator(
+                step_iterator,
+                state_or_history_browser
+            )
+        else:
+            return step_iterator
+        
+    
+    def is_loop_detection_available(self, step_profile):
+        '''
+        Return whether step iterators of `step_profile` should detect loops.
+        
+        This is when the simpack asked for it with the `DETECT_LOOPS` setting,
+        and `step_profile` is deterministic and not history-dependent.
+        '''
+        if not self.settings.DETECT_LOOPS:
+            return False
+        step_type = StepType.get_step_type(step_profile.step_function)
+        if step_type in (step_types.HistoryStep,
+                         step_types.HistoryStepGenerator):
+            return False
+        return self.__is_deterministic(step_profile)
+    
+    
+    def __is_deterministic(self, step_profile):
+        '''Return whether the simpack says `step_profile` is deterministic.'''
+        return self.settings.DETERMINISM_FUNCTION(step_profile) is \
+               garlicsim.misc.settings_constants.DETERMINISTIC
         
     
     def get_inplace_step_iterator(self, state, step_profile):
@@ -0,0 +1,242 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `make_delta` and `apply_delta` functions.
+
+See their documentation for more information.
+'''
+
+import copy
+import itertools
+
+from .exceptions import GarlicSimException
+from .state_deepcopy import StateCopy
+from .state_sharer import (_atomic_types, _get_items_functions,
+                           _get_get_items_function, _get_object_items)
+
+
+__all__ = ['make_delta', 'apply_delta', 'StateDeltaError']
+
+
+class StateDeltaError(GarlicSimException):
+    '''A delta can't be made between two states.'''
+
+
+def make_delta(old_state, new_state):
+    '''
+    Make a delta that turns a copy of `old_state` into a copy of `new_state`.
+
+    The delta is a compact description of what changed between the states,
+    to be given to `apply_delta`. Usually it's much smaller than the state.
+
+    An object in the state may make its own deltas by defining two methods:
+    `__make_delta__(self, old_thing)`, which returns a delta from `old_thing`,
+    (an object of the same class,) to itself, or `NotImplemented`; and
+    `__apply_delta__(self, delta)`, which changes itself in place according to
+    the delta. The state itself may define them too.
+
+    Other objects are compared recursively: Lists, tuples, dicts and simple
+    objects are compared item by item, and numbers and strings by value.
+    Objects which have their own ways of being copied, like those with
+    `__deepcopy__`, `__getstate__` or `__slots__`, are kept whole in the delta
+    if they changed. The delta refers to objects of `new_state`, so neither of
+    the states may be changed after making it, (which is true for all states
+    in the tree anyway.)
+
+    Raises `StateDeltaError` if `new_state` refers to the same object more
+    than once, (including through a reference cycle,) because a delta
+    wouldn't keep these references to the same object.
+    '''
+    return _diff(old_state, new_state, set())
+
+
+def apply_delta(state, delta):
+    '''
+    Apply a delta made by `make_delta` to `state`.
+
+    `state` must be equal to the old state that the delta was made from. It is
+    changed in place, and the new state is returned. (Usually this is `state`
+    itself, but not always.) The delta itself isn't changed, so it can be
+    applied again to another state.
+    '''
+    return _apply(state, delta, StateCopy())
+
+
+def _visit(thing, seen):
+    '''Note that we met `thing` in the new state; raise if we met it before.'''
+    if not _is_atomic(type(thing)):
+        id_ = id(thing)
+        if id_ in seen:
+            raise StateDeltaError("The state refers to an object of type "
+                                  "`%s` more than once." % type(thing))
+        seen.add(id_)
+
+
+def _get_get_items(type_):
+    '''Get the function that gets the items of objects of `type_`.'''
+    try:
+        return _get_items_functions[type_]
+    except KeyError:
+        return _get_get_items_function(type_)
+
+
+def _is_atomic(type_):
+    '''Is `type_` one that we compare by value, without looking inside?'''
+    if type_ not in _atomic_types:
+        # This adds `Persistent` types to `_atomic_types`:
+        _get_get_items(type_)
+    return type_ in _atomic_types
+
+
+def _replace(thing, seen):
+    '''Make a delta that replaces the old object with `thing`.'''
+    _visit_all(thing, seen)
+    return ('=', thing)
+
+
+def _visit_all(thing, seen):
+    '''Visit `thing` and everything under it.'''
+    _visit(thing, seen)
+    thing_type = type(thing)
+    if not _is_atomic(thing_type):
+        get_items = _get_get_items(thing_type)
+        if get_items is not None:
+            for item in get_items(thing):
+                if type(item) not in _atomic_types:
+                    _visit_all(item, seen)
+
+
+def _diff(old, new, seen):
+    '''
+    Make a delta from `old` to `new`.
+
+    Returns `None` if `old` and `new` are the same.
+    '''
+    new_type = type(new)
+    if _is_atomic(new_type):
+        if type(old) is new_type and (old is new or old == new):
+            return None
+        return ('=', new)
+    if old is new:
+        # States are never changed, so it's the same object with the same
+        # content. We still visit everything under it, in case the state
+        # refers to one of these objects from somewhere else too:
+        _visit_all(new, seen)
+        return None
+    if type(old) is not new_type:
+        return _replace(new, seen)
+    _visit(new, seen)
+
+    if hasattr(new_type, '__make_delta__'):
+        delta = new.__make_delta__(old)
+        if delta is not NotImplemented:
+            return ('h', delta)
+
+    get_items = _get_get_items(new_type)
+    if new_type is list or new_type is tuple:
+        (length, changes) = _diff_sequence(old, new, seen)
+        if length == len(old) and not changes:
+            return None
+        return ('l' if new_type is list else 't', length, changes)
+    elif new_type is dict or get_items is _get_object_items:
+        if new_type is dict:
+            (changes, removed_keys) = _diff_dict(old, new, seen)
+        else:
+            (changes, removed_keys) = _diff_dict(vars(old), vars(new), seen)
+        if not changes and not removed_keys:
+            return None
+        return ('d' if new_type is dict else 'o', changes, removed_keys)
+    else:
+        # An object with its own ways of being copied; we don't look inside.
+        return ('=', new)
+
+
+def _diff_sequence(old, new, seen):
+    '''
+    Diff two lists or two tuples.
+
+    Returns the length of `new` and a list of `(index, delta)` pairs for the
+    items that changed, in order.
+    '''
+    if _atomic_types.issuperset(map(type, new)):
+        # Sequences of numbers, like boards and grids, are common in states,
+        # so we compare them quickly:
+        changes = [(i, ('=', item)) for (i, (old_item, item)) in
+                   enumerate(itertools.izip(old, new)) if
+                   type(old_item) is not type(item) or old_item != item]
+    else:
+        changes = []
+        for (i, (old_item, item)) in enumerate(itertools.izip(old, new)):
+            delta = _diff(old_item, item, seen)
+            if delta is not None:
+                changes.append((i, delta))
+    for i in xrange(len(old), len(new)):
+        changes.append((i, _replace(new[i], seen)))
+    return (len(new), changes)
+
+
+def _diff_dict(old, new, seen):
+    '''
+    Diff two dicts.
+
+    Returns a list of `(key, delta)` pairs for the keys that changed or were
+    added, and a list of the keys that were removed.
+    '''
+    changes = []
+    for (key, value) in new.iteritems():
+        if not _is_atomic(type(key)):
+            raise StateDeltaError("The state has a dict with a key of type "
+                                  "`%s`, which we can't diff." % type(key))
+        if key in old:
+            delta = _diff(old[key], value, seen)
+        else:
+            delta = _replace(value, seen)
+        if delta is not None:
+            changes.append((key, delta))
+    removed_keys = [key for key in old if key not in new]
+    return (changes, removed_keys)
+
+
+def _apply(thing, delta, memo):
+    '''Apply `delta` to `thing`, returning the result.'''
+    if delta is None:
+        return thing
+    tag = delta[0]
+    if tag == '=':
+        value = delta[1]
+        if type(value) in _atomic_types:
+            return value
+        return copy.deepcopy(value, memo)
+    elif tag == 'h':
+        thing.__apply_delta__(delta[1])
+        return thing
+    elif tag == 'l':
+        (tag, length, changes) = delta
+        del thing[length:]
+        _apply_sequence(thing, changes, memo)
+        return thing
+    elif tag == 't':
+        (tag, length, changes) = delta
+        items = list(thing[:length])
+        _apply_sequence(items, changes, memo)
+        return tuple(items)
+    else:
+        assert tag in ('d', 'o')
+        (tag, changes, removed_keys) = delta
+        dict_ = thing if tag == 'd' else vars(thing)
+        for key in removed_keys:
+            del dict_[key]
+        for (key, item_delta) in changes:
+            dict_[key] = _apply(dict_.get(key), item_delta, memo)
+        return thing
+
+
+def _apply_sequence(items, changes, memo):
+    '''Apply the `changes` of a sequence delta to the list `items`.'''
+    length = len(items)
+    for (i, item_delta) in changes:
+        if i < length:
+            items[i] = _apply(items[i], item_delta, memo)
+        else:
+            items.append(_apply(None, item_delta, memo))
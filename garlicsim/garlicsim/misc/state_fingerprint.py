@@ -0,0 +1,316 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `state_fingerprint` function.
+
+See its documentation for more information.
+'''
+
+import types
+import array
+import inspect
+import hashlib
+
+
+__all__ = ['state_fingerprint', 'Fingerprinter']
+
+
+def state_fingerprint(state):
+    '''
+    Get a fingerprint of the content of a state.
+
+    The fingerprint is a short string, (a SHA-1 digest,) which is the same for
+    states with the same content, and almost surely different for states with
+    different content. It doesn't depend on the identities of the objects in
+    the state, so it's the same in every process and every run, and for
+    deepcopies of the state.
+
+    The state is walked recursively: Lists, tuples, dicts and sets are walked
+    into, and so are the `__dict__` and `__slots__` of other objects. Numbers
+    and strings are taken by value, and functions, classes and modules by
+    name. An object that the state refers to more than once, (including
+    through a cycle,) is walked only the first time; later references to it
+    are fingerprinted by their order of appearance. Tuples and frozensets are
+    the exception: They can't be changed, so they're walked every time.
+
+    An object may decide what its fingerprint is taken from by defining a
+    `__fingerprint__` method, which returns the content to fingerprint
+    instead of the object. This is useful for skipping caches and other
+    attributes which aren't part of the content, and for speed.
+
+    The `.clock` of the state is part of its content.
+    '''
+    fingerprinter = Fingerprinter()
+    fingerprinter.feed(state)
+    return fingerprinter.hash.digest()
+
+
+class Fingerprinter(object):
+    '''
+    Device for fingerprinting objects.
+
+    Feed it objects with `.feed`, and take the fingerprint from `.hash`. Use
+    `state_fingerprint` rather than using this directly.
+    '''
+
+    def __init__(self):
+
+        self.hash = hashlib.sha1()
+        '''The hash object that we feed the content to.'''
+
+        self.memo = {}
+        '''Map from `id` of an object we walked into to its order.'''
+
+        self.walked = []
+        '''
+        The objects we walked into.
+
+        We keep them alive, so their `id`s won't be reused while we walk.
+        '''
+
+
+    def feed(self, thing):
+        '''Feed the content of `thing` to `.hash`.'''
+        thing_type = getattr(thing, '__class__', type(thing))
+        try:
+            function = _dispatch_cache[thing_type]
+        except KeyError:
+            function = _get_fingerprint_function(thing_type)
+        function(self, thing)
+
+
+    def enter(self, thing):
+        '''
+        Start walking into `thing`.
+
+        Returns `True` if we should walk into it. If we already have, a
+        reference to it is fed instead, and `False` is returned.
+        '''
+        id_ = id(thing)
+        try:
+            order = self.memo[id_]
+        except KeyError:
+            self.memo[id_] = len(self.walked)
+            self.walked.append(thing)
+            return True
+        self.hash.update('r%s;' % order)
+        return False
+
+
+def _get_name(thing):
+    '''Get the full name of a function, class or module.'''
+    return '%s.%s' % (getattr(thing, '__module__', ''),
+                      getattr(thing, '__name__', ''))
+
+
+def _fingerprint_atom(fingerprinter, thing):
+    '''Fingerprint a number, `None` or any other thing with an exact repr.'''
+    fingerprinter.hash.update('%s:%r;' % (type(thing).__name__, thing))
+
+
+def _fingerprint_str(fingerprinter, thing):
+    '''Fingerprint a `str`.'''
+    fingerprinter.hash.update('s%s:' % len(thing))
+    fingerprinter.hash.update(thing)
+
+
+def _fingerprint_unicode(fingerprinter, thing):
+    '''Fingerprint a `unicode`.'''
+    _fingerprint_str(fingerprinter, thing.encode('utf-8'))
+
+
+_repr_types = frozenset((bool, int, long, float, complex, str, unicode,
+                         type(None)))
+'''Types whose repr is exact, so sequences of them can be taken by repr.'''
+
+
+def _fingerprint_sequence(fingerprinter, thing):
+    '''Fingerprint a `list` or `tuple`.'''
+    # A tuple can't be changed, so it's part of the content no matter where
+    # else it's referred from, and we walk it every time we meet it. This
+    # way two references to one tuple get the same fingerprint as two equal
+    # tuples:
+    if type(thing) is not tuple and not fingerprinter.enter(thing):
+        return
+    hash_update = fingerprinter.hash.update
+    hash_update('%s%s(' % (type(thing).__name__, len(thing)))
+    # Sequences of numbers, like boards and grids, are common in states, and
+    # taking their repr is much faster than walking them:
+    if _repr_types.issuperset(map(type, thing)):
+        hash_update(repr(thing))
+    else:
+        for item in thing:
+            fingerprinter.feed(item)
+    _feed_attributes(fingerprinter, thing)
+    hash_update(')')
+
+
+def _fingerprint_dict(fingerprinter, thing):
+    '''Fingerprint a `dict`, regardless of the order of its items.'''
+    if not fingerprinter.enter(thing):
+        return
+    fingerprinter.hash.update('%s%s{' % (type(thing).__name__, len(thing)))
+    _feed_items(fingerprinter, thing.items())
+    _feed_attributes(fingerprinter, thing)
+    fingerprinter.hash.update('}')
+
+
+def _feed_items(fingerprinter, items):
+    '''Feed the items of a dict, sorted so their order won't matter.'''
+    if all(type(key) is str for (key, value) in items):
+        items.sort()
+    else:
+        items.sort(key=lambda item: state_fingerprint(item[0]))
+    for (key, value) in items:
+        fingerprinter.feed(key)
+        fingerprinter.feed(value)
+
+
+def _feed_attributes(fingerprinter, thing):
+    '''
+    Feed the attributes of a list, tuple, dict or set, if it has any.
+
+    Only instances of subclasses of these types may have attributes.
+    '''
+    if type(thing) in _container_types:
+        return
+    attributes = getattr(thing, '__dict__', None)
+    if attributes:
+        fingerprinter.hash.update('.(')
+        _feed_items(fingerprinter, attributes.items())
+        fingerprinter.hash.update(')')
+
+
+def _fingerprint_set(fingerprinter, thing):
+    '''Fingerprint a `set` or `frozenset`.'''
+    if type(thing) is not frozenset and not fingerprinter.enter(thing):
+        return
+    fingerprinter.hash.update('%s%s{' % (type(thing).__name__, len(thing)))
+    for fingerprint in sorted(state_fingerprint(item) for item in thing):
+        fingerprinter.hash.update(fingerprint)
+    _feed_attributes(fingerprinter, thing)
+    fingerprinter.hash.update('}')
+
+
+_container_types = frozenset((list, tuple, dict, set, frozenset))
+'''The types that are walked into, whose instances have no attributes.'''
+
+
+def _fingerprint_array(fingerprinter, thing):
+    '''Fingerprint an `array.array`.'''
+    fingerprinter.hash.update('a%s%s:' % (thing.typecode, len(thing)))
+    fingerprinter.hash.update(thing.tostring())
+
+
+def _fingerprint_by_name(fingerprinter, thing):
+    '''Fingerprint a function, class or module by its name.'''
+    fingerprinter.hash.update('n%s;' % _get_name(thing))
+
+
+def _fingerprint_method(fingerprinter, thing):
+    '''Fingerprint a method by its name and the object it's bound to.'''
+    fingerprinter.hash.update('m%s;' % _get_name(thing.im_func))
+    fingerprinter.feed(thing.im_self)
+
+
+def _fingerprint_by_hook(fingerprinter, thing):
+    '''Fingerprint an object by what its `__fingerprint__` method returns.'''
+    if not fingerprinter.enter(thing):
+        return
+    fingerprinter.hash.update('h%s(' % _get_name(thing.__class__))
+    fingerprinter.feed(thing.__fingerprint__())
+    fingerprinter.hash.update(')')
+
+
+def _fingerprint_object(fingerprinter, thing):
+    '''Fingerprint an object by its class and attributes.'''
+    if not fingerprinter.enter(thing):
+        return
+    thing_type = thing.__class__
+    fingerprinter.hash.update('o%s(' % _get_name(thing_type))
+    if hasattr(thing, '__dict__'):
+        _feed_items(fingerprinter, vars(thing).items())
+    slots = _slots_cache.get(thing_type)
+    if slots is None:
+        slots = _slots_cache[thing_type] = _get_slots(thing_type)
+    for slot in slots:
+        fingerprinter.feed(getattr(thing, slot, _missing))
+    fingerprinter.hash.update(')')
+
+
+def _get_slots(type_):
+    '''Get the names of the slots of `type_` and its base classes.'''
+    slots = []
+    for base_class in inspect.getmro(type_):
+        base_class_slots = vars(base_class).get('__slots__', ())
+        if isinstance(base_class_slots, basestring):
+            base_class_slots = (base_class_slots,)
+        for slot in base_class_slots:
+            if slot not in ('__dict__', '__weakref__') and \
+               slot not in slots:
+                slots.append(slot)
+    return tuple(slots)
+
+
+_missing = object()
+'''Stands for an empty slot.'''
+
+
+dispatch_map = {
+    object: _fingerprint_object,
+    bool: _fingerprint_atom,
+    int: _fingerprint_atom,
+    long: _fingerprint_atom,
+    float: _fingerprint_atom,
+    complex: _fingerprint_atom,
+    type(None): _fingerprint_atom,
+    str: _fingerprint_str,
+    unicode: _fingerprint_unicode,
+    tuple: _fingerprint_sequence,
+    list: _fingerprint_sequence,
+    dict: _fingerprint_dict,
+    set: _fingerprint_set,
+    frozenset: _fingerprint_set,
+    array.array: _fingerprint_array,
+    type: _fingerprint_by_name,
+    types.ClassType: _fingerprint_by_name,
+    types.ModuleType: _fingerprint_by_name,
+    types.FunctionType: _fingerprint_by_name,
+    types.BuiltinFunctionType: _fingerprint_by_name,
+    types.MethodType: _fingerprint_method,
+}
+'''
+`dict` mapping from a type to a function that fingerprints it.
+
+Subclasses of these types are fingerprinted by the function of their nearest
+base class here. Changes to this map don't affect types that were already
+fingerprinted.
+'''
+
+
+_dispatch_cache = {}
+'''
+`dict` mapping from a type to the function that fingerprints it.
+
+Filled as we meet types, so we don't go over a type's base classes every time.
+'''
+
+_slots_cache = {}
+'''`dict` mapping from a type to the names of its slots.'''
+
+
+def _get_fingerprint_function(type_):
+    '''Get the function that fingerprints `type_`, and cache it.'''
+    if hasattr(type_, '__fingerprint__'):
+        function = _fingerprint_by_hook
+    else:
+        for base_class in inspect.getmro(type_):
+            if base_class in dispatch_map:
+                function = dispatch_map[base_class]
+                break
+        else:
+            # An old-style class:
+            function = _fingerprint_object
+    _dispatch_cache[type_] = function
+    return function
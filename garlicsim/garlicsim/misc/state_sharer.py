@@ -0,0 +1,216 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `StateSharer` class.
+
+See its documentation for more info.
+'''
+
+import copy
+import copy_reg
+import inspect
+import operator
+import types
+
+from garlicsim.general_misc.persistent import Persistent
+from garlicsim.misc.state_deepcopy import StateCopy
+
+
+__all__ = ['StateSharer']
+
+
+class StateSharer(object):
+    '''
+    Device for copying a state again and again, sharing what didn't change.
+
+    An inplace step iterator keeps one state which it changes in place, and
+    puts a copy of it in the tree after every step. Usually each step changes
+    only a small part of the state, so instead of deepcopying all of it every
+    time, `.copy` makes a copy which shares with the previous copy all the
+    objects that didn't change since it was made.
+
+    Changes are found by comparing each object with how it was on the previous
+    copy: An object is unchanged if it has the same items or attributes as it
+    had then, (compared by identity,) and everything under them is unchanged
+    too. This works for lists, tuples, dicts and simple objects. Objects that
+    have their own ways of being copied, like those with `__deepcopy__`,
+    `__getstate__` or `__slots__`, are copied every time, and so is every
+    object that refers to them. So are all the objects in a reference cycle
+    that we meet while walking the state. `Persistent` objects are never
+    copied, like in `state_deepcopy`.
+
+    The states produced share objects with each other, so they must never be
+    changed, (which is true for all states in the tree anyway,) and the state
+    that we copy must not be changed while we copy it.
+    '''
+
+    def __init__(self):
+
+        self.records = {}
+        '''
+        Map from the `id` of each object in the last state copied to a record.
+
+        A record is a tuple `(thing, items)`, with the object and a list of its
+        items, or its attribute names and values, at the time of the copy.
+        '''
+
+        self.copies = {}
+        '''Map from `id` of each object we last copied to its copy.'''
+
+        self.__old_records = None
+        '''The records of the copy before the one being made.'''
+
+        self.__statuses = None
+        '''
+        Map from `id` of an object to whether it's unchanged since last copy.
+
+        `None` means we're still walking into the object.
+        '''
+
+
+    def copy(self, state):
+        '''
+        Deepcopy `state`, sharing objects with the previous copy if possible.
+
+        The first copy is a full deepcopy, (except for `Persistent` objects.)
+        '''
+        self.__old_records = self.records
+        self.records = {}
+        self.__statuses = {}
+        try:
+            self.__walk(state)
+            copies = self.copies
+            memo = StateCopy(
+                (id_, copies[id_]) for (id_, is_unchanged) in
+                self.__statuses.iteritems() if is_unchanged and
+                id_ != id(state)
+            )
+            state_copy = copy.deepcopy(state, memo)
+        except:
+            self.clear()
+            raise
+        finally:
+            self.__old_records = self.__statuses = None
+        # Removing the list in which `deepcopy` keeps the originals alive:
+        memo.pop(id(memo), None)
+        self.copies = memo
+        return state_copy
+
+
+    def clear(self):
+        '''Forget the last copy, so the next copy will be a full one.'''
+        self.records = {}
+        self.copies = {}
+
+
+    def __walk(self, thing):
+        '''
+        Record `thing` and everything under it, and say if they're unchanged.
+        '''
+        thing_type = type(thing)
+        if thing_type in _atomic_types:
+            return True
+        id_ = id(thing)
+        statuses = self.__statuses
+        if id_ in statuses:
+            # If the status is `None`, we reached an object in a cycle that
+            # we're still walking into. We don't know yet whether it changed,
+            # so we say it did, to be safe.
+            return bool(statuses[id_])
+        try:
+            get_items = _get_items_functions[thing_type]
+        except KeyError:
+            get_items = _get_get_items_function(thing_type)
+            if thing_type in _atomic_types:
+                return True
+        if get_items is None:
+            statuses[id_] = False
+            return False
+
+        statuses[id_] = None
+        items = get_items(thing)
+        self.records[id_] = (thing, items)
+        old_record = self.__old_records.get(id_)
+        is_unchanged = old_record is not None and \
+                       old_record[0] is thing and \
+                       id_ in self.copies and \
+                       len(old_record[1]) == len(items) and \
+                       all(map(operator.is_, old_record[1], items))
+        for item in items:
+            if type(item) not in _atomic_types and not self.__walk(item):
+                is_unchanged = False
+        statuses[id_] = is_unchanged
+        return is_unchanged
+
+
+def _get_sequence_items(sequence):
+    '''Get the items of a `list` or `tuple`.'''
+    return list(sequence)
+
+
+def _get_dict_items(dict_):
+    '''Get the keys and values of a `dict`.'''
+    return dict_.keys() + dict_.values()
+
+
+def _get_object_items(thing):
+    '''Get the attribute names and values of a simple object.'''
+    return _get_dict_items(vars(thing))
+
+
+class _SimpleObject(object):
+    '''A class whose instances are as simple as objects get.'''
+
+
+_special_names = ('__slots__', '__deepcopy__', '__reduce_ex__', '__reduce__',
+                  '__getstate__', '__setstate__', '__getnewargs__')
+'''If a class defines any of these names, we don't look into its objects.'''
+
+
+def _get_get_items_function(type_):
+    '''
+    Get the function that gets the items of objects of `type_`, and cache it.
+
+    `None` means that `type_` has its own way of being copied, so we don't look
+    into its objects and they're always copied. `Persistent` types aren't
+    copied at all, so they're added to `_atomic_types` instead.
+    '''
+    if issubclass(type_, Persistent):
+        _atomic_types.add(type_)
+        return None
+    mro = inspect.getmro(type_)
+    if type_.__basicsize__ == _SimpleObject.__basicsize__ and \
+       mro[-1] is object and \
+       type_ not in copy_reg.dispatch_table and \
+       not [name for base_class in mro[:-1] for name in _special_names if
+            name in vars(base_class)]:
+        # A class with no `__slots__`, no builtin base classes and no custom
+        # copying.
+        get_items = _get_object_items
+    else:
+        get_items = None
+    _get_items_functions[type_] = get_items
+    return get_items
+
+
+_atomic_types = set((types.NoneType, bool, int, long, float, complex, str,
+                     unicode, type, types.ClassType, types.FunctionType,
+                     types.BuiltinFunctionType))
+'''
+Types that `deepcopy` doesn't copy.
+
+Every `Persistent` type met is added here.
+'''
+
+
+_get_items_functions = {
+    list: _get_sequence_items,
+    tuple: _get_sequence_items,
+    dict: _get_dict_items,
+}
+'''
+Map from a type to the function that gets the items of its objects.
+
+Filled as we meet types. Types mapped to `None` are always copied.
+'''
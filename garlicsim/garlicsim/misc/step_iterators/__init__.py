@@ -14,4 +14,5 @@ from .duplicating_step_iterator import DuplicatingStepIterator
 from .duplicating_step_generator_iterator import \
     DuplicatingStepGeneratorIterator
 from .inplace_step_iterator import InplaceStepIterator
-from .inplace_step_generator_iterator import InplaceStepGeneratorIterator
\ No newline at end of file
+from .inplace_step_generator_iterator import InplaceStepGeneratorIterator
+from .loop_detecting_step_iterator import LoopDetectingStepIterator
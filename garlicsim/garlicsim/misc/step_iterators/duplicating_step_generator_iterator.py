@@ -23,6 +23,9 @@ class DuplicatingStepGeneratorIterator(BaseStepIterator):
     
     The step iterator automatically increments the state's `.clock` by 1 if the
     original step generator doesn't change the `.clock` itself.
+
+    If it has a `.state_sharer`, it uses it to copy the state, so the copies
+    share the objects that didn't change.
     '''
     
     def __init__(self, state, step_profile):
@@ -50,6 +53,14 @@ class DuplicatingStepGeneratorIterator(BaseStepIterator):
         
         self.auto_clock_generator.make_clock(self.current_state)
         
+        self.state_sharer = None
+        '''
+        `StateSharer` for copying the state of the raw generator, or `None`.
+        
+        The simpack grokker sets this if the simpack asked for it with the
+        `STRUCTURAL_SHARING` setting.
+        '''
+        
         self.__build_raw_generator()
 
     
@@ -57,6 +68,8 @@ class DuplicatingStepGeneratorIterator(BaseStepIterator):
         '''Build a raw generator which will perform step for us.'''
         self._state_of_raw_generator = \
             garlicsim.misc.state_deepcopy.state_deepcopy(self.current_state)
+        if self.state_sharer is not None:
+            self.state_sharer.clear()
         self.raw_generator = self.step_profile.step_function(
             self._state_of_raw_generator,
             *self.step_profile.args,
@@ -78,9 +91,14 @@ class DuplicatingStepGeneratorIterator(BaseStepIterator):
                 
             self._auto_clock(self._state_of_raw_generator)
                 
-            self.current_state = garlicsim.misc.state_deepcopy.state_deepcopy(
-                self._state_of_raw_generator
-            )
+            if self.state_sharer is None:
+                self.current_state = \
+                    garlicsim.misc.state_deepcopy.state_deepcopy(
+                        self._state_of_raw_generator
+                    )
+            else:
+                self.current_state = \
+                    self.state_sharer.copy(self._state_of_raw_generator)
             
         except StopIteration:
                 raise SimpackError('The inplace step generator `%s` raised '
@@ -23,6 +23,13 @@ class DuplicatingStepIterator(BaseStepIterator):
     
     The step iterator automatically increments the state's `.clock` by 1 if the
     original step function doesn't change the `.clock` itself.
+    
+    If it has a `.transition_cache`, it takes the next state from there when
+    it can, instead of copying the state and calling the step function.
+
+    If it has a `.state_sharer`, it doesn't deepcopy the state on every
+    iteration. Instead it keeps one working state, which it steps in place,
+    and produces copies of it which share the objects that didn't change.
     '''
     
     def __init__(self, state, step_profile):
@@ -47,21 +54,89 @@ class DuplicatingStepIterator(BaseStepIterator):
         '''Auto-clock generator which ensures all states have `.clock`.'''
         
         self.auto_clock_generator.make_clock(self.current_state)
+
+        self.transition_cache = None
+        '''
+        `TransitionCache` for taking next states from, or `None`.
+        
+        The simpack grokker sets this for deterministic step profiles, if the
+        simpack asked for a cache with the `TRANSITION_CACHE_SIZE` setting.
+        '''
+        
+        self.__key = None
+        '''The key of the transition from `.current_state`, if we know it.'''
+
+        self.state_sharer = None
+        '''
+        `StateSharer` for copying the working state, or `None`.
+
+        The simpack grokker sets this if the simpack asked for it with the
+        `STRUCTURAL_SHARING` setting.
+        '''
+
+        self.__working_state = None
+        '''
+        The state we step in place when we have a `.state_sharer`.
+
+        It has the same content as `.current_state`. `None` means we need to
+        make it again by copying `.current_state`.
+        '''
         
         
     def next(self):
         '''Crunch the next state.'''
-        new_state = \
-            garlicsim.misc.state_deepcopy.state_deepcopy(self.current_state)
+        transition_cache = self.transition_cache
+        if transition_cache is None:
+            self.current_state = self.__step()
+            return self.current_state
+        
+        key = self.__key
+        if key is None:
+            key = transition_cache.make_key(self.current_state,
+                                            self.step_profile)
+        (state, fingerprint) = transition_cache.get(key)
+        if state is None:
+            state = self.__step()
+            fingerprint = transition_cache.put(key, state)
+        else:
+            self._auto_clock(state)
+            self.__working_state = None
+        self.__key = (fingerprint, self.step_profile)
+        self.current_state = state
+        return self.current_state
+    
+    
+    def __step(self):
+        '''Make the next state by copying the state and stepping the copy.'''
+        state_sharer = self.state_sharer
+        if state_sharer is None:
+            new_state = garlicsim.misc.state_deepcopy.state_deepcopy(
+                self.current_state
+            )
+        else:
+            if self.__working_state is None:
+                self.__working_state = \
+                    garlicsim.misc.state_deepcopy.state_deepcopy(
+                        self.current_state
+                    )
+                state_sharer.clear()
+            new_state = self.__working_state
         
-        return_value = self.step_function(new_state,
-                                          *self.step_profile.args,
-                                          **self.step_profile.kwargs)
+        try:
+            return_value = self.step_function(new_state,
+                                              *self.step_profile.args,
+                                              **self.step_profile.kwargs)
+        except:
+            # The step function may have left the working state half-stepped:
+            self.__working_state = None
+            raise
         assert return_value is None
         
         self._auto_clock(new_state)
-        self.current_state = new_state
-        return self.current_state
+        if state_sharer is None:
+            return new_state
+        else:
+            return state_sharer.copy(new_state)
                 
         
     def _auto_clock(self, state):
@@ -0,0 +1,69 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `LoopDetectingStepIterator` class.
+
+See its documentation for more information.
+'''
+
+import garlicsim
+from garlicsim.misc import BaseStepIterator, WorldLooped
+
+
+class LoopDetectingStepIterator(BaseStepIterator):
+    '''
+    A step iterator that ends the simulation when it starts repeating itself.
+
+    This wraps a step iterator of a deterministic step profile. If the wrapped
+    step iterator produces a state equal to one it produced before, then from
+    that point the simulation would repeat the same states forever. So when we
+    notice that, instead of producing the state we raise `WorldLooped`, which
+    ends the timeline.
+
+    To keep memory and time constant, we don't compare each new state with all
+    the states before it. We compare it with the previous state, which finds
+    fixed points right away, and with a checkpoint state which we move forward
+    at doubling intervals, (Brent's algorithm,) which finds a loop of any
+    length within a few rounds of it. So the timeline may go on for a while
+    after it started repeating: Up to about as many states as came before the
+    loop, or two rounds of the loop, whichever is more.
+    '''
+
+    def __init__(self, step_iterator, state):
+
+        self.step_iterator = step_iterator
+        '''The step iterator that produces the states for us.'''
+
+        self.last_state = state
+        '''The last state produced, or the initial state.'''
+
+        self.checkpoint_state = state
+        '''The state that we compare new states with, besides the last one.'''
+
+        self.checkpoint_age = 0
+        '''The number of states produced after `.checkpoint_state`.'''
+
+        self.checkpoint_interval = 1
+        '''The number of states after which we move the checkpoint.'''
+
+
+    def next(self):
+        '''Crunch the next state.'''
+        state = self.step_iterator.next()
+
+        if state == self.last_state:
+            raise WorldLooped('The simulation reached a fixed point; Its '
+                              'state stopped changing.')
+        if state == self.checkpoint_state:
+            raise WorldLooped('The simulation reached a loop of %s states.' %
+                              (self.checkpoint_age + 1))
+
+        self.last_state = state
+        self.checkpoint_age += 1
+        if self.checkpoint_age == self.checkpoint_interval:
+            self.checkpoint_state = state
+            self.checkpoint_age = 0
+            self.checkpoint_interval *= 2
+
+        return state
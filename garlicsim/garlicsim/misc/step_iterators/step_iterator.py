@@ -17,6 +17,9 @@ class StepIterator(BaseStepIterator):
     
     The step iterator automatically adds `.clock` readings if the states
     produced by the step function are missing them.
+    
+    If it has a `.transition_cache`, it takes the next state from there when
+    it can, instead of calling the step function.
     '''
     
     def __init__(self, state, step_profile):
@@ -38,15 +41,48 @@ class StepIterator(BaseStepIterator):
         '''Auto-clock generator which ensures all states have `.clock`.'''
         
         self.auto_clock_generator.make_clock(self.current_state)
+
+        self.transition_cache = None
+        '''
+        `TransitionCache` for taking next states from, or `None`.
+        
+        The simpack grokker sets this for deterministic step profiles, if the
+        simpack asked for a cache with the `TRANSITION_CACHE_SIZE` setting.
+        '''
+        
+        self.__key = None
+        '''The key of the transition from `.current_state`, if we know it.'''
         
         
     def next(self):
         '''Crunch the next state.'''
-        self.current_state = self.step_function(self.current_state,
-                                                *self.step_profile.args,
-                                                **self.step_profile.kwargs)
-        self._auto_clock(self.current_state)
+        transition_cache = self.transition_cache
+        if transition_cache is None:
+            self.current_state = self.__step()
+            return self.current_state
+        
+        key = self.__key
+        if key is None:
+            key = transition_cache.make_key(self.current_state,
+                                            self.step_profile)
+        (state, fingerprint) = transition_cache.get(key)
+        if state is None:
+            state = self.__step()
+            fingerprint = transition_cache.put(key, state)
+        else:
+            self._auto_clock(state)
+        self.__key = (fingerprint, self.step_profile)
+        self.current_state = state
         return self.current_state
+    
+    
+    def __step(self):
+        '''Make the next state by calling the step function.'''
+        state = self.step_function(self.current_state,
+                                   *self.step_profile.args,
+                                   **self.step_profile.kwargs)
+        self._auto_clock(state)
+        return state
                 
         
     def _auto_clock(self, state):
@@ -0,0 +1,160 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+This module defines the `TransitionCache` class.
+
+See its documentation for more info.
+'''
+
+from __future__ import with_statement
+
+import threading
+import hashlib
+import cPickle
+
+from garlicsim.general_misc.nifty_collections import OrderedDict
+
+
+__all__ = ['TransitionCache']
+
+
+class TransitionCache(object):
+    '''
+    A cache of the states that deterministic step profiles produce.
+
+    When a step profile is deterministic, stepping from a state always gives
+    the same next state. So when we're asked to crunch from a state that we've
+    already crunched from, (for example when forking the same node again,) we
+    can take the next state from this cache instead of calling the step
+    function.
+
+    A transition is stored under a key made of a fingerprint of the state and
+    the step profile. The next state is stored pickled, so every time it's
+    taken from the cache it's a new copy. (The tree needs a distinct state
+    object for every node.) The fingerprint of a state is a digest of its
+    pickle; since the next state is pickled anyway, its key costs nothing
+    more, and the step iterator uses it to look up the following transition.
+
+    The cache holds at most `max_size` bytes of pickled states, evicting the
+    least recently used transitions. `.hits` and `.misses` count lookups.
+
+    The cache is thread-safe.
+    '''
+
+    def __init__(self, max_size):
+
+        self.max_size = max_size
+        '''The maximal total size, in bytes, of the pickled states we keep.'''
+
+        self.size = 0
+        '''The total size, in bytes, of the pickled states we keep.'''
+
+        self.hits = 0
+        '''The number of lookups that found a transition.'''
+
+        self.misses = 0
+        '''The number of lookups that didn't find a transition.'''
+
+        self.__transitions = OrderedDict()
+        '''
+        Map from key to pickled next state.
+
+        The least recently used transitions come first.
+        '''
+
+        self.lock = threading.Lock()
+        '''Lock that protects the cache from being used by two threads.'''
+
+
+    @staticmethod
+    def make_fingerprint(pickled_state):
+        '''Make a fingerprint of a state from its pickle.'''
+        return hashlib.sha1(pickled_state).digest()
+
+
+    @staticmethod
+    def make_key(state, step_profile):
+        '''
+        Make the key for stepping from `state` with `step_profile`.
+
+        Raises `cPickle.PicklingError` or `TypeError` if `state` can't be
+        pickled.
+        '''
+        pickled_state = cPickle.dumps(state, cPickle.HIGHEST_PROTOCOL)
+        return (TransitionCache.make_fingerprint(pickled_state), step_profile)
+
+
+    def get(self, key):
+        '''
+        Get the next state for `key`, or `None` if we don't have it.
+
+        Returns a tuple `(next_state, next_fingerprint)`, where
+        `next_fingerprint` is the fingerprint of the next state, for making the
+        key of the following transition.
+        '''
+        with self.lock:
+            try:
+                pickled_state = self.__transitions[key]
+            except KeyError:
+                self.misses += 1
+                return (None, None)
+            self.hits += 1
+            self.__transitions.move_to_end(key)
+        return (cPickle.loads(pickled_state),
+                self.make_fingerprint(pickled_state))
+
+
+    def put(self, key, next_state):
+        '''
+        Store `next_state` as the state that comes after `key`.
+
+        Returns the fingerprint of `next_state`, for making the key of the
+        following transition.
+        '''
+        pickled_state = cPickle.dumps(next_state, cPickle.HIGHEST_PROTOCOL)
+        size = len(pickled_state)
+        if size <= self.max_size:
+            with self.lock:
+                transitions = self.__transitions
+                if key in transitions:
+                    self.size -= len(transitions.pop(key))
+                transitions[key] = pickled_state
+                self.size += size
+                while self.size > self.max_size:
+                    (old_key, old_pickled_state) = \
+                        transitions.popitem(last=False)
+                    self.size -= len(old_pickled_state)
+        return self.make_fingerprint(pickled_state)
+
+
+    def clear(self):
+        '''Remove all the transitions from the cache.'''
+        with self.lock:
+            self.__transitions.clear()
+            self.size = 0
+
+
+    def __getstate__(self):
+        '''
+        Get the cache's state for pickling.
+
+        The transitions aren't pickled; the cache is unpickled empty.
+        '''
+        return {'max_size': self.max_size}
+
+
+    def __setstate__(self, state):
+        '''Set the cache's state when unpickling.'''
+        self.__init__(state['max_size'])
+
+
+    def __len__(self):
+        '''Get the number of transitions in the cache.'''
+        return len(self.__transitions)
+
+
+    def __repr__(self):
+        return '<%s: %s transitions, %s bytes, %s hits, %s misses>' % \
+               (type(self).__name__, len(self), self.size, self.hits,
+                self.misses)
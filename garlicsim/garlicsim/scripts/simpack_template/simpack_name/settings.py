@@ -30,7 +30,7 @@ import garlicsim
 #
 # This is useful because it allows garlicsim to detect if a simulation has
 # reached a repititive state, so it can stop the crunching right there and
-# avoid wasting resources. (01.01.2011 - Still not implemented, sorry.)
+# avoid wasting resources. (See `DETECT_LOOPS` below.)
 #
 # Note that this function does not return `True` or `False`: It returns a
 # `DeterminismSetting` class. For details about those, see documentation in
@@ -38,3 +38,38 @@ import garlicsim
 #
 # The function will return `None` if it's unknown whether the step profile is
 # deterministic.
+
+
+# DETECT_LOOPS = False
+
+# Whether to end simulations that start repeating themselves.
+#
+# If this is `True`, and `DETERMINISM_FUNCTION` says that a step profile is
+# `DETERMINISTIC`, then states produced with that step profile are compared
+# with earlier states using `==`. When a state equal to an earlier one is
+# found, the timeline is ended there, because the simulation would only repeat
+# itself from there. Not every state is compared with every earlier one, so
+# the loop may be found a few rounds after it started, and the timeline may
+# include these repeated states.
+
+
+# TRANSITION_CACHE_SIZE = None
+
+# Size in bytes of a cache of the states crunched, or `None` for no cache.
+#
+# If this is set, and `DETERMINISM_FUNCTION` says that a step profile is
+# `DETERMINISTIC`, then the states produced with that step profile are cached,
+# so crunching again from the same state, (for example when forking the same
+# node again,) takes the next states from the cache instead of calling the
+# step function. The states must be pickleable.
+
+
+# STRUCTURAL_SHARING = False
+
+# Whether states made by inplace step functions share unchanged objects.
+#
+# If this is `True`, then instead of deepcopying the whole state after every
+# step of an inplace step function, only the objects that the step changed are
+# copied, and the new state shares the rest with the state before it. Objects
+# with their own ways of being copied, (like `__deepcopy__`,) and objects in
+# reference cycles are copied on every step.
@@ -97,8 +97,10 @@ def __non_history_simulate(simpack_grokker, state, iterations, step_profile):
     # `__non_history_simulate` is because this function gives the user only the
     # final state, without keeping any states in between. Therefore we can
     # afford doing the steps inplace, and we get better performance because we
-    # don't deepcopy states.
-    if simpack_grokker.is_inplace_iterator_available(step_profile) is True:
+    # don't deepcopy states. (Inplace step iterators can't detect loops
+    # though, so when loops should be detected we use a regular one.)
+    if simpack_grokker.is_inplace_iterator_available(step_profile) is True \
+       and not simpack_grokker.is_loop_detection_available(step_profile):
         state_copy = garlicsim.misc.state_deepcopy.state_deepcopy(state)
         iterator = \
             simpack_grokker.get_inplace_step_iterator(state_copy, step_profile)
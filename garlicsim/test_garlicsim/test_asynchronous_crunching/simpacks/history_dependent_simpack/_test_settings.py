@@ -1,3 +1,5 @@
+from garlicsim.general_misc import import_tools
+
 import garlicsim
 
 from .state import State
@@ -11,4 +13,10 @@ N_STEP_FUNCTIONS = 1
 DEFAULT_STEP_FUNCTION = State.history_step
 DEFAULT_STEP_FUNCTION_TYPE = \
     garlicsim.misc.simpack_grokker.step_types.HistoryStep
-CRUNCHERS_LIST = [garlicsim.asynchronous_crunching.crunchers.ThreadCruncher]
\ No newline at end of file
+CRUNCHERS_LIST = \
+    [garlicsim.asynchronous_crunching.crunchers.ThreadCruncher] + \
+    (
+        [garlicsim.asynchronous_crunching.crunchers.ProcessCruncher] if
+        import_tools.exists('multiprocessing')
+        else []
+    )
\ No newline at end of file
@@ -0,0 +1 @@
+HISTORY_WINDOW = 3
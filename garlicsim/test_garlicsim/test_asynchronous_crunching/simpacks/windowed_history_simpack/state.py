@@ -0,0 +1,20 @@
+import garlicsim.data_structures
+
+
+class State(garlicsim.data_structures.State):
+    '''A state whose value is the sum of the values of the last 3 states.'''
+    
+    def __init__(self, value):
+        self.value = value
+    
+    @staticmethod
+    def history_step(history_browser):
+        n_states = min(len(history_browser), 3)
+        return State(
+            sum(history_browser[-i].value for i in range(1, n_states + 1)) %
+            1000
+        )
+        
+    @staticmethod
+    def create_root():
+        return State(1)
@@ -0,0 +1,107 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for the CPU budget and job priorities of `CrunchingManager`.'''
+
+import time
+
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+
+def test_cpu_budget():
+    '''Test that only the jobs with the highest priority are crunched.'''
+    project = garlicsim.Project(life)
+    crunching_manager = project.crunching_manager
+    crunching_manager.cpu_budget = 2
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+
+    jobs = [project.begin_crunching(root, infinity) for i in xrange(3)]
+    project.sync_crunchers()
+    assert set(crunching_manager.crunchers) == set(jobs[:2])
+    (cruncher_0, cruncher_1) = \
+        [crunching_manager.crunchers[job] for job in jobs[:2]]
+
+    # A waiting job with a higher priority preempts the job with the lowest
+    # priority:
+    jobs[0].priority = 1
+    jobs[2].priority = 2
+    project.sync_crunchers()
+    assert set(crunching_manager.crunchers) == set([jobs[0], jobs[2]])
+    assert crunching_manager.crunchers[jobs[0]] is cruncher_0
+    assert cruncher_1 not in crunching_manager.crunchers.values()
+    assert jobs[1] in crunching_manager.jobs
+
+    # The preempted job is resumed later:
+    for job in jobs:
+        job.crunching_profile.clock_target = 10
+    jobs[1].priority = 3
+    while crunching_manager.jobs:
+        time.sleep(0.1)
+        project.sync_crunchers()
+        assert len(crunching_manager.crunchers) <= 2
+
+    paths = project.tree.all_possible_paths()
+    assert len(paths) == 3
+    for path in paths:
+        # (The crunchers may have crunched past clock 10 before we lowered
+        # the clock target.)
+        assert list(path.states())[:11] == \
+               list(garlicsim.list_simulate(root.state, 10))
+
+
+def test_deadlines():
+    '''Test that jobs with earlier deadlines are crunched first.'''
+    project = garlicsim.Project(life)
+    crunching_manager = project.crunching_manager
+    crunching_manager.cpu_budget = 1
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+
+    job_without_deadline = project.begin_crunching(root, infinity)
+    late_job = project.ensure_buffer_on_path(root, root.make_containing_path(),
+                                             100, deadline=(time.time() + 60))
+    assert late_job is job_without_deadline
+    assert late_job.deadline is not None
+
+    early_job = project.begin_crunching(root, infinity)
+    early_job.advance_deadline(time.time() + 10)
+    late_job.advance_deadline(None)
+    project.sync_crunchers()
+    assert crunching_manager.crunchers.keys() == [early_job]
+
+    # Priority comes before deadline:
+    late_job.raise_priority(1)
+    late_job.raise_priority(0)
+    assert late_job.priority == 1
+    project.sync_crunchers()
+    assert crunching_manager.crunchers.keys() == [late_job]
+
+    del crunching_manager.jobs[:]
+    project.sync_crunchers()
+
+
+def test_preferred_path():
+    '''Test that jobs on the preferred path come first, after priority.'''
+    project = garlicsim.Project(life)
+    crunching_manager = project.crunching_manager
+    crunching_manager.cpu_budget = 1
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    (first_node, second_node) = [project.simulate(root, 1) for i in range(2)]
+
+    first_job = project.begin_crunching(first_node, infinity)
+    second_job = project.begin_crunching(second_node, infinity)
+    crunching_manager.preferred_path = second_node.make_containing_path()
+    project.sync_crunchers()
+    assert crunching_manager.crunchers.keys() == [second_job]
+    assert first_job.priority == second_job.priority == 0
+
+    # The preferred path doesn't override priorities:
+    first_job.raise_priority(1)
+    project.sync_crunchers()
+    assert crunching_manager.crunchers.keys() == [first_job]
+    assert first_job.priority == 1
+
+    del crunching_manager.jobs[:]
+    project.sync_crunchers()
@@ -0,0 +1,97 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `PoolCruncher`.'''
+
+import time
+
+import nose
+
+from garlicsim.general_misc import import_tools
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+
+def _crunch_until_done(project):
+    '''Sync the crunchers of `project` until all its jobs are done.'''
+    while project.crunching_manager.jobs:
+        time.sleep(0.1)
+        project.sync_crunchers()
+
+
+def test_worker_reuse():
+    '''Test that `PoolCruncher` reuses its worker processes between jobs.'''
+    if not import_tools.exists('multiprocessing'):
+        raise nose.SkipTest("`multiprocessing` isn't installed.")
+    from garlicsim.asynchronous_crunching.crunchers import PoolCruncher
+    from garlicsim.asynchronous_crunching.crunchers.pool_cruncher.\
+         worker_pool import WorkerPool
+
+    # Using a pool of our own, big enough to keep all our workers:
+    old_worker_pool = PoolCruncher.worker_pool
+    worker_pool = PoolCruncher.worker_pool = WorkerPool(size=2)
+    try:
+        check_worker_reuse(PoolCruncher, worker_pool)
+    finally:
+        PoolCruncher.worker_pool = old_worker_pool
+
+
+def check_worker_reuse(pool_cruncher_type, worker_pool):
+    '''Check that crunchers of `pool_cruncher_type` reuse `worker_pool`.'''
+    project = garlicsim.Project(life)
+    project.crunching_manager.cruncher_type = pool_cruncher_type
+
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    project.begin_crunching(root, 10)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    worker = cruncher.worker
+    _crunch_until_done(project)
+    assert cruncher.job_finished
+    assert not cruncher.is_alive()
+    assert worker in worker_pool.idle_workers
+
+    (path,) = project.tree.all_possible_paths()
+    assert len(path) == 11
+    assert list(path.states()) == \
+           list(garlicsim.list_simulate(root.state, 10))
+
+    # The next job gets the same worker:
+    project.begin_crunching(path[-1], 10)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    assert cruncher.worker is worker
+    _crunch_until_done(project)
+    assert len(path) == 21
+
+    # Changing the step profile in the middle of a job retires the cruncher,
+    # and a new one is created with a different worker:
+    job = project.begin_crunching(path[-1], infinity)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    assert cruncher.worker is worker
+    job.crunching_profile.step_profile = \
+        project.build_step_profile(survival=[2])
+    project.sync_crunchers()
+    assert cruncher.retired
+    assert not cruncher.is_alive()
+    (new_cruncher,) = project.crunching_manager.crunchers.values()
+    assert new_cruncher.worker is not worker
+    assert new_cruncher.is_alive()
+
+    job.crunching_profile.clock_target = job.node.state.clock + 5
+    _crunch_until_done(project)
+
+    # The abandoned worker is reused after it gets the retire order:
+    for i in xrange(100):
+        acquired_worker = worker_pool.acquire_worker()
+        worker_pool.release_worker(acquired_worker)
+        if acquired_worker is worker:
+            break
+        time.sleep(0.1)
+    else:
+        raise Exception("The abandoned worker wasn't reused.")
+    assert worker.is_alive()
+    assert worker not in worker_pool.abandoned_workers
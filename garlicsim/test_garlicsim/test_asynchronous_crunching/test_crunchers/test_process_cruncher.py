@@ -0,0 +1,206 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `ProcessCruncher` and its `SharedMemoryQueue`.'''
+
+import array
+import threading
+import time
+import Queue
+
+import nose
+
+from garlicsim.general_misc import import_tools
+from garlicsim.general_misc import binary_search
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+from ..simpacks import history_dependent_simpack, windowed_history_simpack
+
+
+def _skip_if_no_multiprocessing():
+    '''Skip the test if `multiprocessing` isn't installed.'''
+    if not import_tools.exists('multiprocessing'):
+        raise nose.SkipTest("`multiprocessing` isn't installed.")
+
+
+def test_shared_memory_queue():
+    '''Test that `SharedMemoryQueue` moves items intact.'''
+    _skip_if_no_multiprocessing()
+    from garlicsim.asynchronous_crunching.crunchers.process_cruncher.\
+         shared_memory_queue import SharedMemoryQueue
+
+    shared_memory_queue = SharedMemoryQueue(buffer_size=1000)
+    nose.tools.assert_raises(Queue.Empty, shared_memory_queue.get,
+                             block=False)
+
+    # Putting enough items to wrap around the ring buffer a few times, with
+    # one item too big for the ring buffer:
+    items = [{'number': i, 'array': array.array('d', [i] * i)}
+             for i in xrange(0, 50, 7)] + \
+            [array.array('l', range(1000))]
+    for item in items:
+        shared_memory_queue.put(item)
+        assert shared_memory_queue.qsize() == 1
+        assert shared_memory_queue.get() == item
+        assert shared_memory_queue.empty()
+
+    shared_memory_queue.put(items[1])
+    shared_memory_queue.put(items[2])
+    assert shared_memory_queue.qsize() == 2
+    assert shared_memory_queue.get() == items[1]
+    assert shared_memory_queue.get() == items[2]
+
+    # An array referred to twice should arrive as one array:
+    shared_array = array.array('d', [1, 2, 3])
+    shared_memory_queue.put([shared_array, shared_array])
+    (first_array, second_array) = shared_memory_queue.get()
+    assert first_array is second_array
+    assert first_array == shared_array
+
+
+def test_shared_memory_queue_blocking():
+    '''Test that `SharedMemoryQueue.put` waits for room in the ring buffer.'''
+    _skip_if_no_multiprocessing()
+    from garlicsim.asynchronous_crunching.crunchers.process_cruncher.\
+         shared_memory_queue import SharedMemoryQueue
+
+    shared_memory_queue = SharedMemoryQueue(buffer_size=1000)
+    items = [array.array('b', [i] * 300) for i in range(4)]
+    for item in items[:3]:
+        shared_memory_queue.put(item)
+
+    thread = threading.Thread(target=shared_memory_queue.put,
+                              args=(items[3],))
+    thread.setDaemon(True)
+    thread.start()
+    thread.join(0.2)
+    assert thread.isAlive()
+    assert shared_memory_queue.qsize() == 3
+
+    assert shared_memory_queue.get() == items[0]
+    thread.join(10)
+    assert not thread.isAlive()
+    assert [shared_memory_queue.get() for i in range(3)] == items[1:]
+    assert shared_memory_queue.empty()
+
+
+def test_shared_memory_process_cruncher():
+    '''Test crunching with a `ProcessCruncher` that uses shared memory.'''
+    _skip_if_no_multiprocessing()
+    from garlicsim.asynchronous_crunching.crunchers import ProcessCruncher
+
+    class SharedMemoryProcessCruncher(ProcessCruncher):
+        shared_memory_size = 10000
+
+    project = garlicsim.Project(life)
+    project.crunching_manager.cruncher_type = SharedMemoryProcessCruncher
+    root = project.root_this_state(life.State.create_messy_root(10, 10))
+    project.begin_crunching(root, 20)
+
+    total_nodes_added = 0
+    while project.crunching_manager.jobs:
+        time.sleep(0.1)
+        total_nodes_added += project.sync_crunchers()
+    assert total_nodes_added == 20
+
+    (path,) = project.tree.all_possible_paths()
+    assert len(path) == 21
+    assert list(path.states()) == \
+           list(garlicsim.list_simulate(root.state, 20))
+
+
+def test_retiring_shared_memory_process_cruncher():
+    '''Test that a process waiting for room in shared memory can retire.'''
+    _skip_if_no_multiprocessing()
+    from garlicsim.asynchronous_crunching.crunchers import ProcessCruncher
+
+    class SharedMemoryProcessCruncher(ProcessCruncher):
+        # Room for one chunk of states, but not for two:
+        shared_memory_size = 10000
+
+    project = garlicsim.Project(life)
+    project.crunching_manager.cruncher_type = SharedMemoryProcessCruncher
+    root = project.root_this_state(life.State.create_messy_root(10, 10))
+    job = project.begin_crunching(root, infinity)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+
+    # We're not taking states out, so the ring buffer fills up:
+    time.sleep(1)
+    assert cruncher.is_alive()
+    assert cruncher.work_queue.qsize() >= 1
+
+    cruncher.retire()
+    cruncher.process.join(10)
+    assert not cruncher.is_alive()
+
+    project.crunching_manager.jobs.remove(job)
+    project.sync_crunchers()
+
+
+def test_local_history_browser():
+    '''Test that `LocalHistoryBrowser` keeps only the states in its window.'''
+    _skip_if_no_multiprocessing()
+    from garlicsim.asynchronous_crunching.crunchers.process_cruncher.\
+         local_history_browser import LocalHistoryBrowser
+
+    states = [life.State.create_root(2, 2) for i in range(3)]
+    for (clock, state) in enumerate(states):
+        state.clock = clock + 10
+    history_browser = LocalHistoryBrowser(states, offset=10, window=2)
+    assert len(history_browser) == 13
+    assert history_browser[-1] is history_browser[12] is states[2]
+    assert history_browser[11] is states[1]
+    nose.tools.assert_raises(IndexError, history_browser.__getitem__, 10)
+    nose.tools.assert_raises(IndexError, history_browser.__getitem__, -3)
+
+    for clock in xrange(13, 20):
+        state = life.State.create_root(2, 2)
+        state.clock = clock
+        history_browser.append(state)
+        assert history_browser.get_last_state() is state
+        assert len(history_browser) == clock + 1
+        assert history_browser[clock - 1].clock == clock - 1
+        nose.tools.assert_raises(IndexError, history_browser.__getitem__,
+                                 clock - 2)
+        assert history_browser.get_state_by_clock(0).clock == clock - 1
+        assert history_browser.get_state_by_clock(
+            clock - 0.4,
+            binary_search.BOTH
+        ) == (history_browser[clock - 1], state)
+
+
+def test_history_dependent():
+    '''Test crunching history-dependent simulations with `ProcessCruncher`.'''
+    _skip_if_no_multiprocessing()
+    from garlicsim.asynchronous_crunching.crunchers import ProcessCruncher
+    for simpack in (history_dependent_simpack, windowed_history_simpack):
+        project = garlicsim.Project(simpack)
+        project.crunching_manager.cruncher_type = ProcessCruncher
+        root = project.root_this_state(simpack.State.create_root())
+        project.begin_crunching(root, 5)
+        project.run_until(timeout=100)
+        (path,) = project.tree.all_possible_paths()
+
+        # Forking at two nodes, so the new crunchers get copies of timelines
+        # from the tree, and extending the leaf:
+        for node in (path[2], path[4], path[-1]):
+            project.begin_crunching(node, 10)
+        project.run_until(timeout=100)
+        assert not project.crunching_manager.jobs
+
+        # (The step function of `history_dependent_simpack` checks that the
+        # history browser is consistent, so a cruncher would have died if it
+        # wasn't.)
+        paths = project.tree.all_possible_paths()
+        assert sorted(len(path) for path in paths) == [13, 15, 16]
+        for path in paths:
+            states = list(path.states())
+            assert [state.clock for state in states] == range(len(path))
+            if simpack is windowed_history_simpack:
+                assert [state.value for state in states] == \
+                       [state.value for state in
+                        garlicsim.list_simulate(root.state, len(path) - 1)]
@@ -0,0 +1,218 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `RemoteCruncher` and its worker servers.'''
+
+import os.path
+import threading
+import tempfile
+import shutil
+import socket
+import time
+
+import nose
+
+from garlicsim.general_misc import import_tools
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim.asynchronous_crunching.crunchers import RemoteCruncher
+from garlicsim_lib.simpacks import life
+
+from ..simpacks import history_dependent_simpack
+
+
+def _skip_if_no_multiprocessing():
+    '''Skip the test if `multiprocessing` isn't installed.'''
+    if not import_tools.exists('multiprocessing'):
+        raise nose.SkipTest("`multiprocessing` isn't installed.")
+
+
+def _start_worker_server(address):
+    '''Start a `WorkerServer` on `address` in a thread, and return it.'''
+    from garlicsim.asynchronous_crunching.crunchers.remote_cruncher.\
+         worker_server import WorkerServer
+    worker_server = WorkerServer(address)
+    thread = threading.Thread(target=worker_server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+    return worker_server
+
+
+def _make_cruncher_type(worker_servers):
+    '''Make a `RemoteCruncher` subclass that uses the given worker servers.'''
+    class LocalRemoteCruncher(RemoteCruncher):
+        worker_addresses = [worker_server.address for worker_server in
+                            worker_servers]
+    return LocalRemoteCruncher
+
+
+def _get_unused_address():
+    '''Get a TCP address that no one listens on.'''
+    sock = socket.socket()
+    try:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()
+    finally:
+        sock.close()
+
+
+def test_availability():
+    '''Test that `RemoteCruncher` isn't available without worker servers.'''
+    assert RemoteCruncher.worker_addresses == []
+    simpack_grokker = garlicsim.misc.SimpackGrokker(life)
+    assert RemoteCruncher not in simpack_grokker.available_cruncher_types
+    assert not RemoteCruncher.can_be_used_with_simpack_grokker(
+        simpack_grokker
+    )
+
+
+def test_availability_with_worker_addresses():
+    '''Test that `RemoteCruncher` is available when given worker servers.'''
+    class LocalRemoteCruncher(RemoteCruncher):
+        worker_addresses = [('localhost', 1)]
+    assert LocalRemoteCruncher.can_be_used_with_simpack_grokker(
+        garlicsim.misc.SimpackGrokker(life)
+    )
+
+    RemoteCruncher.worker_addresses = [('localhost', 1)]
+    try:
+        # Making a new simpack grokker, because `SimpackGrokker` caches them,
+        # and the cached one found its cruncher types before we set the
+        # addresses:
+        SimpackGrokker = garlicsim.misc.SimpackGrokker
+        simpack_grokker = SimpackGrokker.__new__(SimpackGrokker)
+        simpack_grokker.__init__(life)
+        assert RemoteCruncher in simpack_grokker.available_cruncher_types
+    finally:
+        RemoteCruncher.worker_addresses = []
+
+
+def test_no_reachable_worker_server():
+    '''Test that the cruncher waits when it can't reach a worker server.'''
+    class UnreachableRemoteCruncher(RemoteCruncher):
+        worker_addresses = [_get_unused_address()]
+        reconnect_interval = 0.2
+    project = garlicsim.Project(life)
+    project.crunching_manager.cruncher_type = UnreachableRemoteCruncher
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    job = project.begin_crunching(root, 10)
+
+    sync_crunchers = project.sync_crunchers
+    sync_counter = [0]
+    def counting_sync_crunchers():
+        sync_counter[0] += 1
+        return sync_crunchers()
+    project.sync_crunchers = counting_sync_crunchers
+
+    project.run_until(timeout=1)
+    assert sync_counter[0] <= 3
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    assert cruncher.is_alive()
+    assert cruncher.connection is None
+    assert len(project.tree.nodes) == 1
+
+    project.crunching_manager.jobs.remove(job)
+    project.sync_crunchers()
+    cruncher.join(10)
+    assert not cruncher.is_alive()
+
+
+def test_tcp():
+    '''Test crunching with a worker server that listens on TCP.'''
+    _skip_if_no_multiprocessing()
+    worker_server = _start_worker_server(('localhost', 0))
+    try:
+        project = garlicsim.Project(life)
+        project.crunching_manager.cruncher_type = \
+            _make_cruncher_type([worker_server])
+        root = project.root_this_state(life.State.create_messy_root(10, 10))
+        project.begin_crunching(root, 30)
+        project.run_until(timeout=100)
+        assert not project.crunching_manager.jobs
+
+        (path,) = project.tree.all_possible_paths()
+        assert len(path) == 31
+        assert list(path.states()) == \
+               list(garlicsim.list_simulate(root.state, 30))
+    finally:
+        worker_server.shutdown()
+
+
+def test_unix_socket_history_dependent():
+    '''Test a history-dependent simulation over a Unix socket.'''
+    _skip_if_no_multiprocessing()
+    if not hasattr(socket, 'AF_UNIX'):
+        raise nose.SkipTest("Unix sockets aren't available.")
+    temp_folder = tempfile.mkdtemp(prefix='test_garlicsim_')
+    worker_server = \
+        _start_worker_server(os.path.join(temp_folder, 'worker_socket'))
+    try:
+        project = garlicsim.Project(history_dependent_simpack)
+        project.crunching_manager.cruncher_type = \
+            _make_cruncher_type([worker_server])
+        root = project.root_this_state(
+            history_dependent_simpack.State.create_root()
+        )
+        project.begin_crunching(root, 5)
+        project.run_until(timeout=100)
+        (path,) = project.tree.all_possible_paths()
+
+        # Forking, so the new cruncher gets a copy of a timeline from the
+        # tree:
+        project.begin_crunching(path[2], 5)
+        project.run_until(timeout=100)
+        assert not project.crunching_manager.jobs
+        paths = project.tree.all_possible_paths()
+        assert sorted(len(path) for path in paths) == [6, 8]
+        for path in paths:
+            assert [state.clock for state in path.states()] == \
+                   range(len(path))
+    finally:
+        worker_server.shutdown()
+        shutil.rmtree(temp_folder)
+
+
+def test_worker_death():
+    '''Test that when a worker server dies, the job moves to another one.'''
+    _skip_if_no_multiprocessing()
+    worker_servers = [_start_worker_server(('localhost', 0)) for i in
+                      range(2)]
+    try:
+        project = garlicsim.Project(life)
+        project.crunching_manager.cruncher_type = \
+            _make_cruncher_type(worker_servers)
+        root = project.root_this_state(life.State.create_messy_root(10, 10))
+        job = project.begin_crunching(root, infinity)
+
+        deadline = time.time() + 100
+
+        def crunch_until(condition):
+            while not condition():
+                assert time.time() < deadline
+                project.crunching_manager.wait_for_work(timeout=1)
+                project.sync_crunchers()
+
+        crunch_until(lambda: job.node.state.clock >= 10)
+        cruncher = project.crunching_manager.crunchers[job]
+        (dying_worker_server,) = [worker_server for worker_server in
+                                  worker_servers if worker_server.address
+                                  == cruncher.address]
+        dying_worker_server.shutdown()
+
+        crunch_until(lambda: project.crunching_manager.crunchers.get(job)
+                     not in (None, cruncher))
+        new_cruncher = project.crunching_manager.crunchers[job]
+        clock = job.node.state.clock
+        crunch_until(lambda: job.node.state.clock >= clock + 10)
+        assert new_cruncher.address != dying_worker_server.address
+
+        project.crunching_manager.jobs.remove(job)
+        project.sync_crunchers()
+        (path,) = project.tree.all_possible_paths()
+        states = list(path.states())
+        assert states == \
+               list(garlicsim.list_simulate(root.state, len(states) - 1))
+    finally:
+        for worker_server in worker_servers:
+            worker_server.shutdown()
@@ -0,0 +1,90 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `CrunchingManager.get_stats` and `CrunchingStatisticsLog`.'''
+
+import csv
+import logging
+import StringIO
+
+from garlicsim.general_misc import import_tools
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim.asynchronous_crunching import (CruncherStatistics,
+                                              CrunchingStatisticsLog)
+from garlicsim_lib.simpacks import life
+
+
+def test():
+    '''Test the statistics of all the cruncher types.'''
+    cruncher_types = [garlicsim.asynchronous_crunching.crunchers.
+                      ThreadCruncher]
+    if import_tools.exists('multiprocessing'):
+        cruncher_types += [
+            garlicsim.asynchronous_crunching.crunchers.ProcessCruncher,
+            garlicsim.asynchronous_crunching.crunchers.PoolCruncher
+        ]
+    for cruncher_type in cruncher_types:
+        yield check, cruncher_type
+
+
+def check(cruncher_type):
+    '''Check the statistics of a project crunching with `cruncher_type`.'''
+    project = garlicsim.Project(life)
+    crunching_manager = project.crunching_manager
+    crunching_manager.cruncher_type = cruncher_type
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+
+    statistics = crunching_manager.get_stats()
+    assert statistics.crunchers == []
+    assert statistics.states == 0
+
+    job = project.begin_crunching(root, infinity)
+    project.run_until(lambda: job.node.state.clock >= 100, timeout=100)
+    statistics = crunching_manager.get_stats()
+    assert statistics.job_count == 1
+    (cruncher_statistics,) = statistics.crunchers
+    assert cruncher_statistics.cruncher_type == cruncher_type.__name__
+    assert cruncher_statistics.clock == job.node.state.clock
+    assert cruncher_statistics.states >= 100
+    assert statistics.states == cruncher_statistics.states
+    assert cruncher_statistics.throughput > 0
+    assert cruncher_statistics.crunch_time > 0
+    assert cruncher_statistics.put_time > 0
+    assert cruncher_statistics.state_size > 0
+    assert cruncher_statistics.uptime >= cruncher_statistics.crunch_time + \
+           cruncher_statistics.put_time + cruncher_statistics.stall_time
+
+    del crunching_manager.jobs[:]
+    project.sync_crunchers()
+
+
+def test_log():
+    '''Test writing statistics to a CSV file and to a logger.'''
+    project = garlicsim.Project(life)
+    crunching_manager = project.crunching_manager
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    job = project.begin_crunching(root, infinity)
+
+    csv_file = StringIO.StringIO()
+    crunching_manager.statistics_log = \
+        CrunchingStatisticsLog(csv_file, interval=infinity)
+    project.run_until(lambda: job.node.state.clock >= 10, timeout=100)
+    # With an infinite interval, only the first sync writes:
+    rows = list(csv.reader(StringIO.StringIO(csv_file.getvalue())))
+    assert rows[0] == ['time', 'job_count'] + CruncherStatistics.fields
+    assert len(rows) <= 2
+
+    stream = StringIO.StringIO()
+    logger = logging.getLogger('test_crunching_statistics')
+    logger.addHandler(logging.StreamHandler(stream))
+    logger.setLevel(logging.INFO)
+    crunching_manager.statistics_log = \
+        CrunchingStatisticsLog(logger, interval=0)
+    project.sync_crunchers()
+    assert 'CrunchingStatistics: 1 crunchers for 1 jobs' in stream.getvalue()
+    assert 'cruncher_type=ThreadCruncher' in stream.getvalue()
+
+    del crunching_manager.jobs[:]
+    project.sync_crunchers()
@@ -1,3 +1,5 @@
+from garlicsim.general_misc import import_tools
+
 import garlicsim
 
 from .state import State
@@ -11,4 +13,10 @@ CONSTANT_CLOCK_INTERVAL = 1
 ENDABLE = False
 PROBLEM = None
 VALID = True
-CRUNCHERS_LIST = [garlicsim.asynchronous_crunching.crunchers.ThreadCruncher]
+CRUNCHERS_LIST = \
+    [garlicsim.asynchronous_crunching.crunchers.ThreadCruncher] + \
+    (
+        [garlicsim.asynchronous_crunching.crunchers.ProcessCruncher] if
+        import_tools.exists('multiprocessing')
+        else []
+    )
@@ -16,7 +16,8 @@ VALID = True
 CRUNCHERS_LIST = \
     [garlicsim.asynchronous_crunching.crunchers.ThreadCruncher] + \
     (
-        [garlicsim.asynchronous_crunching.crunchers.ProcessCruncher] if 
+        [garlicsim.asynchronous_crunching.crunchers.ProcessCruncher,
+         garlicsim.asynchronous_crunching.crunchers.PoolCruncher] if 
         import_tools.exists('multiprocessing')
         else []
     )
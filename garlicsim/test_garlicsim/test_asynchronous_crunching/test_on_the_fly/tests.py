@@ -208,6 +208,9 @@ def check(simpack, cruncher_type):
     ### Testing cruncher type switching: ######################################
     #                                                                         #
     
+    # Making sure both jobs get crunchers, even on a single-core computer:
+    project.crunching_manager.cpu_budget = 2
+    
     job_1 = project.begin_crunching(root, clock_buffer=infinity)
     job_2 = project.begin_crunching(root, clock_buffer=infinity)
     
@@ -0,0 +1,56 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `Project.run_until` and `CrunchingManager.wait_for_work`.'''
+
+import time
+
+from garlicsim.general_misc import import_tools
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+
+def test():
+    '''Test `Project.run_until` with all the cruncher types.'''
+    cruncher_types = [garlicsim.asynchronous_crunching.crunchers.
+                      ThreadCruncher]
+    if import_tools.exists('multiprocessing'):
+        cruncher_types += [
+            garlicsim.asynchronous_crunching.crunchers.ProcessCruncher,
+            garlicsim.asynchronous_crunching.crunchers.PoolCruncher
+        ]
+    for cruncher_type in cruncher_types:
+        yield check, cruncher_type
+
+
+def check(cruncher_type):
+    '''Check `Project.run_until` with `cruncher_type`.'''
+    project = garlicsim.Project(life)
+    crunching_manager = project.crunching_manager
+    crunching_manager.cruncher_type = cruncher_type
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+
+    # With nothing to do, we don't wait:
+    assert not crunching_manager.wait_for_work()
+    assert project.run_until() == 0
+
+    project.begin_crunching(root, 30)
+    assert crunching_manager.wait_for_work(timeout=0)
+    assert project.run_until(timeout=100) == 30
+    assert not crunching_manager.jobs
+    (path,) = project.tree.all_possible_paths()
+    assert list(path.states()) == \
+           list(garlicsim.list_simulate(root.state, 30))
+
+    job = project.begin_crunching(path[-1], infinity)
+    project.run_until(lambda: job.node.state.clock >= 50, timeout=100)
+    assert job.node.state.clock >= 50
+
+    start_time = time.time()
+    project.run_until(lambda: False, timeout=0.3)
+    assert 0.3 <= time.time() - start_time <= 5
+
+    del crunching_manager.jobs[:]
+    project.sync_crunchers()
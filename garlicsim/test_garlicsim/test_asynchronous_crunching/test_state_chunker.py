@@ -0,0 +1,78 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `StateChunker` and for crunching in chunks.'''
+
+import time
+import Queue
+
+from garlicsim.general_misc import import_tools
+from garlicsim.general_misc import queue_tools
+
+import garlicsim
+from garlicsim.asynchronous_crunching.misc import StateChunker
+from garlicsim_lib.simpacks import life
+
+
+def test_state_chunker():
+    '''Test that `StateChunker` puts states in chunks of the right size.'''
+    work_queue = Queue.Queue()
+    state_chunker = StateChunker(work_queue, chunk_size=3, chunk_duration=1000)
+    assert not state_chunker.add(1)
+    assert not state_chunker.add(2)
+    assert work_queue.empty()
+    assert state_chunker.add(3)
+    assert queue_tools.dump(work_queue) == [[1, 2, 3]]
+
+    state_chunker.add(4)
+    state_chunker.flush()
+    state_chunker.flush()
+    assert queue_tools.dump(work_queue) == [4]
+
+    # With a zero duration every state is put by itself:
+    state_chunker = StateChunker(work_queue, chunk_size=3, chunk_duration=0)
+    assert state_chunker.add(1)
+    assert state_chunker.add(2)
+    assert queue_tools.dump(work_queue) == [1, 2]
+
+
+def test_crunching_in_chunks():
+    '''Test that crunchers deliver all states when crunching in chunks.'''
+    cruncher_types = [garlicsim.asynchronous_crunching.crunchers.
+                      ThreadCruncher]
+    if import_tools.exists('multiprocessing'):
+        cruncher_types.append(garlicsim.asynchronous_crunching.crunchers.
+                              ProcessCruncher)
+
+    for cruncher_type in cruncher_types:
+        yield check_crunching_in_chunks, cruncher_type
+
+
+def check_crunching_in_chunks(cruncher_type):
+    '''Check crunching 30 states, (not a multiple of 7,) in chunks.'''
+    project = garlicsim.Project(life)
+    project.crunching_manager.cruncher_type = cruncher_type
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+
+    old_chunk_size = garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+    old_chunk_duration = \
+        garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION
+    garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE = 7
+    garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION = 1000
+    try:
+        project.begin_crunching(root, 30)
+        # The cruncher is created here, with our chunk settings:
+        total_nodes_added = project.sync_crunchers()
+    finally:
+        garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE = old_chunk_size
+        garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_DURATION = \
+            old_chunk_duration
+
+    while project.crunching_manager.jobs:
+        time.sleep(0.1)
+        total_nodes_added += project.sync_crunchers()
+    assert total_nodes_added == 30
+
+    (path,) = project.tree.all_possible_paths()
+    assert list(path.states()) == \
+           list(garlicsim.list_simulate(root.state, 30))
@@ -0,0 +1,83 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for the locking of the tree while crunching.'''
+
+from __future__ import with_statement
+
+import threading
+import time
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+from .simpacks import history_dependent_simpack
+
+
+def test_readers_dont_block_sync():
+    '''Test that holding the tree lock for reading doesn't block syncing.'''
+    project = garlicsim.Project(life)
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    project.begin_crunching(root, 10)
+
+    acquired = threading.Event()
+    release = threading.Event()
+    def read():
+        with project.tree.lock.read:
+            acquired.set()
+            release.wait(10)
+    thread = threading.Thread(target=read)
+    thread.start()
+    acquired.wait()
+
+    try:
+        start_time = time.time()
+        project.run_until(timeout=100)
+        assert time.time() - start_time < 5
+    finally:
+        release.set()
+        thread.join()
+
+    assert not project.crunching_manager.jobs
+    assert len(project.tree.nodes) == 11
+
+
+def test_history_dependent_cruncher_starts():
+    '''Test that a history-dependent cruncher finds its job when it starts.'''
+    project = garlicsim.Project(history_dependent_simpack)
+    root = project.root_this_state(
+        history_dependent_simpack.State.create_root()
+    )
+    project.begin_crunching(root, 10)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    cruncher.join(10)
+    # (History-dependent crunchers put each state in the queue separately.)
+    assert cruncher.work_queue.qsize() == 10
+
+
+def test_history_dependent_forks():
+    '''Test crunching several forks of a history-dependent simulation.'''
+    project = garlicsim.Project(history_dependent_simpack)
+    root = project.root_this_state(
+        history_dependent_simpack.State.create_root()
+    )
+    project.begin_crunching(root, 5)
+    project.run_until(timeout=100)
+    (path,) = project.tree.all_possible_paths()
+
+    # Forking at four nodes, and extending the leaf:
+    nodes = list(path)[1:]
+    for node in nodes:
+        project.begin_crunching(node, 20)
+    project.crunching_manager.cpu_budget = len(nodes)
+    project.run_until(timeout=100)
+    assert not project.crunching_manager.jobs
+
+    # (The history step function checks that the history browser gives it a
+    # consistent timeline, so a cruncher would have died if it didn't.)
+    paths = project.tree.all_possible_paths()
+    assert sorted(len(path) for path in paths) == [22, 23, 24, 25, 26]
+    for path in paths:
+        assert [state.clock for state in path.states()] == \
+               range(len(path))
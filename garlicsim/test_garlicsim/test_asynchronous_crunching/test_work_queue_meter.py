@@ -0,0 +1,102 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `WorkQueueMeter`.'''
+
+import cPickle
+import threading
+import time
+
+from garlicsim.general_misc.infinity import infinity
+
+import garlicsim
+from garlicsim.asynchronous_crunching.misc import WorkQueueMeter
+from garlicsim_lib.simpacks import life
+
+
+def test_memory_budget():
+    '''Test that the memory budget limits the depth of the queue.'''
+    state = life.State.create_messy_root(20, 20)
+    state_size = len(cPickle.dumps(state, cPickle.HIGHEST_PROTOCOL))
+    work_queue_meter = WorkQueueMeter(memory_budget=(3 * state_size),
+                                      initial_max_depth=100)
+    work_queue_meter.start_clock()
+
+    work_queue_meter.wait_for_room([state, state])
+    work_queue_meter.record_put(2)
+    assert work_queue_meter.state_size == state_size
+    assert work_queue_meter.max_depth == 3
+    assert work_queue_meter.depth == 2
+
+    # There's room for one more state, but not for two:
+    work_queue_meter.wait_for_room([state])
+    work_queue_meter.record_put(1)
+    assert work_queue_meter.stall_time == 0
+
+    def take_states():
+        time.sleep(0.2)
+        work_queue_meter.record_taken(3)
+    thread = threading.Thread(target=take_states)
+    thread.start()
+    work_queue_meter.wait_for_room([state, state])
+    thread.join()
+    assert work_queue_meter.depth == 0
+    assert work_queue_meter.stall_time >= 0.1
+
+
+def test_throughput_and_drain_interval():
+    '''Test that the queue depth follows the throughput and drain interval.'''
+    work_queue_meter = WorkQueueMeter(memory_budget=(10 ** 9),
+                                      initial_max_depth=1)
+    work_queue_meter.start_clock()
+    time.sleep(0.1)
+    work_queue_meter.wait_for_room(range(10))
+    work_queue_meter.record_put(10)
+    assert 10 <= work_queue_meter.throughput <= 100
+
+    work_queue_meter.record_drain()
+    time.sleep(0.1)
+    work_queue_meter.record_drain()
+    assert 0.1 <= work_queue_meter.drain_interval <= 0.5
+    work_queue_meter.record_taken(10)
+
+    # A drain interval of about 0.1 seconds with a throughput of about 100
+    # states per second calls for a queue of about 20 states:
+    work_queue_meter.wait_for_room(range(10))
+    assert 2 <= work_queue_meter.max_depth <= 100
+
+
+def test_crunching():
+    '''Test that crunchers keep their meters up to date.'''
+    project = garlicsim.Project(life)
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    project.begin_crunching(root, 30)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    while project.crunching_manager.jobs:
+        time.sleep(0.1)
+        project.sync_crunchers()
+    assert cruncher.work_queue_meter.depth == 0
+    assert cruncher.work_queue_meter.throughput > 0
+    assert cruncher.work_queue_meter.state_size > 0
+
+
+def test_retiring_stalled_cruncher():
+    '''Test that a cruncher that waits for room in its queue can be retired.'''
+    project = garlicsim.Project(life)
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    job = project.begin_crunching(root, infinity)
+    project.sync_crunchers()
+    (cruncher,) = project.crunching_manager.crunchers.values()
+    # Making the queue full after one state, so the cruncher will stall:
+    cruncher.work_queue_meter.memory_budget = 1
+    time.sleep(0.3)
+    assert cruncher.is_alive()
+    assert cruncher.work_queue_meter.depth >= 1
+
+    cruncher.retire()
+    cruncher.join(10)
+    assert not cruncher.is_alive()
+
+    project.crunching_manager.jobs.remove(job)
+    project.sync_crunchers()
@@ -0,0 +1,101 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `garlicsim.data_structures.Block`.'''
+
+import copy
+
+import nose
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim_lib.simpacks import life
+
+
+BIG_BLOCK_LENGTH = 1000
+'''The number of nodes in the big block that we test.'''
+
+
+def _make_node_chain(length):
+    '''
+    Create a chain of `length` natural nodes, ready to be put in a block.
+
+    All the nodes share the same state object, because we only care about the
+    structure of the chain and want to keep memory usage down.
+    '''
+    tree = ds.Tree()
+    state = life.State.create_root(2, 2)
+    state.clock = 0
+    step_profile = garlicsim.misc.StepProfile(life.State.step)
+    root = ds.Node(tree, state, step_profile=step_profile)
+    nodes = [root]
+    for i in xrange(length - 1):
+        parent = nodes[-1]
+        node = ds.Node(tree, state, parent=parent, step_profile=step_profile)
+        parent.children.append(node)
+        nodes.append(node)
+    return nodes
+
+
+def test_index():
+    '''Test that `Block.index` stays correct while the block changes.'''
+    root_state = life.State.create_root(2, 2)
+    project = garlicsim.Project(life)
+    root = project.root_this_state(root_state)
+    leaf = project.simulate(root, 20)
+
+    block = leaf.block
+    nodes = list(block)
+    assert len(nodes) == 20
+
+    for (i, node) in enumerate(nodes):
+        assert block.index(node) == i
+    nose.tools.assert_raises(ValueError, block.index, root)
+
+    del block[0]
+    assert nodes[0].block is None
+    for (i, node) in enumerate(nodes[1:]):
+        assert block.index(node) == i
+
+    block.append_node(nodes[0])
+    for (i, node) in enumerate(nodes):
+        assert block.index(node) == i
+
+    del block[-1]
+    assert nodes[-1].block is None
+    for (i, node) in enumerate(nodes[:-1]):
+        assert block.index(node) == i
+
+    block.append_node(nodes[-1])
+    block.split(nodes[9])
+    assert nodes[9].is_last_on_block()
+    second_block = nodes[10].block
+    assert second_block is not block
+    for (i, node) in enumerate(nodes[:10]):
+        assert block.index(node) == i
+    for (i, node) in enumerate(nodes[10:]):
+        assert second_block.index(node) == i
+    nose.tools.assert_raises(ValueError, block.index, nodes[10])
+
+    block_copy = copy.deepcopy(block)
+    for (i, node) in enumerate(block_copy):
+        assert block_copy.index(node) == i
+
+
+def test_big_block():
+    '''Test `Block.index` and splitting on a big block.'''
+    nodes = _make_node_chain(BIG_BLOCK_LENGTH)
+    block = ds.Block(nodes)
+    last_node = nodes[-1]
+    assert block.index(last_node) == BIG_BLOCK_LENGTH - 1
+    assert last_node.is_last_on_block()
+    assert nodes[0].is_first_on_block()
+
+    middle_node = nodes[BIG_BLOCK_LENGTH // 2]
+    block.split(middle_node)
+    assert middle_node.is_last_on_block()
+    assert nodes[BIG_BLOCK_LENGTH // 2 + 1].is_first_on_block()
+    assert last_node.block.index(last_node) == \
+           BIG_BLOCK_LENGTH - BIG_BLOCK_LENGTH // 2 - 2
+    for (i, node) in enumerate(nodes[:BIG_BLOCK_LENGTH // 2 + 1]):
+        assert block.index(node) == i
@@ -0,0 +1,79 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `garlicsim.data_structures.CompactNode`.'''
+
+import copy
+import cPickle
+import gc
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim_lib.simpacks import life
+
+
+def _check_tree(tree):
+    '''Check the structure of a tree made by `test_compact_node`.'''
+    assert len(tree.nodes) == 1 + 10 + 5 + 1
+    for node in tree.nodes:
+        assert isinstance(node, ds.CompactNode)
+        # A compact node has room for a `__dict__`, because `Node` has no
+        # `__slots__`, but the dict should never be allocated. Looking at
+        # `node.__dict__` would allocate it, so we check that the node doesn't
+        # refer to any dict instead:
+        assert not [referent for referent in gc.get_referents(node) if
+                    type(referent) is dict]
+
+    (root,) = tree.roots
+    path = root.make_containing_path()
+    assert len(path) == 11
+
+    middle_node = path[5]
+    assert len(middle_node.children) == 3
+    (original_kid, forked_kid, edited_kid) = middle_node.children
+    assert edited_kid.touched
+    assert original_kid.derived_nodes == [edited_kid]
+    assert forked_kid.derived_nodes == ()
+    assert forked_kid.block is forked_kid.children[0].block
+    assert len(forked_kid.block) == 5
+    assert len(forked_kid.block[-1].ends) == 1
+    assert path[-1].ends == ()
+    assert path[-1].children == ()
+
+
+def test_compact_node():
+    '''Test that a tree works the same with compact nodes.'''
+    project = garlicsim.Project(life)
+    project.tree.node_type = ds.CompactNode
+
+    root = project.root_this_state(life.State.create_root(3, 3))
+    leaf = project.simulate(root, 10)
+    assert isinstance(leaf, ds.CompactNode)
+    assert len(leaf.block) == 10
+
+    middle_node = leaf.block[4]
+    forked_leaf = project.simulate(middle_node, 5)
+    project.tree.make_end(forked_leaf, forked_leaf.step_profile)
+
+    edited_node = project.tree.fork_to_edit(middle_node.children[0])
+    edited_node.finalize()
+
+    _check_tree(project.tree)
+    _check_tree(copy.deepcopy(project.tree))
+    for protocol in (0, 2):
+        _check_tree(cPickle.loads(cPickle.dumps(project.tree, protocol)))
+    # Pickling shouldn't leave the nodes with a `__dict__`:
+    _check_tree(project.tree)
+
+
+def test_extra_attributes():
+    '''Test that attributes outside the slots survive pickling.'''
+    project = garlicsim.Project(life)
+    project.tree.node_type = ds.CompactNode
+    root = project.root_this_state(life.State.create_root(3, 3))
+    root.label = 'Start'
+    for protocol in (0, 2):
+        unpickled_root = cPickle.loads(cPickle.dumps(root, protocol))
+        assert unpickled_root.label == 'Start'
+        assert unpickled_root.state.clock == root.state.clock
+    assert copy.deepcopy(root).label == 'Start'
@@ -0,0 +1,179 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `garlicsim.data_structures.DeltaNode`.'''
+
+import copy
+import cPickle
+import gc
+import weakref
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim.misc import state_delta
+from garlicsim.misc.state_deepcopy import state_deepcopy
+from garlicsim_lib.simpacks import life
+
+
+def _get_contents(states):
+    '''Get the boards and clocks of a bunch of Life states.'''
+    return [(state.board, state.clock) for state in states]
+
+
+def _is_delta(node):
+    '''Does `node` keep its state as a delta?'''
+    return node._DeltaNode__base is not None
+
+
+def test_life():
+    '''Test that a tree of delta nodes has the same states as a regular one.'''
+    root_state = life.State.create_messy_root(6, 6)
+    projects = []
+    leaves = []
+    old_keyframe_interval = ds.DeltaNode.keyframe_interval
+    ds.DeltaNode.keyframe_interval = 10
+    try:
+        for node_type in (ds.Node, ds.DeltaNode):
+            project = garlicsim.Project(life)
+            project.tree.node_type = node_type
+            root = project.root_this_state(state_deepcopy(root_state))
+            leaf = project.simulate(root, 30)
+            project.simulate(leaf.get_ancestor(10), 5)
+            project.simulate(root.children[0], 5)
+            projects.append(project)
+            leaves.append(leaf)
+    finally:
+        ds.DeltaNode.keyframe_interval = old_keyframe_interval
+    (project, delta_project) = projects
+
+    for node in delta_project.tree.nodes:
+        assert isinstance(node, ds.DeltaNode)
+        assert _is_delta(node) == \
+               bool(node.children and node._DeltaNode__keyframe_distance)
+    keyframe_distances = [node._DeltaNode__keyframe_distance for node in
+                          leaves[1].make_containing_path()]
+    assert len(keyframe_distances) == 31
+    assert keyframe_distances == \
+           [0] + range(1, 10) + [0] + range(1, 10) + [0] + range(1, 10) + [0]
+    assert len([node for node in delta_project.tree.nodes if
+                _is_delta(node)]) == 27 + 4 + 4
+
+    paths = project.tree.all_possible_paths()
+    delta_paths = delta_project.tree.all_possible_paths()
+    assert len(paths) == len(delta_paths) == 3
+    for (path, delta_path) in zip(paths, delta_paths):
+        assert _get_contents(path.states()) == \
+               _get_contents(delta_path.states())
+        history_browser = garlicsim.synchronous_crunching.HistoryBrowser(
+            delta_path
+        )
+        assert _get_contents(history_browser[i] for i in
+                             range(len(history_browser))) == \
+               _get_contents(path.states())
+
+    for tree in (copy.deepcopy(delta_project.tree),
+                 cPickle.loads(cPickle.dumps(delta_project.tree, 2))):
+        assert _get_contents(tree.all_possible_paths()[0].states()) == \
+               _get_contents(paths[0].states())
+
+
+def test_deleting():
+    '''Test that nodes keep their states when their ancestors are deleted.'''
+    project = garlicsim.Project(life)
+    project.tree.node_type = ds.DeltaNode
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    leaf = project.simulate(root, 20)
+    nodes = list(leaf.make_containing_path())
+    contents = _get_contents(node.state for node in nodes)
+
+    project.tree.delete_node_range(ds.NodeRange(nodes[3], nodes[6]))
+    orphan = nodes[7]
+    assert orphan.parent is None
+    assert _is_delta(orphan)
+    assert _get_contents(orphan.make_containing_path().states()) == \
+           contents[7:]
+
+
+def test_cache_keeps_no_nodes():
+    '''Test that the cache of rebuilt states doesn't keep nodes alive.'''
+    project = garlicsim.Project(life)
+    project.tree.node_type = ds.DeltaNode
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    leaf = project.simulate(root, 20)
+    for state in leaf.make_containing_path().states():
+        pass
+    assert ds.delta_node._cache
+    tree_ref = weakref.ref(project.tree)
+    del project, root, leaf, state
+    gc.collect()
+    assert tree_ref() is None
+    # Touching the cache, so it forgets the dead nodes:
+    ds.DeltaNode(ds.Tree(), life.State.create_root(2, 2))
+    assert not ds.delta_node._cache
+
+
+class _State(garlicsim.data_structures.State):
+    '''State for testing the generic way of making deltas.'''
+
+
+class _Thing(object):
+    '''A simple object to put in a state.'''
+
+
+def test_generic_delta():
+    '''Test `state_delta` on a state that doesn't make its own deltas.'''
+    old_state = _State()
+    old_state.clock = 7
+    old_state.grid = [1, 2, 3, 4]
+    old_state.pair = (1, 'a')
+    old_state.names = {'a': 1, 'b': [1, 2]}
+    old_state.thing = _Thing()
+    old_state.thing.x = 1.5
+    old_state.same = [[1], 'x']
+
+    new_state = _State()
+    new_state.clock = 8
+    new_state.grid = [1, 7, 3]
+    new_state.pair = (1, 'b', None)
+    new_state.names = {'a': 1, 'c': {'d': 2}}
+    new_state.thing = _Thing()
+    new_state.thing.x = 2.5
+    new_state.thing.y = [old_state.same]
+    new_state.same = [[1], 'x']
+
+    delta = state_delta.make_delta(old_state, new_state)
+    cPickle.loads(cPickle.dumps(delta, 2))
+    state = state_delta.apply_delta(state_deepcopy(old_state), delta)
+    assert garlicsim.misc.state_fingerprint.state_fingerprint(state) == \
+           garlicsim.misc.state_fingerprint.state_fingerprint(new_state)
+    assert state.thing.y[0] is not new_state.thing.y[0]
+
+    assert state_delta.make_delta(new_state, new_state) is None
+
+    new_state.other_grid = new_state.grid
+    try:
+        state_delta.make_delta(old_state, new_state)
+    except state_delta.StateDeltaError:
+        pass
+    else:
+        raise Exception("`make_delta` should've refused a state that "
+                        "refers to the same list twice.")
+
+    # An object inside a part that the states share, referred to from a part
+    # that changed:
+    old_state = _State()
+    old_state.clock = 1
+    old_state.facility = [[1], [2]]
+    old_state.queue = []
+    new_state = _State()
+    new_state.clock = 2
+    new_state.facility = old_state.facility
+    new_state.queue = [old_state.facility[0]]
+    try:
+        state_delta.make_delta(old_state, new_state)
+    except state_delta.StateDeltaError:
+        pass
+    else:
+        raise Exception("`make_delta` should've refused a state that refers "
+                        "to an object in a part it shares with the old "
+                        "state from another part.")
@@ -0,0 +1,129 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `garlicsim.data_structures.Path`.'''
+
+import copy
+import cPickle
+
+import nose
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim.general_misc import binary_search
+from garlicsim_lib.simpacks import life
+
+
+def _check_path(path):
+    '''Check that positional access on `path` agrees with iterating on it.'''
+    nodes = list(path)
+    length = len(nodes)
+    assert len(path) == length
+    assert path.get_last_node() is nodes[-1]
+
+    for (i, node) in enumerate(nodes):
+        assert path[i] is node
+        assert path[i - length] is node
+        assert node in path
+        assert path.__len__(tail=node) == i + 1
+        assert path.__len__(head=node) == length - i
+        assert path.__getitem__(-1, tail=node) is node
+        assert path.__getitem__(0, tail=node) is nodes[0]
+
+    nose.tools.assert_raises(ds.PathOutOfRangeError, path.__getitem__, length)
+    nose.tools.assert_raises(ds.PathOutOfRangeError, path.__getitem__,
+                             - length - 1)
+    nose.tools.assert_raises(ds.PathOutOfRangeError, path.__getitem__, 1,
+                             tail=nodes[0])
+
+
+def test_positional_access():
+    '''Test that positional access stays correct when the tree changes.'''
+    root_state = life.State.create_root(2, 2)
+    project = garlicsim.Project(life)
+    root = project.root_this_state(root_state)
+    leaf = project.simulate(root, 10)
+
+    path = leaf.make_containing_path()
+    _check_path(path)
+
+    # Making the path longer:
+    new_leaf = project.simulate(leaf, 5)
+    assert path[-1] is new_leaf
+    assert len(path) == 16
+    _check_path(path)
+
+    # Forking in the middle of the path, creating a new block structure:
+    middle_node = path[5]
+    fork_leaf = project.simulate(middle_node, 3)
+    assert fork_leaf not in path
+    assert len(path) == 16
+    _check_path(path)
+
+    # Changing the decisions so the path goes through the fork:
+    assert len(middle_node.children) == 2
+    path.decisions[middle_node] = middle_node.children[1]
+    assert fork_leaf in path
+    assert new_leaf not in path
+    assert path[-1] is fork_leaf
+    assert len(path) == 9
+    _check_path(path)
+
+    path_copy = copy.deepcopy(path)
+    _check_path(path_copy)
+
+    unpickled_path = cPickle.loads(cPickle.dumps(path, 2))
+    _check_path(unpickled_path)
+
+    empty_path = ds.Path(project.tree)
+    assert len(empty_path) == 0
+    assert root not in empty_path
+    nose.tools.assert_raises(ds.PathOutOfRangeError, empty_path.__getitem__, 0)
+    nose.tools.assert_raises(ds.PathOutOfRangeError, empty_path.__getitem__,
+                             -1)
+
+
+def _check_clock_lookups(path):
+    '''Check `get_node_by_clock` on `path` against a simple linear scan.'''
+    nodes = list(path)
+    clocks = [node.state.clock for node in nodes]
+    
+    for clock in [clocks[0] - 1, clocks[-1] + 1] + \
+                 [clock + offset for clock in clocks for offset in (0, 0.5)]:
+        
+        lower = [node for node in nodes if node.state.clock <= clock]
+        higher = [node for node in nodes if node.state.clock >= clock]
+        expected = (lower[-1] if lower else None,
+                    higher[0] if higher else None)
+        
+        assert path.get_node_by_clock(clock,
+                                      rounding=binary_search.BOTH) == expected
+        
+
+def test_get_node_by_clock():
+    '''Test `get_node_by_clock` while the path grows and forks.'''
+    root_state = life.State.create_root(2, 2)
+    project = garlicsim.Project(life)
+    root = project.root_this_state(root_state)
+    
+    # Making a path with a few blocks and blockless nodes on it:
+    node = root
+    for i in range(5):
+        node = project.simulate(node, 4)
+        node = project.tree.fork_to_edit(node)
+        node.finalize()
+    
+    path = node.make_containing_path()
+    _check_clock_lookups(path)
+    
+    old_reshape_version = project.tree.reshape_version
+    leaf = project.simulate(node, 7)
+    assert project.tree.reshape_version == old_reshape_version
+    assert path[-1] is leaf
+    _check_path(path)
+    _check_clock_lookups(path)
+    
+    project.simulate(path[3], 5)
+    assert project.tree.reshape_version > old_reshape_version
+    _check_path(path)
+    _check_clock_lookups(path)
@@ -0,0 +1,162 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `garlicsim.data_structures.Tree`.'''
+
+import cPickle
+
+import garlicsim
+from garlicsim.general_misc import nifty_collections
+from garlicsim import data_structures as ds
+from garlicsim_lib.simpacks import life
+
+
+def _make_states(state, n):
+    '''Make a list of `n` successive states, starting after `state`.'''
+    states = []
+    for i in xrange(n):
+        state = life.State.step(state)
+        states.append(state)
+    return states
+
+
+def test_add_states():
+    '''Test that `Tree.add_states` builds the same tree as `add_state` does.'''
+    step_profile = garlicsim.misc.StepProfile(life.State.step)
+
+    for parent_kind in ['root', 'block', 'fork', 'none']:
+
+        tree = ds.Tree()
+        root_state = life.State.create_root(5, 5)
+        root = tree.add_state(root_state)
+        parent = root
+
+        if parent_kind in ('block', 'fork'):
+            parent = tree.add_states(_make_states(root_state, 5), root,
+                                     step_profile)[-1]
+            assert len(parent.block) == 5
+        if parent_kind == 'fork':
+            parent = parent.block[2]
+        if parent_kind == 'none':
+            parent = None
+
+        old_nodes_count = len(tree.nodes)
+
+        states = _make_states(root_state, 10)
+        nodes = tree.add_states(states, parent, step_profile)
+
+        assert len(tree.nodes) == old_nodes_count + 10
+        assert [node.state for node in nodes] == states
+        assert nodes[0].parent is parent
+        for (parent_node, node) in zip(nodes, nodes[1:]):
+            assert node.parent is parent_node
+            assert parent_node.children == [node]
+            assert node.step_profile == step_profile
+            assert not node.touched
+
+        last_block = nodes[-1].block
+        assert last_block is not None
+        assert last_block.step_profile == step_profile
+
+        if parent_kind == 'block':
+            assert last_block is parent.block
+            assert len(last_block) == 15
+        elif parent_kind == 'fork':
+            assert parent.is_last_on_block()
+            assert nodes[0].block is last_block
+            assert len(last_block) == 10
+        elif parent_kind == 'none':
+            assert nodes[0].touched is True
+            assert nodes[0] in tree.roots
+            assert nodes[0].block is None
+            assert len(last_block) == 9
+        else: # parent_kind == 'root'
+            assert parent.block is None
+            assert nodes[0].block is last_block
+            assert len(last_block) == 10
+
+        for (i, node) in enumerate(last_block):
+            assert last_block.index(node) == i
+
+    assert ds.Tree().add_states([], None, step_profile) == []
+
+
+def test_nodes_registry():
+    '''Test that `Tree.nodes` keeps its order through deletions and pickling.'''
+    project = garlicsim.Project(life)
+    root = project.root_this_state(life.State.create_root(3, 3))
+    leaf = project.simulate(root, 30)
+    nodes = list(project.tree.nodes)
+    assert nodes[0] is root
+    assert nodes[-1] is leaf
+    
+    node_range = ds.NodeRange(nodes[10], nodes[19])
+    project.tree.delete_node_range(node_range)
+    remaining_nodes = nodes[:10] + nodes[20:]
+    assert list(project.tree.nodes) == remaining_nodes
+    assert len(project.tree.nodes) == 21
+    assert nodes[15] not in project.tree.nodes
+    assert project.tree.nodes[10] is nodes[20]
+    
+    pickled_tree_state = project.tree.__getstate__()
+    assert isinstance(pickled_tree_state['nodes'], list)
+    
+    unpickled_tree = cPickle.loads(cPickle.dumps(project.tree, 2))
+    assert isinstance(unpickled_tree.nodes,
+                      nifty_collections.CompactOrderedSet)
+    assert [node.state.clock for node in unpickled_tree.nodes] == \
+           [node.state.clock for node in remaining_nodes]
+    
+    
+def test_leaf_count_and_possible_paths():
+    '''Test `Tree.leaf_count` and the caching of `Tree.all_possible_paths`.'''
+    
+    def count_leaves(tree):
+        return len([node for node in tree.nodes if not node.children])
+    
+    project = garlicsim.Project(life)
+    tree = project.tree
+    assert tree.leaf_count == 0
+    assert tree.all_possible_paths() == []
+    
+    root = project.root_this_state(life.State.create_root(3, 3))
+    leaf = project.simulate(root, 10)
+    assert tree.leaf_count == count_leaves(tree) == 1
+    
+    middle_node = leaf.block[4]
+    forked_leaf = project.simulate(middle_node, 5)
+    tree.add_states(_make_states(forked_leaf.state, 3), forked_leaf)
+    project.simulate(middle_node, 2)
+    project.root_this_state(life.State.create_root(3, 3))
+    assert tree.leaf_count == count_leaves(tree) == 4
+    
+    paths = tree.all_possible_paths()
+    assert len(paths) == 4
+    assert [len(path) for path in paths] == \
+           [len(path) for path in tree.all_possible_paths()]
+    
+    # The returned paths are copies, so changing them doesn't hurt the cache:
+    paths[0].decisions.clear()
+    paths[0].root = None
+    assert tree.all_possible_paths()[0].root is root
+    
+    # Making an end splits a block, so cached positions must be refreshed:
+    path = leaf.make_containing_path()
+    nodes = list(path)
+    assert path[2] is nodes[2]
+    tree.make_end(nodes[2], leaf.step_profile)
+    assert [path[i] for i in xrange(len(path))] == list(path) == nodes
+    assert path[3] is nodes[3].block[0]
+    assert tree.leaf_count == 4
+    
+    for node_range in [ds.NodeRange(middle_node.children[2],
+                                    middle_node.children[2]),
+                       ds.NodeRange(middle_node, middle_node),
+                       ds.NodeRange(root, root.children[0])]:
+        tree.delete_node_range(node_range)
+        assert tree.leaf_count == count_leaves(tree)
+        assert len(tree.all_possible_paths()) == tree.leaf_count
+    
+    assert '%s possible paths' % tree.leaf_count in repr(tree)
+    unpickled_tree = cPickle.loads(cPickle.dumps(tree, 2))
+    assert unpickled_tree.leaf_count == tree.leaf_count
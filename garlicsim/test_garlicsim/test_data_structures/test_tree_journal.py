@@ -0,0 +1,84 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `garlicsim.data_structures.TreeJournal`.'''
+
+import copy
+import gc
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim.data_structures import tree_journal
+from garlicsim_lib.simpacks import life
+
+
+def test():
+    '''Test that the tree journal records the changes made to the tree.'''
+    project = garlicsim.Project(life)
+    tree = project.tree
+
+    # Changes made before there are any listeners aren't recorded:
+    root = project.root_this_state(life.State.create_root(3, 3))
+    assert tree.journal.changes == []
+
+    listener = tree.journal.add_listener()
+    other_listener = tree.journal.add_listener()
+    assert listener.drain() == []
+
+    leaf = project.simulate(root, 5)
+    changes = listener.drain()
+    assert all(isinstance(change, tree_journal.NodesAdded)
+               for change in changes)
+    added_nodes = sum((change.nodes for change in changes), [])
+    assert added_nodes == list(leaf.make_past_path())[1:]
+    assert changes[0].parent is root
+    assert changes[0].is_structural
+    assert not changes[-1].is_structural
+    assert not any(change.is_fork for change in changes)
+    assert listener.drain() == []
+
+    # Until `other_listener` drains, the journal must keep the changes:
+    assert len(tree.journal.changes) == len(changes)
+
+    middle_node = leaf.block[2]
+    project.simulate(middle_node, 2)
+    tree.make_end(leaf, leaf.step_profile)
+    changes = listener.drain()
+
+    (block_split_change, fork_change) = changes[:2]
+    assert isinstance(fork_change, tree_journal.NodesAdded)
+    assert fork_change.is_fork
+    assert fork_change.is_structural
+    assert fork_change.location is middle_node
+    assert isinstance(block_split_change, tree_journal.BlockSplit)
+    assert block_split_change.node is middle_node
+
+    end_change = changes[-1]
+    assert isinstance(end_change, tree_journal.EndAdded)
+    assert end_change.end is leaf.ends[0]
+    assert end_change.location is leaf
+
+    assert len(other_listener.drain()) > len(changes)
+    assert tree.journal.changes == []
+
+    node_range = ds.NodeRange(middle_node.children[0], leaf)
+    tree.delete_node_range(node_range)
+    (delete_change,) = listener.drain()
+    assert isinstance(delete_change, tree_journal.NodesDeleted)
+    assert delete_change.nodes[-1] is leaf
+    assert delete_change.location is None
+
+    # A listener which isn't referenced anymore stops holding changes:
+    del other_listener
+    gc.collect()
+    project.simulate(root, 1)
+    listener.drain()
+    assert tree.journal.changes == []
+
+    tree.journal.remove_listener(listener)
+    project.simulate(root, 1)
+    assert tree.journal.changes == []
+
+    tree_copy = copy.deepcopy(tree)
+    assert isinstance(tree_copy.journal, ds.TreeJournal)
+    assert tree_copy.journal is not tree.journal
@@ -0,0 +1,77 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Testing module for `CompactOrderedSet`.'''
+
+import copy
+import cPickle
+
+import nose
+
+from garlicsim.general_misc.nifty_collections import CompactOrderedSet
+
+
+def test():
+    '''Test the basic workings of `CompactOrderedSet`.'''
+    compact_ordered_set = CompactOrderedSet([3, 1, 2, 1])
+    assert list(compact_ordered_set) == [3, 1, 2]
+    assert len(compact_ordered_set) == 3
+    assert 1 in compact_ordered_set
+    assert 4 not in compact_ordered_set
+    
+    compact_ordered_set.add(0)
+    compact_ordered_set.add(3)
+    assert list(compact_ordered_set) == [3, 1, 2, 0]
+    
+    compact_ordered_set.remove(1)
+    assert list(compact_ordered_set) == [3, 2, 0]
+    assert list(reversed(compact_ordered_set)) == [0, 2, 3]
+    assert 1 not in compact_ordered_set
+    nose.tools.assert_raises(KeyError, compact_ordered_set.remove, 1)
+    compact_ordered_set.discard(1)
+    
+    assert compact_ordered_set[1] == 2
+    assert compact_ordered_set[-1] == 0
+    assert compact_ordered_set.index(0) == 2
+    nose.tools.assert_raises(ValueError, compact_ordered_set.index, 1)
+    
+    assert compact_ordered_set == CompactOrderedSet([3, 2, 0])
+    assert compact_ordered_set != CompactOrderedSet([2, 3, 0])
+    assert compact_ordered_set == set([0, 2, 3])
+    
+    
+def test_removal():
+    '''Test removing many items, in a way that causes compactions.'''
+    compact_ordered_set = CompactOrderedSet(xrange(1000))
+    for i in xrange(0, 1000, 3):
+        compact_ordered_set.remove(i)
+    for i in xrange(1, 1000, 3):
+        compact_ordered_set.discard(i)
+    expected = range(2, 1000, 3)
+    assert list(compact_ordered_set) == expected
+    assert len(compact_ordered_set) == len(expected)
+    assert compact_ordered_set[:3] == expected[:3]
+    for (i, item) in enumerate(expected):
+        assert compact_ordered_set.index(item) == i
+        
+    compact_ordered_set.add(0)
+    assert list(compact_ordered_set)[-1] == 0
+    compact_ordered_set.clear()
+    assert not compact_ordered_set
+    assert list(compact_ordered_set) == []
+    
+    
+def test_pickle_and_copy():
+    '''Test pickling and copying `CompactOrderedSet`.'''
+    compact_ordered_set = CompactOrderedSet(['a', 'b', 'c', 'd'])
+    compact_ordered_set.remove('b')
+    for protocol in (0, 2):
+        unpickled = cPickle.loads(cPickle.dumps(compact_ordered_set,
+                                                protocol))
+        assert list(unpickled) == ['a', 'c', 'd']
+        assert isinstance(unpickled, CompactOrderedSet)
+    for copied in (copy.copy(compact_ordered_set),
+                   copy.deepcopy(compact_ordered_set)):
+        assert list(copied) == ['a', 'c', 'd']
+        copied.remove('c')
+        assert list(compact_ordered_set) == ['a', 'c', 'd']
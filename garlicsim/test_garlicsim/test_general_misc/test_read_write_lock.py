@@ -0,0 +1,172 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Testing module for `garlicsim.general_misc.read_write_lock`.'''
+
+from __future__ import with_statement
+
+import threading
+import time
+
+import nose.tools
+
+from garlicsim.general_misc.read_write_lock import ReadWriteLock
+
+
+def _in_thread(function):
+    '''Call `function` in another thread, and return the thread.'''
+    thread = threading.Thread(target=function)
+    thread.setDaemon(True)
+    thread.start()
+    return thread
+
+
+def test_reentrancy():
+    '''Test that both modes are reentrant, and that a writer may read.'''
+    lock = ReadWriteLock()
+    with lock.read:
+        with lock.read:
+            pass
+    with lock.write:
+        with lock.write:
+            with lock.read:
+                pass
+    assert lock._ReadWriteLock__writer is None
+    nose.tools.assert_raises(ValueError, lock.release)
+
+
+def test_exclusion():
+    '''Test that readers share the lock and a writer excludes everyone.'''
+    lock = ReadWriteLock()
+    with lock.read:
+        _acquire_in_thread(lock.acquire_read, timeout=1)
+        nose.tools.assert_raises(RuntimeError, _acquire_in_thread,
+                                 lock.acquire_write, timeout=0.1)
+    with lock.write:
+        nose.tools.assert_raises(RuntimeError, _acquire_in_thread,
+                                 lock.acquire_read, timeout=0.1)
+        nose.tools.assert_raises(RuntimeError, _acquire_in_thread,
+                                 lock.acquire_write, timeout=0)
+    _acquire_in_thread(lock.acquire_write, timeout=0)
+
+
+def _acquire_in_thread(acquire, timeout):
+    '''
+    Call `acquire(timeout=timeout)` in another thread, and release.
+
+    Exceptions are raised in the current thread.
+    '''
+    exceptions = []
+    def call():
+        try:
+            acquire(timeout=timeout)
+        except Exception, exception:
+            exceptions.append(exception)
+        else:
+            acquire.im_self.release()
+    _in_thread(call).join()
+    if exceptions:
+        raise exceptions[0]
+
+
+def test_writer_preference():
+    '''Test that new readers wait for a waiting writer.'''
+    lock = ReadWriteLock()
+    events = []
+    lock.acquire_read()
+
+    def write():
+        with lock.write:
+            events.append('write')
+    writer = _in_thread(write)
+    while not lock._ReadWriteLock__pending_writers:
+        time.sleep(0.01)
+
+    def read():
+        with lock.read:
+            events.append('read')
+    reader = _in_thread(read)
+    time.sleep(0.1)
+    assert events == []
+
+    # We already have a read lock, so we get another one despite the writer:
+    with lock.read:
+        pass
+    lock.release()
+
+    writer.join()
+    reader.join()
+    assert events == ['write', 'read']
+
+
+def test_upgrade():
+    '''Test upgrading a read lock to a write lock.'''
+    lock = ReadWriteLock()
+    lock.acquire_read()
+    acquired = threading.Event()
+    exceptions = []
+    def read_then_upgrade():
+        with lock.read:
+            acquired.set()
+            while not lock._ReadWriteLock__upgrading:
+                time.sleep(0.01)
+            # We're upgrading in the main thread, so another upgrade would be
+            # a deadlock:
+            try:
+                lock.acquire_write()
+            except ValueError, exception:
+                exceptions.append(exception)
+    thread = _in_thread(read_then_upgrade)
+    acquired.wait()
+
+    lock.acquire_write() # Waits for the other reader to leave.
+    thread.join()
+    assert len(exceptions) == 1
+    assert lock._ReadWriteLock__writer is threading.currentThread()
+
+    # Releasing the write lock takes us back to holding our read lock, so
+    # other readers can come in, but writers can't:
+    lock.release()
+    assert lock._ReadWriteLock__writer is None
+    _acquire_in_thread(lock.acquire_read, timeout=1)
+    nose.tools.assert_raises(RuntimeError, _acquire_in_thread,
+                             lock.acquire_write, timeout=0.1)
+
+    # And we can upgrade again:
+    with lock.write:
+        with lock.read:
+            assert lock._ReadWriteLock__writer is threading.currentThread()
+        nose.tools.assert_raises(RuntimeError, _acquire_in_thread,
+                                 lock.acquire_read, timeout=0.1)
+    _acquire_in_thread(lock.acquire_read, timeout=1)
+
+    lock.release()
+    assert lock._ReadWriteLock__reader_count == 0
+    _acquire_in_thread(lock.acquire_write, timeout=0)
+    nose.tools.assert_raises(ValueError, lock.release)
+
+
+def test_statistics():
+    '''Test that contention statistics are collected when asked for.'''
+    assert ReadWriteLock().statistics is None
+
+    lock = ReadWriteLock(collect_statistics=True)
+    with lock.read:
+        with lock.read:
+            pass
+    assert lock.statistics.reads == 1
+    assert lock.statistics.contended_reads == 0
+
+    lock.acquire_write()
+    def read():
+        with lock.read:
+            pass
+    thread = _in_thread(read)
+    time.sleep(0.1)
+    lock.release()
+    thread.join()
+    assert lock.statistics.writes == 1
+    assert lock.statistics.contended_writes == 0
+    assert lock.statistics.reads == 2
+    assert lock.statistics.contended_reads == 1
+    assert lock.statistics.read_wait_time >= 0.05
@@ -16,7 +16,8 @@ DEFAULT_STEP_FUNCTION_TYPE = \
 CRUNCHERS_LIST = \
     [garlicsim.asynchronous_crunching.crunchers.ThreadCruncher] + \
     (
-        [garlicsim.asynchronous_crunching.crunchers.ProcessCruncher] if 
+        [garlicsim.asynchronous_crunching.crunchers.ProcessCruncher,
+         garlicsim.asynchronous_crunching.crunchers.PoolCruncher] if 
         import_tools.exists('multiprocessing')
         else []
     )
\ No newline at end of file
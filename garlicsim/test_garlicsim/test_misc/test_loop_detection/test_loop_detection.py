@@ -0,0 +1,58 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for ending simulations that start repeating themselves.'''
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+
+def _create_blinker():
+    '''Create a `life` state with a blinker, which repeats every 2 steps.'''
+    state = life.State.create_root(5, 5)
+    for x in (1, 2, 3):
+        state.board.set(x, 2, True)
+    return state
+
+
+def test():
+    '''Test that loops are found only when `DETECT_LOOPS` is set.'''
+    settings = garlicsim.misc.SimpackGrokker(life).settings
+    assert settings.DETECT_LOOPS is False
+
+    empty_state = life.State.create_root(3, 3)
+    blinker_state = _create_blinker()
+    assert len(garlicsim.list_simulate(empty_state, 10)) == 11
+    assert len(garlicsim.list_simulate(blinker_state, 10)) == 11
+
+    settings.DETECT_LOOPS = True
+    try:
+        # An empty board is a fixed point:
+        assert garlicsim.list_simulate(empty_state, 10) == [empty_state]
+        assert garlicsim.simulate(empty_state, 10).clock == 0
+
+        # The loop is found one state after it started repeating:
+        states = garlicsim.list_simulate(blinker_state, 10)
+        assert len(states) == 3
+        assert states[0] == blinker_state != states[1]
+        assert states[2] == states[0]
+        assert list(garlicsim.iter_simulate(blinker_state, 10)) == states
+
+        # With randomness the step profile isn't deterministic:
+        assert len(garlicsim.list_simulate(empty_state, 10,
+                                           randomness=0.1)) == 11
+
+        project = garlicsim.Project(life)
+        root = project.root_this_state(blinker_state)
+        leaf = project.simulate(root, 10)
+        assert len(leaf.ends) == 1
+        assert list(leaf.make_containing_path().states()) == states
+
+        fork_root = project.root_this_state(blinker_state)
+        job = project.begin_crunching(fork_root, 10)
+        project.run_until(timeout=100)
+        assert not project.crunching_manager.jobs
+        assert len(job.node.ends) == 1
+        assert list(job.node.make_containing_path().states()) == states
+    finally:
+        settings.DETECT_LOOPS = False
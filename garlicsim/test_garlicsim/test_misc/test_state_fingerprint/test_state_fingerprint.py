@@ -0,0 +1,136 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `state_fingerprint`.'''
+
+import copy
+
+import garlicsim
+from garlicsim.misc.state_deepcopy import state_deepcopy
+from garlicsim.misc.state_fingerprint import state_fingerprint
+from garlicsim_lib.simpacks import life, queue, prisoner
+
+
+class Point(object):
+    '''A simple object, for fingerprinting.'''
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class SlottedPoint(object):
+    '''An object with `__slots__`, for fingerprinting.'''
+    __slots__ = ('x', 'y')
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class CachingPoint(Point):
+    '''An object with a cache which shouldn't be part of its fingerprint.'''
+    def __init__(self, x, y):
+        Point.__init__(self, x, y)
+        self.cache = {}
+    def __fingerprint__(self):
+        return (self.x, self.y)
+
+
+class AttributedDict(dict):
+    '''A dict with attributes, for fingerprinting.'''
+
+
+def test_simpacks():
+    '''Test that states have the fingerprint of their content.'''
+    for state in (life.State.create_messy_root(10, 10),
+                  queue.State.create_root(),
+                  prisoner.State.create_messy_root()):
+        state.clock = 0
+        fingerprint = state_fingerprint(state)
+        assert state_fingerprint(state) == fingerprint
+        assert state_fingerprint(state_deepcopy(state)) == \
+               fingerprint
+        next_state = garlicsim.simulate(state, 1)
+        assert state_fingerprint(next_state) != fingerprint
+
+
+def test_content():
+    '''Test that the fingerprint follows content and not identity.'''
+    assert state_fingerprint(Point(1, 2)) == state_fingerprint(Point(1, 2))
+    assert state_fingerprint(Point(1, 2)) != state_fingerprint(Point(2, 1))
+    assert state_fingerprint(Point(1, 2)) != \
+           state_fingerprint(SlottedPoint(1, 2))
+    assert state_fingerprint(SlottedPoint(1, [2])) == \
+           state_fingerprint(SlottedPoint(1, [2]))
+    assert state_fingerprint(SlottedPoint(1, 2)) != \
+           state_fingerprint(SlottedPoint(1, 3))
+
+    different_things = [1, 1.0, '1', u'1\u05d0', True, None, (1,), [1],
+                        [[1]], [Point(1, 1)], {1: 1}, set([1]), Point]
+    fingerprints = map(state_fingerprint, different_things)
+    assert len(set(fingerprints)) == len(different_things)
+
+
+def test_order():
+    '''Test that the order of items in dicts and sets doesn't matter.'''
+    keys = ['key%s' % i for i in range(50)] + [(1, 2), 3, Point(4, 5)]
+    forward = dict((key, i) for (i, key) in enumerate(keys))
+    backward = {}
+    for key in reversed(keys):
+        backward[key] = forward[key]
+    assert state_fingerprint(forward) == state_fingerprint(backward)
+    assert state_fingerprint(set(keys)) == \
+           state_fingerprint(set(reversed(keys)))
+
+
+def test_references():
+    '''Test objects that are referred to more than once, including cycles.'''
+    cycle = [1]
+    cycle.append(cycle)
+    other_cycle = [1]
+    other_cycle.append(other_cycle)
+    assert state_fingerprint(cycle) == state_fingerprint(other_cycle)
+    assert state_fingerprint(cycle) != state_fingerprint([1, [1]])
+
+    point = Point(1, 2)
+    point.me = point
+    assert state_fingerprint(point) == \
+           state_fingerprint(copy.deepcopy(point))
+
+    shared = [1]
+    assert state_fingerprint([shared, shared]) != \
+           state_fingerprint([[1], [1]])
+
+    shared_tuple = (1, 2)
+    assert state_fingerprint(Point(shared_tuple, shared_tuple)) == \
+           state_fingerprint(Point((1, 2), tuple([1, 2])))
+    shared_frozenset = frozenset([1, 2])
+    assert state_fingerprint([shared_frozenset, shared_frozenset]) == \
+           state_fingerprint([frozenset([1, 2]), frozenset([1, 2])])
+
+
+def test_container_attributes():
+    '''Test that attributes of subclasses of containers are fingerprinted.'''
+    things = []
+    for extra in (1, 2):
+        thing = AttributedDict(a=1)
+        thing.extra = extra
+        things.append(thing)
+    (first_thing, second_thing) = things
+    assert state_fingerprint(first_thing) != state_fingerprint(second_thing)
+    second_thing.extra = 1
+    assert state_fingerprint(first_thing) == state_fingerprint(second_thing)
+
+    first_thing.me = first_thing
+    assert state_fingerprint(first_thing) == \
+           state_fingerprint(copy.deepcopy(first_thing))
+    assert state_fingerprint(first_thing) != state_fingerprint(second_thing)
+
+
+def test_hook():
+    '''Test that `__fingerprint__` decides what to fingerprint.'''
+    point = CachingPoint(1, 2)
+    fingerprint = state_fingerprint(point)
+    point.cache['distance'] = 5 ** 0.5
+    assert state_fingerprint(point) == fingerprint
+    point.x = 3
+    assert state_fingerprint(point) != fingerprint
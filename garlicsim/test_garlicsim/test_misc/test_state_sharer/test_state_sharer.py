@@ -0,0 +1,140 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `StateSharer` and structural sharing in step iterators.'''
+
+import random
+
+import garlicsim
+from garlicsim.misc import StateSharer
+from garlicsim.misc.state_fingerprint import state_fingerprint
+from garlicsim.misc.step_iterators import DuplicatingStepGeneratorIterator
+from garlicsim_lib.simpacks import queue
+
+
+class Thing(object):
+    '''A simple object to put in states.'''
+    def __init__(self, value):
+        self.value = value
+
+
+class SlottedThing(object):
+    '''An object with `__slots__`, which can't be shared.'''
+    __slots__ = ('value',)
+    def __init__(self, value):
+        self.value = value
+
+
+class State(garlicsim.data_structures.State):
+    '''A state with a big part and a small part.'''
+
+    def __init__(self):
+        self.clock = 0
+        self.things = [Thing(i) for i in range(10)]
+        self.tuples = [(i, Thing(i)) for i in range(10)]
+        self.slotted_thing = SlottedThing([])
+        self.persistent = \
+            garlicsim.general_misc.persistent.CrossProcessPersistent()
+
+    def inplace_step_generator(self):
+        while True:
+            self.things[self.clock % 10].value += 1
+            self.clock += 1
+            yield
+
+
+def test_state_sharer():
+    '''Test that copies share what didn't change and nothing else.'''
+    state = State()
+    state_sharer = StateSharer()
+    first_copy = state_sharer.copy(state)
+    assert first_copy.things[0] is not state.things[0]
+    assert first_copy.persistent is state.persistent
+    assert state_sharer.copy(state).things[0] is first_copy.things[0]
+
+    state.things[3].value = 'changed'
+    state.things.append(Thing(10))
+    state.clock += 1
+    second_copy = state_sharer.copy(state)
+    assert second_copy is not first_copy
+    assert second_copy.things is not first_copy.things
+    assert second_copy.things[3] is not first_copy.things[3]
+    assert second_copy.things[4] is first_copy.things[4]
+    assert second_copy.tuples is first_copy.tuples
+    assert second_copy.slotted_thing is not first_copy.slotted_thing
+    assert second_copy.slotted_thing.value is not \
+           first_copy.slotted_thing.value
+    assert [thing.value for thing in first_copy.things] == range(10)
+    assert second_copy.things[3].value == 'changed'
+    assert len(second_copy.things) == 11
+
+    # Objects in a cycle are copied every time:
+    state.things[5].me = state.things[5]
+    third_copy = state_sharer.copy(state)
+    assert state_sharer.copy(state).things[5] is not third_copy.things[5]
+    assert state_sharer.copy(state).things[6] is third_copy.things[6]
+
+    state_sharer.clear()
+    assert state_sharer.copy(state).things[6] is not third_copy.things[6]
+
+
+def test_step_generator():
+    '''Test a `DuplicatingStepGeneratorIterator` with a `StateSharer`.'''
+    step_profile = garlicsim.misc.StepProfile(State.inplace_step_generator)
+    step_iterator = DuplicatingStepGeneratorIterator(State(), step_profile)
+    step_iterator.state_sharer = StateSharer()
+    states = [step_iterator.next() for i in range(12)]
+    for (i, state) in enumerate(states):
+        assert state.clock == i + 1
+        assert [thing.value for thing in state.things] == \
+               [value + (value < i + 1) + (value < i - 9) for value in
+                range(10)]
+    assert states[-1].things[5] is states[-2].things[5]
+    assert states[-1].things[1] is not states[-2].things[1]
+
+
+def test_queue():
+    '''Test that a queue simulation is the same with structural sharing.'''
+    simpack_grokker = garlicsim.misc.SimpackGrokker(queue)
+    step_profile = garlicsim.misc.StepProfile(queue.State.inplace_step)
+    root = queue.State.create_root()
+    root.clock = 0
+
+    def summarize(state):
+        facility = state.facility
+        return (state.clock, len(facility.clients),
+                len(facility.waiting_clients),
+                [server.client_counter for server in state.servers],
+                [event.time_left for event in state.event_set.events])
+
+    timelines = []
+    for structural_sharing in (False, True):
+        simpack_grokker.settings.STRUCTURAL_SHARING = structural_sharing
+        try:
+            step_iterator = simpack_grokker.get_step_iterator(root,
+                                                              step_profile)
+        finally:
+            simpack_grokker.settings.STRUCTURAL_SHARING = False
+        assert (step_iterator.state_sharer is not None) == \
+               structural_sharing
+        random.seed(0)
+        states = []
+        fingerprints = []
+        for i in range(100):
+            states.append(step_iterator.next())
+            fingerprints.append(state_fingerprint(states[-1]))
+        # No state was changed after it was made:
+        assert map(state_fingerprint, states) == fingerprints
+        timelines.append(states)
+
+    (timeline, shared_timeline) = timelines
+    assert map(summarize, timeline) == map(summarize, shared_timeline)
+    def count_shared_clients(states):
+        return len([client for (previous_state, state) in
+                    zip(states, states[1:]) for client in
+                    state.facility.clients if client in
+                    previous_state.facility.clients])
+
+    # Clients don't change after they arrive, so they're shared:
+    assert count_shared_clients(timeline) == 0
+    assert count_shared_clients(shared_timeline) > 0
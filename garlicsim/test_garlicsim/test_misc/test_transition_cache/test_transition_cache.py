@@ -0,0 +1,79 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Tests for `TransitionCache`.'''
+
+import cPickle
+
+import garlicsim
+from garlicsim.misc import TransitionCache
+from garlicsim_lib.simpacks import life
+
+
+def test_transition_cache():
+    '''Test storing, evicting and counting transitions.'''
+    states = [life.State.create_messy_root(5, 5) for i in range(4)]
+    step_profile = garlicsim.misc.StepProfile(life.State.step)
+    keys = [TransitionCache.make_key(state, step_profile) for state in
+            states]
+    assert len(set(keys)) == 4
+    state_size = len(cPickle.dumps(states[0], cPickle.HIGHEST_PROTOCOL))
+
+    transition_cache = TransitionCache(max_size=3 * state_size)
+    assert transition_cache.get(keys[0]) == (None, None)
+    fingerprint = transition_cache.put(keys[0], states[1])
+    assert (fingerprint, step_profile) == keys[1]
+
+    (state, fingerprint) = transition_cache.get(keys[0])
+    assert state == states[1]
+    assert state is not states[1]
+    assert (fingerprint, step_profile) == keys[1]
+    assert (transition_cache.hits, transition_cache.misses) == (1, 1)
+
+    # Filling the cache, and using the first transition so it won't be the
+    # least recently used:
+    transition_cache.put(keys[1], states[2])
+    transition_cache.put(keys[2], states[3])
+    transition_cache.get(keys[0])
+    assert len(transition_cache) == 3
+    transition_cache.put(keys[3], states[0])
+    assert len(transition_cache) == 3
+    assert transition_cache.size <= transition_cache.max_size
+    assert transition_cache.get(keys[1]) == (None, None)
+    assert transition_cache.get(keys[0])[0] == states[1]
+
+    # Pickling gives an empty cache:
+    unpickled_transition_cache = cPickle.loads(cPickle.dumps(transition_cache))
+    assert len(unpickled_transition_cache) == 0
+    assert unpickled_transition_cache.max_size == transition_cache.max_size
+
+    transition_cache.clear()
+    assert len(transition_cache) == transition_cache.size == 0
+
+
+def test_forking():
+    '''Test that forking the same node again takes states from the cache.'''
+    simpack_grokker = garlicsim.misc.SimpackGrokker(life)
+    assert simpack_grokker.transition_cache is None
+    transition_cache = simpack_grokker.transition_cache = \
+        TransitionCache(max_size=10 ** 6)
+    try:
+        project = garlicsim.Project(life)
+        root = project.root_this_state(life.State.create_messy_root(5, 5))
+        leaf = project.simulate(root, 10, life.State.step)
+        assert (transition_cache.hits, transition_cache.misses) == (0, 10)
+
+        fork_leaf = project.simulate(root, 10, life.State.step)
+        assert fork_leaf is not leaf
+        assert (transition_cache.hits, transition_cache.misses) == (10, 10)
+        states = list(leaf.make_containing_path().states())
+        fork_states = list(fork_leaf.make_containing_path().states())
+        assert fork_states == states
+        assert [state.clock for state in fork_states] == range(11)
+        assert not set(map(id, fork_states[1:])) & set(map(id, states))
+
+        # With randomness the step profile isn't deterministic:
+        project.simulate(root, 10, life.State.step, randomness=0.1)
+        assert (transition_cache.hits, transition_cache.misses) == (10, 10)
+    finally:
+        simpack_grokker.transition_cache = None
@@ -9,6 +9,7 @@ See its documentation for more information.
 
 import random
 import itertools
+import array
 
 import garlicsim.data_structures
 
@@ -225,6 +226,29 @@ class Board(object):
     def __ne__(self, other):
         return not self.__eq__(other)
     
+    
+    def __make_delta__(self, old_board):
+        '''
+        Get the indices of the cells that changed since `old_board`.
+        
+        This is used by `garlicsim.misc.state_delta`, so nodes can keep boards
+        as deltas.
+        '''
+        if (self.width, self.height) != (old_board.width, old_board.height):
+            return NotImplemented
+        return array.array('l', [
+            i for (i, (old_cell, cell)) in
+            enumerate(itertools.izip(old_board.__list, self.__list))
+            if old_cell is not cell
+        ])
+    
+    
+    def __apply_delta__(self, delta):
+        '''Flip the cells whose indices are in `delta`.'''
+        cells = self.__list
+        for i in delta:
+            cells[i] = not cells[i]
+    
             
     @staticmethod
     def create_diehard(width=45, height=25):
@@ -76,6 +76,11 @@ class GuiProject(object):
         
         assert isinstance(self.project, garlicsim.Project)
         
+        self.tree_journal_listener = self.project.tree.journal.add_listener()
+        '''
+        Listener to the journal of the tree, for knowing what changed in it.
+        '''
+        
 
         ### If it's a new project, use `ProcessCruncher` if available: ########
         #                                                                     #
@@ -749,69 +754,78 @@ class GuiProject(object):
         # This is done by `Project.sync_crunchers`, which we call here, so
         # that's not the tricky part here.
         #
-        # The second task is the tricky part. We want to know just how much the
-        # tree was modified during this action. And the tricky thing is that
-        # `Project.sync_crunchers` won't do that for us, so we're going to have
-        # to try to deduce how much the tree modified ourselves, just by
-        # looking at the `jobs` list before and after calling
-        # `Project.sync_crunchers`.
-        #
-        # And when I say "to know how much the tree modified", I mean mainly to
-        # know if the modification is a structural modification, or just some
-        # blocks getting fatter. And the reason we want to know this is so
-        # we'll know whether to update various workspace widgets.
+        # The second task is to know just how much the tree was modified
+        # during this action, and where. We want to know whether the
+        # modification is a structural modification, or just some blocks
+        # getting fatter, and whether it was on the active path. We need to
+        # know this so we'll know which workspace widgets to update. We learn
+        # this by draining the changes recorded in the tree's journal.
         
-        jobs = self.project.crunching_manager.jobs
+        self.project.crunching_manager.preferred_path = self.path
         
-        jobs_to_nodes = dict((job, job.node) for job in jobs)
-
-                
         added_nodes = self.project.sync_crunchers()        
         # This is the heavy line here, which actually executes the Project's
         # `sync_crunchers` function.
         
+        tree_changes = self.tree_journal_listener.drain()
         
-        if any(
-            (job not in jobs) or \
-            (job.node.soft_get_block() is not old_node.soft_get_block())
-            for job, old_node in jobs_to_nodes.iteritems()
-               ):
-
-            # What does this codition mean?
-            # 
-            # It means that there is at least one job that either:
-            # (a) Was removed from the jobs list, or
-            # (b) Changed the soft block it's pointing to.            
-            #
-            # The thing is, if there was a structural modification in the tree,
-            # this condition must be `True`. So we report a structure
-            # modification:
-            
-            self.tree_structure_modified_at_unknown_location_emitter.emit()
-            
-            # Even though we are not sure that the tree structure was modified.
-            # We have to play it safe. And since this condition doesn't happen
-            # most of the time when crunching, we're not wasting too much
-            # rendering time by assuming this is a structural modification.
-            
-            # Note that we didn't check if `added_nodes > 0`: This is because
-            # if an `End` was added to the tree, it wouldn't have been counted
-            # in `added_nodes`.
+        structural_tree_changes = [tree_change for tree_change in
+                                   tree_changes if tree_change.is_structural]
+        
+        if structural_tree_changes:
+            self.__emit_by_location(
+                structural_tree_changes,
+                on_path=self.tree_structure_modified_on_path_emitter,
+                not_on_path=self.tree_structure_modified_not_on_path_emitter,
+                at_unknown_location=\
+                    self.tree_structure_modified_at_unknown_location_emitter
+            )
             
-        elif added_nodes > 0:
+        elif tree_changes:
             
             # If this condition is `True`, we know as a fact that there was no
             # structural modification, and we know as a fact that some blocks
             # have gotten fatter.
             
-            self.tree_modified_at_unknown_location_emitter.emit()
-            
-        # todo: It would be hard but nice to know whether the tree changes were
-        # on the path. This could save some rendering on `SeekBar`.
+            self.__emit_by_location(
+                tree_changes,
+                on_path=self.tree_modified_on_path_emitter,
+                not_on_path=self.tree_modified_not_on_path,
+                at_unknown_location=\
+                    self.tree_modified_at_unknown_location_emitter
+            )
             
         return added_nodes
 
     
+    def __emit_by_location(self, tree_changes, on_path, not_on_path,
+                           at_unknown_location):
+        '''
+        Emit the emitter that matches the location of the tree changes.
+        
+        If all the changes happened on the active path, `on_path` is emitted.
+        If all of them happened off of it, `not_on_path` is emitted. Otherwise,
+        `at_unknown_location` is emitted.
+        '''
+        path = self.path
+        locations_on_path = set()
+        for tree_change in tree_changes:
+            location = tree_change.location
+            if location is None:
+                at_unknown_location.emit()
+                return
+            locations_on_path.add(
+                (path is not None) and (location in path)
+            )
+            
+        if locations_on_path == set([True]):
+            on_path.emit()
+        elif locations_on_path == set([False]):
+            not_on_path.emit()
+        else:
+            at_unknown_location.emit()
+        
+    
     def finalize_active_node(self):
         '''Finalize the changes made to the active node.'''
         self.active_node.finalize()
@@ -857,6 +871,7 @@ class GuiProject(object):
         del my_dict['timer_for_playing']
         del my_dict['simpack_grokker']
         del my_dict['simpack_wx_grokker']
+        del my_dict['tree_journal_listener']
         
         # Getting rid of emitter:
         del my_dict['step_profiles']
@@ -0,0 +1,5 @@
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''Benchmarks for GarlicSim.'''
+
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark measuring `Block.index` on a huge block.
+
+Makes a block of nodes, and reports the time it takes to find the last node
+by scanning the list of nodes, and the time of a thousand lookups with
+`Block.index` and `Node.is_last_on_block`. The lookups should take constant
+time, so a thousand of them should be faster than a single scan.
+
+Usage:
+
+    python block_index.py [number_of_nodes]
+
+The default number of nodes is 1,000,000.
+'''
+
+import sys
+import time
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim_lib.simpacks import life
+
+
+DEFAULT_NUMBER_OF_NODES = 10 ** 6
+
+NUMBER_OF_LOOKUPS = 1000
+
+
+def make_node_chain(length):
+    '''
+    Create a chain of `length` natural nodes, ready to be put in a block.
+
+    All the nodes share the same state object, because we only care about the
+    structure of the chain and want to keep memory usage down.
+    '''
+    tree = ds.Tree()
+    state = life.State.create_root(2, 2)
+    state.clock = 0
+    step_profile = garlicsim.misc.StepProfile(life.State.step)
+    root = ds.Node(tree, state, step_profile=step_profile)
+    nodes = [root]
+    for i in xrange(length - 1):
+        parent = nodes[-1]
+        node = ds.Node(tree, state, parent=parent, step_profile=step_profile)
+        parent.children.append(node)
+        nodes.append(node)
+    return nodes
+
+
+def benchmark(number_of_nodes):
+    '''
+    Time lookups of the last node in a block of `number_of_nodes` nodes.
+
+    Returns `(linear_scan_duration, lookups_duration)`.
+    '''
+    nodes = make_node_chain(number_of_nodes)
+    block = ds.Block(nodes)
+    last_node = nodes[-1]
+
+    start_time = time.time()
+    assert nodes.index(last_node) == number_of_nodes - 1
+    linear_scan_duration = time.time() - start_time
+
+    start_time = time.time()
+    for i in xrange(NUMBER_OF_LOOKUPS):
+        assert block.index(last_node) == number_of_nodes - 1
+        assert last_node.is_last_on_block()
+    lookups_duration = time.time() - start_time
+
+    return (linear_scan_duration, lookups_duration)
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    number_of_nodes = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                      else DEFAULT_NUMBER_OF_NODES
+
+    print('Looking up the last node in a block of %s nodes.' %
+          number_of_nodes)
+
+    (linear_scan_duration, lookups_duration) = benchmark(number_of_nodes)
+    print('A scan of the list of nodes took %.4f seconds.' %
+          linear_scan_duration)
+    print('%s lookups with `Block.index` took %.4f seconds.' %
+          (NUMBER_OF_LOOKUPS, lookups_duration))
+
+
+if __name__ == '__main__':
+    main()
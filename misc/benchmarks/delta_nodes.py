@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark comparing the storage of states in `Node` and `DeltaNode`.
+
+Crunches a Life simulation into a tree once with each node type, and reports
+the size of the pickled tree, the time it took to crunch, and the time it
+takes to read the states of all the nodes, in order and in random order.
+
+Usage:
+
+    python delta_nodes.py [board_side] [number_of_states]
+
+The default is 200 states of a 50x50 board.
+'''
+
+from __future__ import with_statement
+
+import sys
+import time
+import random
+import cPickle
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim.general_misc.temp_value_setters import TempRecursionLimitSetter
+from garlicsim_lib.simpacks import life
+
+
+DEFAULT_BOARD_SIDE = 50
+
+DEFAULT_NUMBER_OF_STATES = 200
+
+
+def benchmark(node_type, root_state, number_of_states):
+    '''
+    Crunch `number_of_states` states from `root_state` using `node_type`.
+
+    Returns `(pickled_tree_size, crunching_duration, reading_duration,
+    random_reading_duration)`.
+    '''
+    project = garlicsim.Project(life)
+    project.tree.node_type = node_type
+    root = project.root_this_state(root_state)
+
+    start_time = time.time()
+    leaf = project.simulate(root, number_of_states)
+    crunching_duration = time.time() - start_time
+
+    # Like the GUI does when saving, since nodes are pickled recursively:
+    with TempRecursionLimitSetter(10000):
+        pickled_tree_size = len(cPickle.dumps(project.tree, 2))
+
+    nodes = list(leaf.make_containing_path())
+    start_time = time.time()
+    for node in nodes:
+        node.state
+    reading_duration = time.time() - start_time
+
+    random.shuffle(nodes)
+    start_time = time.time()
+    for node in nodes:
+        node.state
+    random_reading_duration = time.time() - start_time
+
+    return (pickled_tree_size, crunching_duration, reading_duration,
+            random_reading_duration)
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    board_side = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                 else DEFAULT_BOARD_SIDE
+    number_of_states = int(sys.argv[2]) if len(sys.argv) >= 3 \
+                       else DEFAULT_NUMBER_OF_STATES
+
+    print('Crunching %s states of a %sx%s Life board with each node type.' %
+          (number_of_states, board_side, board_side))
+
+    root_state = life.State.create_messy_root(board_side, board_side)
+    results = {}
+    for node_type in (ds.Node, ds.DeltaNode):
+        results[node_type] = (pickled_tree_size, crunching_duration,
+                              reading_duration, random_reading_duration) = \
+            benchmark(node_type, garlicsim.misc.state_deepcopy.state_deepcopy(
+                root_state), number_of_states)
+        print('%s: Tree pickled to %.1f KB, crunched in %.1f seconds, states '
+              'read in %.3f seconds, (%.3f seconds in random order.)' %
+              (node_type.__name__, pickled_tree_size / 1024.0,
+               crunching_duration, reading_duration, random_reading_duration))
+
+    print('The tree of DeltaNode takes %.1f%% of the size of the tree of '
+          'Node.' % (100.0 * results[ds.DeltaNode][0] / results[ds.Node][0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark comparing the memory overhead of `Node` and `CompactNode`.
+
+Crunches a Life simulation into a tree once with each node type, and reports
+the memory taken by the nodes themselves, (not counting the states,) along
+with the time it took to crunch.
+
+Usage:
+
+    python node_memory.py [number_of_nodes]
+
+The default number of nodes is 1,000,000.
+'''
+
+import sys
+import time
+
+import garlicsim
+from garlicsim import data_structures as ds
+from garlicsim_lib.simpacks import life
+
+
+DEFAULT_NUMBER_OF_NODES = 10 ** 6
+
+
+def get_node_overhead(node):
+    '''Get the number of bytes taken by `node`, not counting its state.'''
+    size = sys.getsizeof(node)
+    if not isinstance(node, ds.CompactNode):
+        # (We don't touch a compact node's `__dict__`, because that would
+        # create one.)
+        size += sys.getsizeof(node.__dict__)
+    for container in (node.children, node.derived_nodes, node.ends):
+        if isinstance(container, list):
+            size += sys.getsizeof(container)
+    return size
+
+
+def benchmark(node_type, number_of_nodes):
+    '''
+    Crunch `number_of_nodes` Life nodes using `node_type`.
+    
+    Returns `(node_overhead, crunching_duration)`, where `node_overhead` is
+    the total number of bytes taken by the nodes.
+    '''
+    project = garlicsim.Project(life)
+    project.tree.node_type = node_type
+    root = project.root_this_state(life.State.create_root(2, 2))
+    
+    start_time = time.time()
+    project.simulate(root, number_of_nodes - 1)
+    crunching_duration = time.time() - start_time
+    
+    assert len(project.tree.nodes) == number_of_nodes
+    node_overhead = sum(get_node_overhead(node) for node in project.tree.nodes)
+    
+    return (node_overhead, crunching_duration)
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    number_of_nodes = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                      else DEFAULT_NUMBER_OF_NODES
+    
+    print('Crunching %s Life nodes with each node type.' % number_of_nodes)
+    
+    results = {}
+    for node_type in (ds.Node, ds.CompactNode):
+        (node_overhead, crunching_duration) = \
+            benchmark(node_type, number_of_nodes)
+        results[node_type] = node_overhead
+        print('%s: %.1f MB total, %.1f bytes per node, crunched in %.1f '
+              'seconds.' % (node_type.__name__,
+                            node_overhead / 2.0 ** 20,
+                            node_overhead / float(number_of_nodes),
+                            crunching_duration))
+    
+    print('CompactNode takes %.1f%% of the memory taken by Node.' %
+          (100.0 * results[ds.CompactNode] / results[ds.Node]))
+    
+    
+if __name__ == '__main__':
+    main()
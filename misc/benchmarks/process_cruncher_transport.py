@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark comparing the ways `ProcessCruncher` can send states back.
+
+A child process puts the same big Life state in a queue many times while the
+main process gets them, once through a `multiprocessing.Queue`, (the default,)
+and once through a `SharedMemoryQueue`. This is repeated with the board's
+cells kept in an `array.array`, which `SharedMemoryQueue` moves without
+pickling. Reported are the states per second that went through each queue.
+
+Usage:
+
+    python process_cruncher_transport.py [board_side] [number_of_states]
+
+The default is 40 states of a 500x500 board.
+'''
+
+import array
+import sys
+import time
+import multiprocessing
+
+from garlicsim_lib.simpacks import life
+from garlicsim.asynchronous_crunching.crunchers.process_cruncher.\
+     shared_memory_queue import SharedMemoryQueue
+
+
+DEFAULT_BOARD_SIDE = 500
+
+DEFAULT_NUMBER_OF_STATES = 40
+
+SHARED_MEMORY_SIZE = 64 * 2 ** 20
+
+
+def _put_states(queue, state, number_of_states):
+    '''Put `state` in `queue` `number_of_states` times. Runs in the child.'''
+    for i in xrange(number_of_states):
+        queue.put(state)
+
+
+def benchmark(queue, state, number_of_states):
+    '''
+    Move `state` through `queue` `number_of_states` times.
+
+    Returns the number of states per second.
+    '''
+    process = multiprocessing.Process(target=_put_states,
+                                      args=(queue, state, number_of_states))
+    process.daemon = True
+    start_time = time.time()
+    process.start()
+    for i in xrange(number_of_states):
+        queue.get()
+    duration = time.time() - start_time
+    process.join()
+    return number_of_states / duration
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    board_side = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                 else DEFAULT_BOARD_SIDE
+    number_of_states = int(sys.argv[2]) if len(sys.argv) >= 3 \
+                       else DEFAULT_NUMBER_OF_STATES
+
+    list_state = life.State.create_messy_root(board_side, board_side)
+    array_state = life.State.create_messy_root(board_side, board_side)
+    array_state.board._Board__list = \
+        array.array('b', array_state.board._Board__list)
+
+    print('Moving %s states of a %sx%s Life board between processes.' %
+          (number_of_states, board_side, board_side))
+
+    for (state, cells_description) in ((list_state, 'list'),
+                                       (array_state, 'array')):
+        queue_results = {}
+        for queue_type in (multiprocessing.Queue, SharedMemoryQueue):
+            if queue_type is SharedMemoryQueue:
+                queue = SharedMemoryQueue(SHARED_MEMORY_SIZE)
+            else:
+                queue = multiprocessing.Queue()
+            queue_results[queue_type] = \
+                benchmark(queue, state, number_of_states)
+        print('Cells in a %s: %.1f states per second through '
+              '`multiprocessing.Queue`, %.1f states per second through '
+              '`SharedMemoryQueue`.' % (cells_description,
+                                        queue_results[multiprocessing.Queue],
+                                        queue_results[SharedMemoryQueue]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark of the overhead of the tree's `ReadWriteLock`.
+
+First the cost of acquiring and releasing a read lock is measured, both for a
+first acquisition and for a reentrant one, with `threading.RLock` for
+comparison. Then a `HistoryBrowser` is set up on a path of Life states, and
+the time per call of its most common methods is measured with the tree lock,
+and with a stand-in that doesn't lock. The difference is the lock's overhead
+per `HistoryBrowser` call.
+
+Usage:
+
+    python read_write_lock_overhead.py [number_of_calls]
+
+The default is 20000 calls.
+'''
+
+from __future__ import with_statement
+
+import sys
+import threading
+import time
+
+import garlicsim
+from garlicsim.general_misc.infinity import infinity
+from garlicsim.general_misc.read_write_lock import ReadWriteLock
+from garlicsim.asynchronous_crunching import (CrunchingProfile, Job,
+                                              HistoryBrowser)
+from garlicsim.asynchronous_crunching.crunchers import ThreadCruncher
+from garlicsim_lib.simpacks import life
+
+
+DEFAULT_NUMBER_OF_CALLS = 20000
+
+PATH_LENGTH = 100
+'''The number of states in the path that the history browser looks at.'''
+
+
+class NoLock(object):
+    '''A stand-in for a `ReadWriteLock` that doesn't lock, for comparison.'''
+
+    def __init__(self):
+        self.read = self.write = self
+
+
+    def __enter__(self):
+        pass
+
+
+    def __exit__(self, *args, **kwargs):
+        pass
+
+
+def time_per_call(function, number_of_calls):
+    '''Return the time in microseconds that a call to `function` takes.'''
+    start_time = time.time()
+    for i in xrange(number_of_calls):
+        function()
+    return (time.time() - start_time) / number_of_calls * 10 ** 6
+
+
+def benchmark_locks(number_of_calls):
+    '''Print the cost of acquiring and releasing locks.'''
+    read_write_lock = ReadWriteLock()
+    def read():
+        with read_write_lock.read:
+            pass
+    rlock = threading.RLock()
+    def lock():
+        with rlock:
+            pass
+
+    print('Acquiring and releasing, in microseconds:')
+    print('    ReadWriteLock.read: %.2f' % time_per_call(read,
+                                                         number_of_calls))
+    print('    threading.RLock: %.2f' % time_per_call(lock, number_of_calls))
+    with read_write_lock.read:
+        print('    ReadWriteLock.read, reentrant: %.2f' %
+              time_per_call(read, number_of_calls))
+    with rlock:
+        print('    threading.RLock, reentrant: %.2f' %
+              time_per_call(lock, number_of_calls))
+
+
+def make_history_browser():
+    '''
+    Make a `HistoryBrowser` on a path of `PATH_LENGTH` Life states.
+
+    The history browser belongs to a cruncher that isn't started.
+    '''
+    project = garlicsim.Project(life)
+    root = project.root_this_state(life.State.create_messy_root(5, 5))
+    leaf = project.simulate(root, PATH_LENGTH - 1)
+    crunching_manager = project.crunching_manager
+    crunching_profile = CrunchingProfile(
+        infinity,
+        project.build_step_profile()
+    )
+    cruncher = ThreadCruncher(crunching_manager, leaf.state,
+                              crunching_profile)
+    crunching_manager.crunchers[Job(leaf, crunching_profile)] = cruncher
+    return HistoryBrowser(cruncher)
+
+
+def benchmark_history_browser(number_of_calls):
+    '''Print the time per `HistoryBrowser` call, with and without the lock.'''
+    history_browser = make_history_browser()
+    calls = [
+        ('len(history_browser)', lambda: len(history_browser)),
+        ('history_browser[-1]', lambda: history_browser[-1]),
+        ('history_browser[0]', lambda: history_browser[0]),
+        ('history_browser.get_state_by_clock(50)',
+         lambda: history_browser.get_state_by_clock(50)),
+    ]
+    tree_lock = history_browser.tree_lock
+
+    print('HistoryBrowser calls, in microseconds, with the tree lock / '
+          'without it:')
+    for (name, function) in calls:
+        history_browser.tree_lock = tree_lock
+        with_lock = time_per_call(function, number_of_calls)
+        history_browser.tree_lock = NoLock()
+        without_lock = time_per_call(function, number_of_calls)
+        print('    %s: %.2f / %.2f, lock overhead %.2f' %
+              (name, with_lock, without_lock, with_lock - without_lock))
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    number_of_calls = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                      else DEFAULT_NUMBER_OF_CALLS
+    benchmark_locks(number_of_calls)
+    benchmark_history_browser(number_of_calls)
+
+
+if __name__ == '__main__':
+    main()
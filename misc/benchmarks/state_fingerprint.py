@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark of `state_fingerprint` on the states of a few simpacks.
+
+A state of each of the Life, Queue and Prisoner simpacks is fingerprinted a
+number of times, and so is its pickle digested, (which is what
+`TransitionCache` uses for a fingerprint.) Reported is the time each takes per
+state.
+
+Usage:
+
+    python state_fingerprint.py [number_of_repeats]
+
+The default is 1000 repeats.
+'''
+
+import sys
+import time
+import hashlib
+import cPickle
+
+from garlicsim.misc.state_fingerprint import state_fingerprint
+from garlicsim_lib.simpacks import life, queue, prisoner
+
+
+DEFAULT_NUMBER_OF_REPEATS = 1000
+
+
+def pickle_fingerprint(state):
+    '''Fingerprint a state by digesting its pickle.'''
+    return hashlib.sha1(
+        cPickle.dumps(state, cPickle.HIGHEST_PROTOCOL)
+    ).digest()
+
+
+def benchmark(function, state, number_of_repeats):
+    '''
+    Call `function` on `state` `number_of_repeats` times.
+
+    Returns the number of microseconds per call.
+    '''
+    start_time = time.time()
+    for i in xrange(number_of_repeats):
+        function(state)
+    return (time.time() - start_time) * 10 ** 6 / number_of_repeats
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    number_of_repeats = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                        else DEFAULT_NUMBER_OF_REPEATS
+
+    states = (
+        ('Life, 30x30', life.State.create_messy_root(30, 30)),
+        ('Queue', queue.State.create_root()),
+        ('Prisoner, 70 players', prisoner.State.create_messy_root()),
+    )
+
+    print('Fingerprinting each state %s times.' % number_of_repeats)
+
+    for (name, state) in states:
+        fingerprint_time = benchmark(state_fingerprint, state,
+                                     number_of_repeats)
+        pickle_time = benchmark(pickle_fingerprint, state, number_of_repeats)
+        print('%s: %.1f microseconds with `state_fingerprint`, %.1f '
+              'microseconds digesting a pickle.' % (name, fingerprint_time,
+                                                    pickle_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark of `STRUCTURAL_SHARING` with the inplace Queue and Prisoner simpacks.
+
+Each simpack is simulated with `list_simulate` for a number of states, once
+deepcopying the state on every step and once with structural sharing. For
+Queue, the service is slow so clients pile up in the queue; since they don't
+change while they wait, they're shared. In Prisoner, every player plays on
+almost every step, so there's little to share. Reported are the states per
+second of the fastest of three runs.
+
+Usage:
+
+    python structural_sharing.py [number_of_states]
+
+The default is 500 states.
+'''
+
+import sys
+import time
+import random
+
+import garlicsim
+from garlicsim_lib.simpacks import queue, prisoner
+
+
+DEFAULT_NUMBER_OF_STATES = 500
+
+
+def benchmark(simpack, state, structural_sharing, number_of_states):
+    '''
+    Simulate `number_of_states` states from `state`, three times.
+
+    Returns the number of states per second of the fastest time.
+    '''
+    settings = garlicsim.misc.SimpackGrokker(simpack).settings
+    old_structural_sharing = settings.STRUCTURAL_SHARING
+    settings.STRUCTURAL_SHARING = structural_sharing
+    try:
+        durations = []
+        for i in range(3):
+            random.seed(0)
+            start_time = time.time()
+            garlicsim.list_simulate(state, number_of_states,
+                                    simpack.State.inplace_step)
+            durations.append(time.time() - start_time)
+        return number_of_states / min(durations)
+    finally:
+        settings.STRUCTURAL_SHARING = old_structural_sharing
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    number_of_states = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                       else DEFAULT_NUMBER_OF_STATES
+
+    random.seed(0)
+    queue_state = queue.State.create_root(mean_service_time=30)
+    queue_state.clock = 0
+    queue_state = garlicsim.simulate(queue_state, 1000,
+                                     queue.State.inplace_step)
+    prisoner_state = prisoner.State.create_messy_root()
+    prisoner_state.clock = 0
+
+    print('Simulating %s states of each simpack.' % number_of_states)
+
+    for (name, simpack, state) in (
+        ('Queue, %s clients' % len(queue_state.facility.clients), queue,
+         queue_state),
+        ('Prisoner, %s players' % len(prisoner_state.players), prisoner,
+         prisoner_state)):
+        deepcopying = benchmark(simpack, state, False, number_of_states)
+        sharing = benchmark(simpack, state, True, number_of_states)
+        print('%s: %.1f states per second deepcopying, %.1f states per '
+              'second with structural sharing.' % (name, deepcopying,
+                                                   sharing))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark of forking the same node again with a `TransitionCache`.
+
+A Life board is simulated from its root for a number of states, and then the
+root is forked again and simulated for the same number of states. This is done
+once without a transition cache and once with one. Reported are the states
+per second of each run.
+
+Usage:
+
+    python transition_cache.py [board_side] [number_of_states]
+
+The default is 200 states of a 30x30 board.
+'''
+
+import sys
+import time
+
+import garlicsim
+from garlicsim_lib.simpacks import life
+
+
+DEFAULT_BOARD_SIDE = 30
+
+DEFAULT_NUMBER_OF_STATES = 200
+
+
+def benchmark(transition_cache, board_side, number_of_states):
+    '''
+    Simulate from a root twice, using `transition_cache`, which may be `None`.
+
+    Returns the states per second of the first and second simulations.
+    '''
+    simpack_grokker = garlicsim.misc.SimpackGrokker(life)
+    old_transition_cache = simpack_grokker.transition_cache
+    simpack_grokker.transition_cache = transition_cache
+    try:
+        project = garlicsim.Project(life)
+        root = project.root_this_state(
+            life.State.create_messy_root(board_side, board_side)
+        )
+        results = []
+        for i in range(2):
+            start_time = time.time()
+            project.simulate(root, number_of_states, life.State.step)
+            results.append(number_of_states / (time.time() - start_time))
+        return results
+    finally:
+        simpack_grokker.transition_cache = old_transition_cache
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    board_side = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                 else DEFAULT_BOARD_SIDE
+    number_of_states = int(sys.argv[2]) if len(sys.argv) >= 3 \
+                       else DEFAULT_NUMBER_OF_STATES
+
+    print('Simulating %s states of a %sx%s Life board, twice from the same '
+          'root.' % (number_of_states, board_side, board_side))
+
+    transition_cache = garlicsim.misc.TransitionCache(max_size=100 * 2 ** 20)
+    for (name, cache) in (('Without a cache', None),
+                          ('With a cache', transition_cache)):
+        (first, second) = benchmark(cache, board_side, number_of_states)
+        print('%s: %.1f states per second the first time, %.1f states per '
+              'second the second time.' % (name, first, second))
+    print(transition_cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Copyright 2009-2011 Ram Rachum.
+# This program is distributed under the LGPL2.1 license.
+
+'''
+Benchmark comparing crunching with and without chunked work queues.
+
+A small Life board, which has a very fast step function, is crunched for a
+number of states by each cruncher type, once with `CRUNCHER_CHUNK_SIZE` set to
+1, (which is how crunchers worked before chunking,) and once with the default
+chunk size. Reported are the states per second that got into the tree.
+
+Usage:
+
+    python work_queue_chunking.py [board_side] [number_of_states]
+
+The default is 5000 states of a 3x3 board.
+'''
+
+import sys
+import time
+
+import garlicsim
+import garlicsim.asynchronous_crunching
+from garlicsim.general_misc import import_tools
+from garlicsim_lib.simpacks import life
+
+
+DEFAULT_BOARD_SIDE = 3
+
+DEFAULT_NUMBER_OF_STATES = 5000
+
+
+def benchmark(cruncher_type, chunk_size, board_side, number_of_states):
+    '''
+    Crunch `number_of_states` states with `cruncher_type` and `chunk_size`.
+
+    Returns the number of states per second.
+    '''
+    old_chunk_size = garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+    garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE = chunk_size
+    try:
+        project = garlicsim.Project(life)
+        project.crunching_manager.cruncher_type = cruncher_type
+        root = project.root_this_state(
+            life.State.create_messy_root(board_side, board_side)
+        )
+        start_time = time.time()
+        project.begin_crunching(root, number_of_states)
+        project.sync_crunchers()
+    finally:
+        garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE = old_chunk_size
+
+    while project.crunching_manager.jobs:
+        time.sleep(0.01)
+        project.sync_crunchers()
+    duration = time.time() - start_time
+    return number_of_states / duration
+
+
+def main():
+    '''Run the benchmark and print the results.'''
+    board_side = int(sys.argv[1]) if len(sys.argv) >= 2 \
+                 else DEFAULT_BOARD_SIDE
+    number_of_states = int(sys.argv[2]) if len(sys.argv) >= 3 \
+                       else DEFAULT_NUMBER_OF_STATES
+
+    crunchers = garlicsim.asynchronous_crunching.crunchers
+    cruncher_types = [crunchers.ThreadCruncher]
+    if import_tools.exists('multiprocessing'):
+        cruncher_types.append(crunchers.ProcessCruncher)
+
+    default_chunk_size = garlicsim.asynchronous_crunching.CRUNCHER_CHUNK_SIZE
+
+    print('Crunching %s states of a %sx%s Life board.' %
+          (number_of_states, board_side, board_side))
+
+    for cruncher_type in cruncher_types:
+        unchunked = benchmark(cruncher_type, 1, board_side, number_of_states)
+        chunked = benchmark(cruncher_type, default_chunk_size, board_side,
+                            number_of_states)
+        print('%s: %.1f states per second one by one, %.1f states per second '
+              'in chunks of up to %s.' % (cruncher_type.__name__, unchunked,
+                                          chunked, default_chunk_size))
+
+
+if __name__ == '__main__':
+    main()